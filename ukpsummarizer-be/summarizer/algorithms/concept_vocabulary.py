@@ -0,0 +1,124 @@
+import numpy as np
+
+
+class ConceptVocabulary(object):
+    """
+    Maps the concepts of a topic (space-joined stemmed strings) to dense integer ids, so that per-concept values can be
+    kept in numpy vectors and sets of concepts in int arrays. Concepts only appear as strings at the API and JSON
+    boundaries.
+
+    There is one vocabulary per topic, `summarizer.concept_vocabulary`. The SentenceStore, the topic artifacts, the
+    concept weights, the SentenceRanker, the array feedback graphs and the snapshots all use its ids. Ids are never
+    reassigned, the vocabulary only grows.
+    """
+
+    def __init__(self, concepts=()):
+        self.concepts = []
+        """ id -> concept """
+        self.ids = {}
+        """ concept -> id """
+        for concept in concepts:
+            self.add(concept)
+
+    def __len__(self):
+        return len(self.concepts)
+
+    def __contains__(self, concept):
+        return concept in self.ids
+
+    def add(self, concept):
+        """
+        :return: the id of the concept, a new one if the concept is unknown
+        """
+        i = self.ids.get(concept)
+        if i is None:
+            i = self.ids[concept] = len(self.concepts)
+            self.concepts.append(concept)
+        return i
+
+    def to_ids(self, concepts, add=False):
+        """
+        :param add: if False, unknown concepts are skipped
+        :return: np.ndarray of the ids of the concepts, in the same order
+        """
+        if add:
+            return np.array([self.add(c) for c in concepts], dtype=np.int32)
+        ids = self.ids
+        return np.array([ids[c] for c in concepts if c in ids], dtype=np.int32)
+
+    def to_concepts(self, ids):
+        concepts = self.concepts
+        return [concepts[i] for i in ids]
+
+
+class ConceptWeights(dict):
+    """
+    A dict concept -> weight which mirrors the weights into a numpy vector, indexed by the ids of a ConceptVocabulary.
+    It can be passed wherever the weights are used as a dict, and loops over many concepts can use `vector` instead of
+    looking up each concept.
+    """
+
+    def __init__(self, vocabulary, weights=None):
+        dict.__init__(self)
+        self.vocabulary = vocabulary
+        self.vector = np.zeros(max(len(vocabulary), 16), dtype=np.float64)
+        if weights:
+            self.update(weights)
+
+    def __reduce__(self):
+        # the items can only be set once the vocabulary is there
+        return ConceptWeights, (self.vocabulary, dict(self))
+
+    def __deepcopy__(self, memo):
+        # the vocabulary of the topic is shared, only the weights are copied
+        return ConceptWeights(self.vocabulary, self)
+
+    def __setitem__(self, concept, weight):
+        dict.__setitem__(self, concept, weight)
+        i = self.vocabulary.add(concept)
+        if i >= len(self.vector):
+            self.vector = np.concatenate([self.vector, np.zeros(max(i + 1, 2 * len(self.vector)) - len(self.vector))])
+        self.vector[i] = weight
+
+    def __delitem__(self, concept):
+        dict.__delitem__(self, concept)
+        self.vector[self.vocabulary.ids[concept]] = 0.0
+
+    def update(self, *args, **kwargs):
+        # in the order of the argument, like dict.update
+        if args:
+            other = args[0]
+            for concept, weight in (other.items() if hasattr(other, "keys") else other):
+                self[concept] = weight
+        for concept, weight in kwargs.items():
+            self[concept] = weight
+
+    def setdefault(self, concept, weight=None):
+        if concept not in self:
+            self[concept] = weight
+        return self[concept]
+
+    def pop(self, concept, *default):
+        if concept in self:
+            weight = self[concept]
+            del self[concept]
+            return weight
+        return dict.pop(self, concept, *default)
+
+    def popitem(self):
+        concept, weight = dict.popitem(self)
+        self.vector[self.vocabulary.ids[concept]] = 0.0
+        return concept, weight
+
+    def clear(self):
+        dict.clear(self)
+        self.vector[:] = 0.0
+
+    def get_vector(self):
+        """
+        :return: the weights by concept id, of length len(self.vocabulary)
+        """
+        if len(self.vector) < len(self.vocabulary):
+            # the vocabulary is shared and may have grown without a weight being set
+            self.vector = np.concatenate([self.vector, np.zeros(len(self.vocabulary) - len(self.vector))])
+        return self.vector[:len(self.vocabulary)]
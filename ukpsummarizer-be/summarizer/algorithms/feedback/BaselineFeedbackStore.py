@@ -1,6 +1,8 @@
 import copy
 import logging
 
+import numpy as np
+
 from algorithms.feedback.FeedbackStore import FeedbackStore
 from constants import ORACLE_TYPE_ACCEPT_ALL, ORACLE_TYPE_REJECT_ALL, CHANGE_WEIGHT_MODE_REJECT, PARSE_TYPE_PARSE, \
     CHANGE_WEIGHT_MODE_ACCEPT, ORACLE_TYPE_ACCEPT_REJECT, ORACLE_TYPE_ILP_FEEDBACK, ORACLE_TYPE_ACTIVE_LEARNING, \
@@ -109,6 +111,15 @@ class BaselineFeedbackStore(FeedbackStore):
             assert(float(v) <= 1.0)
             yield (u, v)
 
+    def get_state(self, vocabulary):
+        return {
+            "concepts": vocabulary.to_ids(self.weights, add=True),
+            "weights": np.array(self.weights.values(), dtype=np.float64)
+        }
+
+    def set_state(self, concepts, state):
+        self.weights = dict((concepts[i], float(w)) for i, w in zip(state["concepts"], state["weights"]))
+
     def get_sorted_concepts(self):
         '''
         Get sorted concepts
@@ -0,0 +1,78 @@
+import numpy as np
+
+
+class FeedbackHistory(object):
+    """
+    The feedback of the nodes of a feedback graph: the current value of each node as a float vector, plus an optional
+    ring buffer with the last `capacity` updates for analysis. The memory does not grow with the number of propagation
+    steps, unlike the former per-node lists of all values.
+    """
+
+    def __init__(self, capacity=0):
+        """
+        :param capacity: number of updates that are kept in the history, 0 disables the history
+        """
+        self.capacity = capacity
+        self.nodes = []
+        """ id -> node """
+        self.ids = {}
+        """ node -> id """
+        self.values = np.zeros(0, dtype=np.float64)
+        """ the current feedback of each node """
+
+        self.history_nodes = np.zeros(capacity, dtype=np.int32)
+        self.history_values = np.zeros(capacity, dtype=np.float64)
+        self.updates = 0
+        """ total number of updates, the next update is stored at updates % capacity """
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, node):
+        return node in self.ids
+
+    def __getitem__(self, node):
+        return self.values[self.ids[node]]
+
+    def __setitem__(self, node, value):
+        self.set(self.ids[node], value)
+
+    def set(self, i, value):
+        """
+            updates the feedback of the node with id i and records the update in the history
+        """
+        self.values[i] = value
+        if self.capacity:
+            position = self.updates % self.capacity
+            self.history_nodes[position] = i
+            self.history_values[position] = value
+        self.updates += 1
+
+    def set_nodes(self, nodes, values):
+        """
+            (re-)defines the nodes and their current values, without recording them as updates. Node ids are the
+            positions in `nodes`; the history of nodes which are kept refers to their new ids.
+        """
+        ids = dict((n, i) for i, n in enumerate(nodes))
+        if self.capacity and len(self.nodes) > 0:
+            mapping = np.array([ids.get(n, -1) for n in self.nodes], dtype=np.int32)
+            self.history_nodes = np.where(self.history_nodes >= 0, mapping[self.history_nodes], -1).astype(np.int32)
+        self.nodes = list(nodes)
+        self.ids = ids
+        self.values = np.array(values, dtype=np.float64)
+
+    def get_history(self):
+        """
+        :return: list of (node, value) of the last min(updates, capacity) updates, the oldest first. Nodes which have
+            been removed by set_nodes are None.
+        """
+        count = min(self.updates, self.capacity)
+        positions = np.arange(self.updates - count, self.updates) % max(self.capacity, 1)
+        return [(self.nodes[i] if i >= 0 else None, float(v))
+                for i, v in zip(self.history_nodes[positions], self.history_values[positions])]
+
+    def nbytes(self):
+        """
+            size of the arrays in bytes
+        """
+        return self.values.nbytes + self.history_nodes.nbytes + self.history_values.nbytes
@@ -37,4 +37,31 @@ class FeedbackStore(object):
             
         :return: 
         """
-        pass
\ No newline at end of file
+        pass
+
+    def get_state(self, vocabulary):
+        """
+            returns the mutable part of the store (i.e. everything that changes in incorporate_feedback) as dict
+            name -> numpy array, for the compact session snapshots. Concepts are referenced by their id.
+
+        :param vocabulary: ConceptVocabulary. Concepts which are unknown are added with the next free id.
+        :return: dict str -> np.ndarray
+        """
+        raise NotImplementedError("%s does not support snapshots, store the session as pickle (session_format "
+                                  "'pickle') instead" % (type(self).__name__))
+
+    def set_state(self, concepts, state):
+        """
+            restores the state returned by get_state into a store that has been set up with the same sentences.
+
+        :param concepts: list id -> concept
+        :param state: dict str -> np.ndarray
+        """
+        raise NotImplementedError("%s does not support snapshots" % (type(self).__name__))
+
+    def set_vocabulary(self, vocabulary):
+        """
+            sets the ConceptVocabulary of the topic, before add_sentences. Stores which keep their concepts as ids use
+            its ids instead of their own.
+        """
+        self.vocabulary = vocabulary
@@ -88,4 +88,18 @@ class PageRankFeedbackGraph(FeedbackStore):
 
         print("V := (N,E), |N| = %s, |E| = %s" % (len(G.nodes()), len(G.edges())))
 
-        self.pr = nx.pagerank(G)
\ No newline at end of file
+        self.pr = nx.pagerank(G)
+
+    def get_state(self, vocabulary):
+        """
+            the nodes that are left, incorporate_feedback only removes the rejected ones. The pagerank is recomputed
+            on set_state.
+        """
+        return {
+            "nodes": vocabulary.to_ids(self.G.nodes(), add=True)
+        }
+
+    def set_state(self, concepts, state):
+        nodes = set(concepts[i] for i in state["nodes"])
+        self.G.remove_nodes_from([n for n in self.G.nodes() if n not in nodes])
+        self.pr = nx.pagerank(self.G)
@@ -2,6 +2,7 @@ import logging
 from collections import Counter
 
 import networkx as nx
+import numpy as np
 from nltk import ngrams
 
 from algorithms.feedback.FeedbackStore import FeedbackStore
@@ -136,4 +137,21 @@ class SimpleNgramFeedbackGraph(FeedbackStore):
             weight = attr
             ngram = u + " " + v
             assert(float(weight / maxweight) <= 1.0)
-            yield (ngram, float(weight / maxweight))
\ No newline at end of file
+            yield (ngram, float(weight / maxweight))
+
+    def get_state(self, vocabulary):
+        edges = []
+        weights = []
+        for (u, v, weight) in self.G.edges_iter(data="weight"):
+            ngram = u + " " + v
+            edges.append(vocabulary.add(ngram))
+            weights.append(weight)
+        return {
+            "edges": np.array(edges, dtype=np.int32),
+            "weights": np.array(weights, dtype=np.float64)
+        }
+
+    def set_state(self, concepts, state):
+        for i, weight in zip(state["edges"], state["weights"]):
+            u, v = concepts[i].split(" ")
+            self.G[u][v]["weight"] = float(weight)
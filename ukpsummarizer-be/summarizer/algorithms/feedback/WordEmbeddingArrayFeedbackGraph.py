@@ -0,0 +1,231 @@
+import logging
+
+import numpy as np
+
+from algorithms.feedback import similarity_adjacency, order_like_networkx, dict_order, concept_occurrences
+from algorithms.feedback.FeedbackHistory import FeedbackHistory
+from algorithms.feedback.FeedbackStore import FeedbackStore
+from summarizer.algorithms.concept_vocabulary import ConceptVocabulary
+
+log = logging.getLogger("WordEmbeddingArrayFeedbackGraph")
+
+PROPAGATION_ENGINE_GRAPH = "graph"
+PROPAGATION_ENGINE_ARRAY = "array"
+
+
+class WordEmbeddingArrayFeedbackGraph(FeedbackStore):
+    """
+    Base class of the array-backed word-embedding feedback graphs. Instead of a networkx graph, the similarity graph is
+    a CSR adjacency (indptr, indices, data), and the frozen nodes are a boolean mask next to the feedback vector (see
+    FeedbackHistory).
+
+    Nodes and successors are kept in the order in which networkx iterates them, so that the propagation visits the
+    nodes (and draws random numbers) in the same order as the networkx based graphs and gives the same weights. Nodes
+    are mapped to the ids of the ConceptVocabulary of the topic (see set_vocabulary) by two arrays, instead of a dict of
+    their own.
+    """
+
+    def __init__(self, embedder, cut_off_threshold=0.4, neighbors=None, lsh_tables=None, lsh_bits=None,
+                 history_size=0):
+        self.concept_embedder = embedder
+        self.cut_off_threshold = cut_off_threshold
+        self.vectors = {}
+
+        # approximate k-NN similarity edges, see add_similarity_edges
+        self.neighbors = neighbors
+        self.lsh_tables = lsh_tables
+        self.lsh_bits = lsh_bits
+
+        self.node_df = {}
+        """ concept -> df. A dict like DiGraph.node, so that the nodes are iterated in the same order """
+        self.nodes = []
+        """ id -> concept """
+        self.vocabulary = ConceptVocabulary()
+        self.node_concepts = np.zeros(0, dtype=np.int32)
+        """ node id -> concept id in the vocabulary """
+        self.node_index = np.zeros(0, dtype=np.int64)
+        """ concept id -> node id, -1 for the concepts which are no node """
+        self.df = np.zeros(0, dtype=np.float64)
+        self.history_size = history_size
+        self.feedback = FeedbackHistory(history_size)
+        """ the current feedback of each node, by node id """
+        self.frozen = np.zeros(0, dtype=np.bool_)
+
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int64)
+        self.data = np.zeros(0, dtype=np.float64)
+        self.degree = np.zeros(0, dtype=np.int64)
+        """ in- plus out-degree, like DiGraph.degree """
+
+    def get_config(self):
+        config = {
+            "propagation_engine": PROPAGATION_ENGINE_ARRAY
+        }
+        if self.neighbors is not None or self.lsh_tables is not None:
+            config["neighbors"] = self.neighbors
+            config["lsh_tables"] = self.lsh_tables
+            config["lsh_bits"] = self.lsh_bits
+        if self.history_size:
+            config["history_size"] = self.history_size
+        return config
+
+    def add_sentences(self, sentences=None, weights=None, max_weight=None):
+        if weights is None:
+            weights = {}
+
+        # (re-)added nodes start unfrozen with their normalized weight, like after DiGraph.add_node
+        feedback = dict(zip(self.nodes, self.feedback.values.tolist()))
+        frozen = set(n for n, f in zip(self.nodes, self.frozen) if f)
+        for sentence in sentences:
+            for concept, untokenized_concept in concept_occurrences(sentence):
+                words = untokenized_concept.split(" ")
+
+                self.vectors[concept] = self.concept_embedder(words)
+
+                # if there are initial weights given, normalize them and store.
+                if weights.has_key(concept):
+                    df = weights[concept] / float(max_weight)
+                else:
+                    df = 1.0 / float(max_weight)
+                self.node_df[concept] = weights[concept]
+                feedback[concept] = df
+                frozen.discard(concept)
+
+        self.nodes = list(self.node_df)
+        self.__index_nodes__()
+        self.df = np.array([self.node_df[n] for n in self.nodes], dtype=np.float64)
+        self.feedback.set_nodes(self.nodes, [feedback[n] for n in self.nodes])
+        self.frozen = np.array([n in frozen for n in self.nodes], dtype=np.bool_)
+
+        log.debug("%s unique vectors, %s contained unknown words" % (
+            len(self.concept_embedder.cache), self.concept_embedder.errorcount))
+
+        # add edges
+        if self.nodes:
+            adjacency = order_like_networkx(
+                similarity_adjacency(self.nodes, self.vectors, self.cut_off_threshold, neighbors=self.neighbors,
+                                     lsh_tables=self.lsh_tables, lsh_bits=self.lsh_bits), self.nodes)
+            self.indptr = adjacency.indptr.astype(np.int64)
+            self.indices = adjacency.indices.astype(np.int64)
+            self.data = adjacency.data.astype(np.float64)
+        self.degree = np.diff(self.indptr) + np.bincount(self.indices, minlength=len(self.nodes))
+        log.debug("%s: %s nodes, %s edges" % (type(self).__name__, len(self.nodes), len(self.indices)))
+
+    def __index_nodes__(self):
+        self.node_concepts = self.vocabulary.to_ids(self.nodes, add=True)
+        self.node_index = np.full(len(self.vocabulary), -1, dtype=np.int64)
+        self.node_index[self.node_concepts] = np.arange(len(self.nodes))
+
+    def set_vocabulary(self, vocabulary):
+        self.vocabulary = vocabulary
+        self.__index_nodes__()
+
+    def node_id(self, concept):
+        """
+        :return: the id of the node of the concept
+        :raise KeyError: if the concept is no node
+        """
+        i = self.vocabulary.ids[concept]
+        if i >= len(self.node_index) or self.node_index[i] < 0:
+            raise KeyError(concept)
+        return int(self.node_index[i])
+
+    def successors(self, i):
+        """
+        :return: (array of the successors of node i, array of the similarities)
+        """
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def bfs_tree(self, source):
+        """
+            the breadth-first search tree from the source, like nx.bfs_tree. The nodes of a level are discovered at
+            once, the first edge (in the order of the queue and the successors) into a node is its tree edge.
+
+        :return: dict node -> list of children, in the order of t.successors(node)
+        """
+        indptr, indices = self.indptr, self.indices
+        visited = np.zeros(len(self.nodes), dtype=np.bool_)
+        visited[source] = True
+        frontier = np.array([source], dtype=np.int64)
+        parents = []
+        children = []
+        while len(frontier) > 0:
+            starts = indptr[frontier]
+            counts = indptr[frontier + 1] - starts
+            offsets = np.cumsum(counts) - counts
+            edges = np.arange(counts.sum()) + np.repeat(starts - offsets, counts)
+            targets = indices[edges]
+            sources = np.repeat(frontier, counts)
+
+            unvisited = ~visited[targets]
+            targets = targets[unvisited]
+            sources = sources[unvisited]
+            _, first = np.unique(targets, return_index=True)
+            first.sort()
+
+            frontier = targets[first]
+            visited[frontier] = True
+            parents.append(sources[first])
+            children.append(frontier)
+
+        tree = {}
+        for parent, child in zip(np.concatenate(parents).tolist(), np.concatenate(children).tolist()):
+            tree.setdefault(parent, []).append(child)
+        for parent, nodes in tree.items():
+            if len(nodes) > 1:
+                tree[parent] = [nodes[k] for k in dict_order([self.nodes[n] for n in nodes])]
+        return tree
+
+    def get_weights(self):
+        for concept, feedback in zip(self.nodes, self.feedback.values.tolist()):
+            yield (concept, feedback)
+
+    def get_state(self, vocabulary):
+        """
+            the same arrays as get_node_feedback_state of the networkx based graphs, with a history of one value per
+            node, so that snapshots can be restored with either engine.
+        """
+        if vocabulary is self.vocabulary:
+            nodes = self.node_concepts.copy()
+        else:
+            nodes = vocabulary.to_ids(self.nodes, add=True)
+        return {
+            "nodes": nodes,
+            "feedback": self.feedback.values.copy(),
+            "feedback_offsets": np.arange(len(self.nodes) + 1, dtype=np.int64),
+            "frozen": self.frozen.copy()
+        }
+
+    def set_state(self, concepts, state):
+        offsets = state["feedback_offsets"]
+        feedback = state["feedback"]
+        for i, concept_id in enumerate(state["nodes"]):
+            node = self.node_id(concepts[concept_id])
+            if offsets[i + 1] > offsets[i]:
+                self.feedback.values[node] = feedback[offsets[i + 1] - 1]
+            else:
+                self.feedback.values[node] = 0.0
+            self.frozen[node] = bool(state["frozen"][i])
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # pickled before FeedbackHistory, with the feedback as a plain vector
+        if isinstance(self.feedback, np.ndarray):
+            self.history_size = 0
+            values = self.feedback
+            self.feedback = FeedbackHistory(0)
+            self.feedback.set_nodes(self.nodes, values)
+        # pickled before the graphs used the vocabulary of the topic
+        if "vocabulary" not in state:
+            self.__dict__.pop("node_ids", None)
+            self.vocabulary = ConceptVocabulary()
+            self.__index_nodes__()
+
+    def freeze_node(self, item, weight):
+        i = self.node_id(item)
+        self.frozen[i] = True
+        self.feedback.set(i, weight)
+
+    def is_frozen(self, item):
+        return self.frozen[self.node_id(item)]
@@ -4,10 +4,11 @@ import random
 
 import networkx as nx
 import numpy as np
-from scipy.spatial.distance import cosine
 
 from algorithms.feedback.FeedbackStore import FeedbackStore
-from algorithms.feedback import print_graph_stats
+from algorithms.feedback import print_graph_stats, add_similarity_edges, get_node_feedback_state, \
+    set_node_feedback_state, update_node_feedback, set_pickled_graph_state, concept_occurrences
+from algorithms.feedback.FeedbackHistory import FeedbackHistory
 
 from algorithms.feedback.ConceptEmbedder import ConceptEmbedder
 
@@ -17,7 +18,8 @@ class WordEmbeddingEgoPrFeedbackGraph(FeedbackStore):
 
     def __init__(self, embedder, cut_off_threshold=0.4, G=None, mass_accept=1.0,
                  mass_reject=-1.0, iterations_accept=1, iterations_reject=1, ego_pr_depth_accept=1,
-                 ego_pr_depth_reject=1, tax=0.5):
+                 ego_pr_depth_reject=1, tax=0.5, neighbors=None, lsh_tables=None, lsh_bits=None,
+                 history_size=0):
         if G is None:
             self.G = nx.DiGraph()
         else:
@@ -27,6 +29,15 @@ class WordEmbeddingEgoPrFeedbackGraph(FeedbackStore):
         self.vectors = {}
         self.concept_embedder = embedder
 
+        # approximate k-NN similarity edges, see add_similarity_edges
+        self.neighbors = neighbors
+        self.lsh_tables = lsh_tables
+        self.lsh_bits = lsh_bits
+
+        # the current feedback of the nodes, and the last history_size updates
+        self.history_size = history_size
+        self.feedback = FeedbackHistory(history_size)
+
         self.mass_accept = mass_accept
         self.mass_reject = mass_reject
         self.iterations_accept = iterations_accept
@@ -44,6 +55,12 @@ class WordEmbeddingEgoPrFeedbackGraph(FeedbackStore):
             "mass_reject": self.mass_reject,
             "tax": self.tax
         }
+        if self.neighbors is not None or self.lsh_tables is not None:
+            config["neighbors"] = self.neighbors
+            config["lsh_tables"] = self.lsh_tables
+            config["lsh_bits"] = self.lsh_bits
+        if self.history_size:
+            config["history_size"] = self.history_size
         return config
 
     def add_sentences(self, sentences=None, weights=None, max_weight=None):
@@ -51,12 +68,12 @@ class WordEmbeddingEgoPrFeedbackGraph(FeedbackStore):
             weights = {}
 
         G = self.G
+        added = {}
         # for (k,v) in weights.items():
         #     G.add_node(k, label=k, concept=k, feedback=[float(v) / float(max_weight)], df= v)
 
         for sentence in sentences:
-            for concept in sentence.concepts:
-                untokenized_concept = sentence.untokenized_concepts[sentence.concepts.index(concept)]
+            for concept, untokenized_concept in concept_occurrences(sentence):
                 # words = unstem_ngram(concept, sentence)
                 words = untokenized_concept.split(" ")
 
@@ -69,7 +86,9 @@ class WordEmbeddingEgoPrFeedbackGraph(FeedbackStore):
                 else:
                     df = 1.0 / float(max_weight)
 
-                G.add_node(concept, label=concept, concept=concept, feedback=[df], df=weights[concept], frozen=False)
+                G.add_node(concept, label=concept, concept=concept, df=weights[concept], frozen=False)
+                added[concept] = df
+        update_node_feedback(self.feedback, G.nodes(), added)
         print("not known in feedbackgraph:", len(set(weights.keys()) - set(G.nodes())), " in G:", len(set(G.nodes())),
               "in total:", len(set(weights.keys())))
         # print("not known in feedbackgraph:", set(weights.keys()) - set(G.nodes()))
@@ -78,17 +97,12 @@ class WordEmbeddingEgoPrFeedbackGraph(FeedbackStore):
             len(self.concept_embedder.cache), self.concept_embedder.errorcount))
 
         # add edges
-        for u in G.nodes():
-            for v in G.nodes():
-                if u is v:
-                    continue
-                sim = 1 - cosine(self.vectors[u], self.vectors[v])
-                if sim > self.cut_off_threshold:
-                    G.add_edge(u, v, similarity=sim, dissimilarity=1 - sim)
+        add_similarity_edges(G, self.vectors, self.cut_off_threshold, neighbors=self.neighbors,
+                             lsh_tables=self.lsh_tables, lsh_bits=self.lsh_bits)
         # self.pr = nx.pagerank(G, weight="similarity")
 
         # initial graph stats
-        print_graph_stats(G, "WordEmbeddingEgoPrFeedbackGraph")
+        print_graph_stats(G, "WordEmbeddingEgoPrFeedbackGraph", feedback=self.feedback)
 
         # dump_details(G)
 
@@ -114,7 +128,6 @@ class WordEmbeddingEgoPrFeedbackGraph(FeedbackStore):
 
         ego_pr = nx.pagerank(ego, weight="similarity")
         # sum of all pr items == 1 => pr is the share of all money :)
-        feedbacks = nx.get_node_attributes(ego, 'feedback')
         for (k, v) in ego_pr.items():
             if k is node_id:
                 appendable_mass = mass * tax
@@ -122,16 +135,12 @@ class WordEmbeddingEgoPrFeedbackGraph(FeedbackStore):
                 appendable_mass = mass * tax * v
             for (n, d) in self.G.nodes(data=True):
                 if n is k:
-                    # print(d["feedback"])
                     if self.is_frozen(n):
                         self.logger.debug("           Frozen")
                     else:
                         self.logger.debug("       Not frozen")
-                        if len(d["feedback"]) == 0:
-                            v = 0.0
-                        else:
-                            v = d["feedback"][-1:][0]
-                        d["feedback"].append(v + appendable_mass)
+                        v = self.feedback[n]
+                        self.feedback[n] = v + appendable_mass
                         # G.node[source_node]["feedback"].append(source_mass + mass_addable_to_source)
 
     def get_weights(self):
@@ -144,11 +153,8 @@ class WordEmbeddingEgoPrFeedbackGraph(FeedbackStore):
 
         # find the maximum feedback
 
-        for (n, d) in G.nodes(data=True):
-            if len(d["feedback"]) == 0:
-                yield (n, 0.0)
-            else:
-                yield (n, d["feedback"][-1:][0])
+        for n in G.nodes_iter():
+            yield (n, float(self.feedback[n]))
 
                 # avg = np.average(d["feedback"])
                 # mx = max(d["feedback"])
@@ -169,10 +175,19 @@ class WordEmbeddingEgoPrFeedbackGraph(FeedbackStore):
                 # for (k, v) in pr.iteritems():
                 #     yield (k, float(v / max_pagerank))
 
+    def get_state(self, vocabulary):
+        return get_node_feedback_state(self.G, self.feedback, vocabulary)
+
+    def set_state(self, concepts, state):
+        set_node_feedback_state(self.G, self.feedback, concepts, state)
+
+    def __setstate__(self, state):
+        set_pickled_graph_state(self, state)
+
     def freeze_node(self, item, weight):
         g = self.G
         g.node[item]["frozen"] = True
-        g.node[item]["feedback"].append(weight)
+        self.feedback[item] = weight
 
     def is_frozen(self, item):
         return self.G.node[item]["frozen"]
@@ -0,0 +1,92 @@
+import logging
+
+import numpy as np
+
+from algorithms.feedback.WordEmbeddingArrayFeedbackGraph import WordEmbeddingArrayFeedbackGraph
+
+log = logging.getLogger("WordEmbeddingGaussianArrayFeedbackGraph")
+
+
+class WordEmbeddingGaussianArrayFeedbackGraph(WordEmbeddingArrayFeedbackGraph):
+    """
+    Array-backed variant of WordEmbeddingGaussianFeedbackGraph with the same results.
+    """
+
+    def __init__(self,
+                 embedder,
+                 cut_off_threshold=0.4,
+                 mass_accept=1.0,
+                 mass_reject=-1.0,
+                 iterations_accept=1,
+                 iterations_reject=1,
+                 neighbors=None,
+                 lsh_tables=None,
+                 lsh_bits=None,
+                 history_size=0):
+        super(WordEmbeddingGaussianArrayFeedbackGraph, self).__init__(embedder,
+                                                                      cut_off_threshold=cut_off_threshold,
+                                                                      neighbors=neighbors,
+                                                                      lsh_tables=lsh_tables,
+                                                                      lsh_bits=lsh_bits,
+                                                                      history_size=history_size)
+        self.mass_accept = mass_accept
+        self.mass_reject = mass_reject
+        self.iterations_accept = iterations_accept
+        self.iterations_reject = iterations_reject
+
+    def get_config(self):
+        config = super(WordEmbeddingGaussianArrayFeedbackGraph, self).get_config()
+        config.update({
+            "type": "WordEmbeddingGaussianFeedbackGraph",
+            "mass_accept": self.mass_accept,
+            "iterations_accept": self.iterations_accept,
+            "mass_reject": self.mass_reject,
+            "iterations_reject": self.iterations_reject,
+            "cutoff_threshold": self.cut_off_threshold
+        })
+        return config
+
+    def incorporate_feedback(self, flightrecorder):
+        records = flightrecorder.latest()
+        for item in records.accept:
+            self.freeze_node(item, 1.0)
+            self.__gaussian_blur_based_propagation__(item, mass=self.mass_accept, num_iteration=self.iterations_accept)
+        for item in records.reject:
+            self.freeze_node(item, 0.0)
+            self.__gaussian_blur_based_propagation__(item, mass=self.mass_reject, num_iteration=self.iterations_reject)
+
+    def __gaussian_blur_based_propagation__(self, focus_node, mass=1, num_iteration=1):
+        """
+        see WordEmbeddingGaussianFeedbackGraph. The nodes of the bfs tree are visited depth-first; each node with a
+        feedback between 0 and 1 gets the similarity-weighted sum of the feedback of its successors, divided by its
+        degree + 1. The updates are applied in the visiting order, as later nodes see the updated feedback of earlier
+        ones; the sums are computed as sequential sums over the CSR rows.
+        """
+        focus = self.node_id(focus_node)
+        history = self.feedback
+        feedback = history.values
+        frozen = self.frozen
+        degree = self.degree
+        indptr, indices, data = self.indptr, self.indices, self.data
+
+        for _ in range(num_iteration):
+            history.set(focus, mass)
+            tree = self.bfs_tree(focus)
+
+            stack = [focus]
+            while len(stack) > 0:
+                v = stack.pop()
+
+                if 0 < feedback[v] < 1 and not frozen[v]:
+                    v_mass_new = 0.0
+                    if degree[v] > 0:
+                        start, end = indptr[v], indptr[v + 1]
+                        if end > start:
+                            # cumsum adds in the order of the successors, like the loop of the networkx graph
+                            v_mass_new = np.cumsum(data[start:end] * feedback[indices[start:end]])[-1]
+                        v_mass_new /= (degree[v] + 1)
+                    history.set(v, v_mass_new)
+
+                children = tree.get(v)
+                if children:
+                    stack.extend(children)
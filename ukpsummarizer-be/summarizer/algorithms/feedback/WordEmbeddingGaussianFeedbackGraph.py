@@ -2,8 +2,9 @@ import collections
 import logging
 
 import networkx as nx
-from algorithms.feedback import print_graph_stats
-from scipy.spatial.distance import cosine
+from algorithms.feedback import print_graph_stats, add_similarity_edges, get_node_feedback_state, \
+    set_node_feedback_state, update_node_feedback, set_pickled_graph_state, concept_occurrences
+from algorithms.feedback.FeedbackHistory import FeedbackHistory
 
 from algorithms.feedback.ConceptEmbedder import ConceptEmbedder
 from algorithms.feedback.FeedbackStore import FeedbackStore
@@ -20,7 +21,11 @@ class WordEmbeddingGaussianFeedbackGraph(FeedbackStore):
                  mass_accept=1.0,
                  mass_reject=-1.0,
                  iterations_accept=1,
-                 iterations_reject=1):
+                 iterations_reject=1,
+                 neighbors=None,
+                 lsh_tables=None,
+                 lsh_bits=None,
+                 history_size=0):
         if G is None:
             self.G = nx.DiGraph()
         else:
@@ -30,6 +35,15 @@ class WordEmbeddingGaussianFeedbackGraph(FeedbackStore):
         self.vectors = {}
         self.concept_embedder = embedder
 
+        # approximate k-NN similarity edges, see add_similarity_edges
+        self.neighbors = neighbors
+        self.lsh_tables = lsh_tables
+        self.lsh_bits = lsh_bits
+
+        # the current feedback of the nodes, and the last history_size updates
+        self.history_size = history_size
+        self.feedback = FeedbackHistory(history_size)
+
         self.mass_accept = mass_accept
         self.mass_reject = mass_reject
         self.iterations_accept = iterations_accept
@@ -44,6 +58,12 @@ class WordEmbeddingGaussianFeedbackGraph(FeedbackStore):
             "iterations_reject": self.iterations_reject,
             "cutoff_threshold": self.cut_off_threshold
         }
+        if self.neighbors is not None or self.lsh_tables is not None:
+            config["neighbors"] = self.neighbors
+            config["lsh_tables"] = self.lsh_tables
+            config["lsh_bits"] = self.lsh_bits
+        if self.history_size:
+            config["history_size"] = self.history_size
         return config
 
     def add_sentences(self, sentences=None, weights=None, max_weight=None):
@@ -51,12 +71,12 @@ class WordEmbeddingGaussianFeedbackGraph(FeedbackStore):
             weights = {}
 
         G = self.G
+        added = {}
         # for (k,v) in weights.items():
         #     G.add_node(k, label=k, concept=k, feedback=[float(v) / float(max_weight)], df= v)
 
         for sentence in sentences:
-            for concept in sentence.concepts:
-                untokenized_concept = sentence.untokenized_concepts[sentence.concepts.index(concept)]
+            for concept, untokenized_concept in concept_occurrences(sentence):
                 # words = unstem_ngram(concept, sentence)
                 words = untokenized_concept.split(" ")
 
@@ -69,7 +89,9 @@ class WordEmbeddingGaussianFeedbackGraph(FeedbackStore):
                 else:
                     df = 1.0 / float(max_weight)
 
-                G.add_node(concept, label=concept, concept=concept, feedback=[df], df=weights[concept], frozen=False)
+                G.add_node(concept, label=concept, concept=concept, df=weights[concept], frozen=False)
+                added[concept] = df
+        update_node_feedback(self.feedback, G.nodes(), added)
         log.debug("not known in feedbackgraph:", len(set(weights.keys()) - set(G.nodes())), " in G:", len(set(G.nodes())),
               "in total:", len(set(weights.keys())))
         # print("not known in feedbackgraph:", set(weights.keys()) - set(G.nodes()))
@@ -78,17 +100,12 @@ class WordEmbeddingGaussianFeedbackGraph(FeedbackStore):
             len(self.concept_embedder.cache), self.concept_embedder.errorcount))
 
         # add edges
-        for u in G.nodes():
-            for v in G.nodes():
-                if u is v:
-                    continue
-                sim = 1 - cosine(self.vectors[u], self.vectors[v])
-                if sim > self.cut_off_threshold:
-                    G.add_edge(u, v, similarity=sim, dissimilarity=1 - sim)
+        add_similarity_edges(G, self.vectors, self.cut_off_threshold, neighbors=self.neighbors,
+                             lsh_tables=self.lsh_tables, lsh_bits=self.lsh_bits)
         # self.pr = nx.pagerank(G, weight="similarity")
 
         # initial graph stats
-        print_graph_stats(G, "WordEmbeddingGaussianFeedbackGraph")
+        print_graph_stats(G, "WordEmbeddingGaussianFeedbackGraph", feedback=self.feedback)
 
         # dump_details(G)
 
@@ -114,10 +131,11 @@ class WordEmbeddingGaussianFeedbackGraph(FeedbackStore):
         """
         # print("propagating ", focus_node, "with mass", mass)
         G = self.G
+        feedback = self.feedback
 
         c = []
         for _ in range(num_iteration):
-            G.node[focus_node]["feedback"].append(mass)
+            feedback[focus_node] = mass
 
             q = collections.deque()
             q.append(focus_node)
@@ -127,19 +145,19 @@ class WordEmbeddingGaussianFeedbackGraph(FeedbackStore):
             while len(q) > 0:
                 v = q.pop()
 
-                v_mass = G.node[v]["feedback"][-1:][0]
+                v_mass = feedback[v]
                 if 0 < v_mass < 1:
                     v_mass_new = 0
                     # only update current node feedback mass if allowed
                     if G.degree(v) > 0:
                         for n in G.successors(v):
                             v_n_sim = G[v][n]["similarity"]
-                            n_mass = G.node[n]["feedback"][-1:][0]
+                            n_mass = feedback[n]
                             v_mass_new += v_n_sim * n_mass
                         v_mass_new /= (G.degree(v) + 1)
 
                     if not self.is_frozen(v):
-                        G.node[v]["feedback"].append(v_mass_new)
+                        feedback[v] = v_mass_new
 
                 q.extend(t.successors(v))
                 # dump_details(G)
@@ -156,11 +174,8 @@ class WordEmbeddingGaussianFeedbackGraph(FeedbackStore):
 
         # find the maximum feedback
 
-        for (n, d) in G.nodes(data=True):
-            if len(d["feedback"]) == 0:
-                yield (n, 0.0)
-            else:
-                yield (n, d["feedback"][-1:][0])
+        for n in G.nodes_iter():
+            yield (n, float(self.feedback[n]))
 
                 # avg = np.average(d["feedback"])
                 # mx = max(d["feedback"])
@@ -181,10 +196,19 @@ class WordEmbeddingGaussianFeedbackGraph(FeedbackStore):
                 # for (k, v) in pr.iteritems():
                 #     yield (k, float(v / max_pagerank))
 
+    def get_state(self, vocabulary):
+        return get_node_feedback_state(self.G, self.feedback, vocabulary)
+
+    def set_state(self, concepts, state):
+        set_node_feedback_state(self.G, self.feedback, concepts, state)
+
+    def __setstate__(self, state):
+        set_pickled_graph_state(self, state)
+
     def freeze_node(self, item, weight):
         g = self.G
         g.node[item]["frozen"] = True
-        g.node[item]["feedback"].append(weight)
+        self.feedback[item] = weight
 
     def is_frozen(self, item):
         return self.G.node[item]["frozen"]
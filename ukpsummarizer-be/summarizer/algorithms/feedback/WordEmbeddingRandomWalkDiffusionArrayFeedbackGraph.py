@@ -0,0 +1,126 @@
+import logging
+import random
+
+import numpy as np
+
+from algorithms.feedback.WordEmbeddingArrayFeedbackGraph import WordEmbeddingArrayFeedbackGraph
+
+log = logging.getLogger("WordEmbeddingRandomWalkDiffusionArrayFeedbackGraph")
+
+
+class WordEmbeddingRandomWalkDiffusionArrayFeedbackGraph(WordEmbeddingArrayFeedbackGraph):
+    """
+    Array-backed variant of WordEmbeddingRandomWalkDiffusionFeedbackGraph. It draws the same random numbers from the
+    random module as the networkx graph, so with the same seed, the walks and the weights are the same.
+    """
+
+    def __init__(self, embedder,
+                 mass_accept=1.0,
+                 mass_reject=-1.0,
+                 iterations_accept=1,
+                 iterations_reject=1,
+                 cut_off_threshold=0.4,
+                 propagation_abort_threshold=0.1,
+                 neighbors=None,
+                 lsh_tables=None,
+                 lsh_bits=None,
+                 history_size=0):
+        super(WordEmbeddingRandomWalkDiffusionArrayFeedbackGraph, self).__init__(embedder,
+                                                                                 cut_off_threshold=cut_off_threshold,
+                                                                                 neighbors=neighbors,
+                                                                                 lsh_tables=lsh_tables,
+                                                                                 lsh_bits=lsh_bits,
+                                                                                 history_size=history_size)
+        self.mass_accept = mass_accept
+        self.mass_reject = mass_reject
+        self.iterations_accept = iterations_accept
+        self.iterations_reject = iterations_reject
+        self.propagation_abort_threshold = propagation_abort_threshold
+        self.cumulative = np.zeros(0, dtype=np.float64)
+        """ per CSR row: the running sum of the similarities, for choosing the successors """
+
+    def get_config(self):
+        config = super(WordEmbeddingRandomWalkDiffusionArrayFeedbackGraph, self).get_config()
+        config.update({
+            "type": "WordEmbeddingRandomWalkDiffusionFeedbackGraph",
+            "mass_accept": self.mass_accept,
+            "mass_reject": self.mass_reject,
+            "iterations_accept": self.iterations_accept,
+            "iterations_reject": self.iterations_reject,
+            "cut_off_threshold": self.cut_off_threshold,
+            "propagation_abort_threshold": self.propagation_abort_threshold
+        })
+        return config
+
+    def add_sentences(self, sentences=None, weights=None, max_weight=None):
+        super(WordEmbeddingRandomWalkDiffusionArrayFeedbackGraph, self).add_sentences(sentences, weights, max_weight)
+        # sequential sums per row, so that they are equal to the sums of the networkx graph
+        cumulative = np.empty_like(self.data)
+        for i in range(len(self.nodes)):
+            start, end = self.indptr[i], self.indptr[i + 1]
+            cumulative[start:end] = np.cumsum(self.data[start:end])
+        self.cumulative = cumulative
+
+    def incorporate_feedback(self, flightrecorder):
+        records = flightrecorder.latest()
+        for item in records.accept:
+            self.freeze_node(item, 1.0)
+            self.__random_walk_diffusion_propagation__(item,
+                                                       mass=self.mass_accept,
+                                                       num_iteration=self.iterations_accept,
+                                                       abort_thres=self.propagation_abort_threshold)
+        for item in records.reject:
+            self.freeze_node(item, 0.0)
+            self.__random_walk_diffusion_propagation__(item,
+                                                       mass=self.mass_reject,
+                                                       num_iteration=self.iterations_reject,
+                                                       abort_thres=self.propagation_abort_threshold)
+
+    def __random_walk_diffusion_propagation__(self, focus_node, mass=1, num_iteration=1, abort_thres=0.1):
+        """
+        see WordEmbeddingRandomWalkDiffusionFeedbackGraph
+        """
+        history = self.feedback
+        feedback = history.values
+        frozen = self.frozen
+        focus = self.node_id(focus_node)
+
+        mass = float(mass) / float(num_iteration)
+        threshold = float(abort_thres) / float(num_iteration)
+        for _ in range(num_iteration):
+            # start from the focus_node
+            source = focus
+            distributable_mass = mass
+
+            while abs(distributable_mass) > abs(threshold):
+                edge = self.__choose_random_edge__(source)
+                if edge is None:
+                    # no distribution possible. incorporate all feedback locally.
+                    if not frozen[source]:
+                        history.set(source, feedback[source] + distributable_mass)
+                    break
+
+                # retain the mass in the current source node
+                mass_addable_to_source = distributable_mass / 2
+                if not frozen[source]:
+                    history.set(source, feedback[source] + mass_addable_to_source)
+
+                # reduce the rest of the distributable_mass and advance to the next node
+                distributable_mass = self.data[edge] * (distributable_mass - mass_addable_to_source)
+                source = self.indices[edge]
+
+    def __choose_random_edge__(self, source):
+        """
+            like __choose_random_successor__ of the networkx graph, which draws a random number even if the node has
+            no successors.
+
+        :return: the CSR position of the chosen edge, or None if no successor has been found
+        """
+        start, end = self.indptr[source], self.indptr[source + 1]
+        cumulative = self.cumulative[start:end]
+        total = float(cumulative[-1]) if end > start else 0
+        r = random.uniform(0, total)
+        found = np.flatnonzero(r <= cumulative)
+        if len(found) == 0:
+            return None
+        return start + found[0]
@@ -4,10 +4,11 @@ import random
 
 import networkx as nx
 import numpy as np
-from scipy.spatial.distance import cosine
 
 from algorithms.feedback.FeedbackStore import FeedbackStore
-from algorithms.feedback import print_graph_stats
+from algorithms.feedback import print_graph_stats, add_similarity_edges, get_node_feedback_state, \
+    set_node_feedback_state, update_node_feedback, set_pickled_graph_state, concept_occurrences
+from algorithms.feedback.FeedbackHistory import FeedbackHistory
 
 from algorithms.feedback.ConceptEmbedder import ConceptEmbedder
 
@@ -22,7 +23,11 @@ class WordEmbeddingRandomWalkDiffusionFeedbackGraph(FeedbackStore):
                  iterations_accept=1,
                  iterations_reject=1,
                  cut_off_threshold=0.4,
-                 propagation_abort_threshold=0.1):
+                 propagation_abort_threshold=0.1,
+                 neighbors=None,
+                 lsh_tables=None,
+                 lsh_bits=None,
+                 history_size=0):
         if G is None:
             self.G = nx.DiGraph()
         else:
@@ -32,6 +37,15 @@ class WordEmbeddingRandomWalkDiffusionFeedbackGraph(FeedbackStore):
         self.vectors = {}
         self.concept_embedder = embedder
 
+        # approximate k-NN similarity edges, see add_similarity_edges
+        self.neighbors = neighbors
+        self.lsh_tables = lsh_tables
+        self.lsh_bits = lsh_bits
+
+        # the current feedback of the nodes, and the last history_size updates
+        self.history_size = history_size
+        self.feedback = FeedbackHistory(history_size)
+
         self.mass_accept = mass_accept
         self.mass_reject = mass_reject
         self.iterations_accept = iterations_accept
@@ -49,6 +63,12 @@ class WordEmbeddingRandomWalkDiffusionFeedbackGraph(FeedbackStore):
             "cut_off_threshold": self.cut_off_threshold,
             "propagation_abort_threshold": self.propagation_abort_threshold
         }
+        if self.neighbors is not None or self.lsh_tables is not None:
+            config["neighbors"] = self.neighbors
+            config["lsh_tables"] = self.lsh_tables
+            config["lsh_bits"] = self.lsh_bits
+        if self.history_size:
+            config["history_size"] = self.history_size
         return config
 
     def add_sentences(self, sentences=None, weights=None, max_weight=None):
@@ -56,12 +76,12 @@ class WordEmbeddingRandomWalkDiffusionFeedbackGraph(FeedbackStore):
             weights = {}
 
         G = self.G
+        added = {}
         # for (k,v) in weights.items():
         #     G.add_node(k, label=k, concept=k, feedback=[float(v) / float(max_weight)], df= v)
 
         for sentence in sentences:
-            for concept in sentence.concepts:
-                untokenized_concept = sentence.untokenized_concepts[sentence.concepts.index(concept)]
+            for concept, untokenized_concept in concept_occurrences(sentence):
                 # words = unstem_ngram(concept, sentence)
                 words = untokenized_concept.split(" ")
 
@@ -74,7 +94,9 @@ class WordEmbeddingRandomWalkDiffusionFeedbackGraph(FeedbackStore):
                 else:
                     df = 1.0 / float(max_weight)
 
-                G.add_node(concept, label=concept, concept=concept, feedback=[df], df=weights[concept], frozen=False)
+                G.add_node(concept, label=concept, concept=concept, df=weights[concept], frozen=False)
+                added[concept] = df
+        update_node_feedback(self.feedback, G.nodes(), added)
         log.debug("not known in feedbackgraph:", len(set(weights.keys()) - set(G.nodes())), " in G:", len(set(G.nodes())),
               "in total:", len(set(weights.keys())))
         # print("not known in feedbackgraph:", set(weights.keys()) - set(G.nodes()))
@@ -83,17 +105,12 @@ class WordEmbeddingRandomWalkDiffusionFeedbackGraph(FeedbackStore):
             len(self.concept_embedder.cache), self.concept_embedder.errorcount))
 
         # add edges
-        for u in G.nodes():
-            for v in G.nodes():
-                if u is v:
-                    continue
-                sim = 1 - cosine(self.vectors[u], self.vectors[v])
-                if sim > self.cut_off_threshold:
-                    G.add_edge(u, v, similarity=sim, dissimilarity=1 - sim)
+        add_similarity_edges(G, self.vectors, self.cut_off_threshold, neighbors=self.neighbors,
+                             lsh_tables=self.lsh_tables, lsh_bits=self.lsh_bits)
         # self.pr = nx.pagerank(G, weight="similarity")
 
         # initial graph stats
-        print_graph_stats(G, "WordEmbeddingRandomWalkDiffusionFeedbackGraph")
+        print_graph_stats(G, "WordEmbeddingRandomWalkDiffusionFeedbackGraph", feedback=self.feedback)
 
         # dump_details(G)
 
@@ -128,8 +145,9 @@ class WordEmbeddingRandomWalkDiffusionFeedbackGraph(FeedbackStore):
         """
 
         G = self.G
+        feedback = self.feedback
         log.debug("Starting from node '%s' (%s) with distributable total mass of %s with %s walks" % (
-            focus_node, G.node[focus_node]["feedback"], mass, num_iteration))
+            focus_node, feedback[focus_node], mass, num_iteration))
         mass = float(mass) / float(num_iteration)
         threshold = float(abort_thres) / float(num_iteration)
         for _ in range(num_iteration):
@@ -142,19 +160,19 @@ class WordEmbeddingRandomWalkDiffusionFeedbackGraph(FeedbackStore):
                     target_node = self.__choose_random_successor__(source_node)
                 except:
                     # no distribution possible. incorporate all feedback locally.
-                    source_mass = G.node[source_node]["feedback"][-1:][0]
+                    source_mass = feedback[source_node]
                     if not self.is_frozen(source_node):
-                        G.node[source_node]["feedback"].append(source_mass + distributable_mass)
+                        feedback[source_node] = source_mass + distributable_mass
                         log.debug("no neighbors: %s (%s + %s)" % (source_node, source_mass, distributable_mass))
                     break
 
                 # retain the mass in the current source node
-                source_mass = G.node[source_node]["feedback"][-1:][0]
+                source_mass = feedback[source_node]
 
                 mass_addable_to_source = distributable_mass / 2
                 if not self.is_frozen(source_node):
                     log.debug("       Not frozen")
-                    G.node[source_node]["feedback"].append(source_mass + mass_addable_to_source)
+                    feedback[source_node] = source_mass + mass_addable_to_source
                 else:
                     log.debug("           Frozen")
 
@@ -193,11 +211,8 @@ class WordEmbeddingRandomWalkDiffusionFeedbackGraph(FeedbackStore):
 
         # find the maximum feedback
 
-        for (n, d) in G.nodes(data=True):
-            if len(d["feedback"]) == 0:
-                yield (n, 0.0)
-            else:
-                yield (n, d["feedback"][-1:][0])
+        for n in G.nodes_iter():
+            yield (n, float(self.feedback[n]))
 
                 # avg = np.average(d["feedback"])
                 # mx = max(d["feedback"])
@@ -218,10 +233,19 @@ class WordEmbeddingRandomWalkDiffusionFeedbackGraph(FeedbackStore):
                 # for (k, v) in pr.iteritems():
                 #     yield (k, float(v / max_pagerank))
 
+    def get_state(self, vocabulary):
+        return get_node_feedback_state(self.G, self.feedback, vocabulary)
+
+    def set_state(self, concepts, state):
+        set_node_feedback_state(self.G, self.feedback, concepts, state)
+
+    def __setstate__(self, state):
+        set_pickled_graph_state(self, state)
+
     def freeze_node(self, item, weight):
         g = self.G
         g.node[item]["frozen"] = True
-        g.node[item]["feedback"].append(weight)
+        self.feedback[item] = weight
 
     def is_frozen(self, item):
         return self.G.node[item]["frozen"]
@@ -7,11 +7,25 @@ import time
 import logging
 import networkx as nx
 import numpy as np
+import scipy.sparse as sp
 
+from algorithms.feedback.FeedbackHistory import FeedbackHistory
+from algorithms.feedback.lsh import RandomProjectionIndex
 from utils.writer import write_to_file
 
+SIMILARITY_BLOCK_ELEMENTS = 2 ** 22
+""" upper bound for the number of similarities that are computed at once while building the similarity graph """
+RECALL_SAMPLE_SIZE = 200
+""" number of nodes on which the recall of the approximate similarity graph is checked """
 
-def print_graph_stats(G, class_type=None):
+similarity_cache = None
+""" SimilarityCache which is used by similarity_adjacency, see set_similarity_cache """
+
+
+def print_graph_stats(G, class_type=None, feedback=None):
+    """
+    :param feedback: FeedbackHistory of the nodes, if they do not have a feedback attribute
+    """
     stats = {}
     g = stats["graph"] = {}
     if class_type is not None:
@@ -69,7 +83,10 @@ def print_graph_stats(G, class_type=None):
     dfs = []
     for (n, d) in G.nodes(data=True):
         dfs.append(d["df"])
-        feedbacks.append(d["feedback"][-1:][0])
+        if feedback is not None:
+            feedbacks.append(feedback[n])
+        else:
+            feedbacks.append(d["feedback"][-1:][0])
 
     (fha, fhb) = np.histogram(feedbacks, bins="sturges")
     g["feedbacks_histogram"] = {
@@ -128,4 +145,338 @@ def dump_details(G):
 
 
 def rescale_thing(arr):
-    return int(float(max(arr) - min(arr)) / float(min(5, max(arr)))) + 1
\ No newline at end of file
+    return int(float(max(arr) - min(arr)) / float(min(5, max(arr)))) + 1
+
+def update_node_feedback(feedback, nodes, added):
+    """
+        sets the nodes of a FeedbackHistory after nodes have been added to a feedback graph. Added nodes start with their
+        initial feedback (also if they have been known before, like after G.add_node), the others keep their feedback.
+
+    :param nodes: all nodes of the graph, in the order of the ids
+    :param added: dict node -> initial feedback
+    """
+    feedback.set_nodes(nodes, [added[n] if n in added else feedback[n] for n in nodes])
+
+
+def set_pickled_graph_state(store, state):
+    """
+        restores the unpickled __dict__ of a networkx based feedback graph. Graphs pickled before FeedbackHistory have
+        no feedback attribute, but a "feedback" list of all values in each node; the last value becomes the feedback
+        of the node. Attributes which the older graphs did not have get their defaults.
+    """
+    store.__dict__.update(state)
+    for name in ("neighbors", "lsh_tables", "lsh_bits"):
+        store.__dict__.setdefault(name, None)
+    if "feedback" not in state:
+        store.history_size = 0
+        store.feedback = FeedbackHistory(0)
+        nodes = []
+        values = []
+        for (n, d) in store.G.nodes_iter(data=True):
+            nodes.append(n)
+            values.append((d.pop("feedback", None) or [0.0])[-1])
+        store.feedback.set_nodes(nodes, values)
+
+
+def concept_occurrences(sentence):
+    """
+        the (concept, untokenized concept) pairs of the sentence, in the order of sentence.concepts. A concept which
+        occurs more than once always gets the untokenized form of its first occurrence, like
+        sentence.untokenized_concepts[sentence.concepts.index(concept)]. The lists are read only once, as the
+        SentenceViews decode them from their store on each access.
+    """
+    concepts = sentence.concepts
+    first = {}
+    for concept, untokenized_concept in zip(concepts, sentence.untokenized_concepts):
+        first.setdefault(concept, untokenized_concept)
+    return [(concept, first[concept]) for concept in concepts]
+
+
+def get_node_feedback_state(G, feedback, vocabulary):
+    """
+        the current feedback and the frozen flags of all nodes of a feedback graph, as flat arrays.
+
+        The arrays have the layout of a feedback history per node (the values of node i are
+        feedback[feedback_offsets[i]:feedback_offsets[i + 1]]), with the current value as the only entry, so that
+        snapshots written with the former per-node feedback lists can still be restored.
+
+    :param feedback: FeedbackHistory of the graph
+    :param vocabulary: ConceptVocabulary, extended by the unknown nodes
+    :return: dict str -> np.ndarray
+    """
+    nodes = []
+    values = []
+    frozen = []
+    for (n, d) in G.nodes_iter(data=True):
+        nodes.append(vocabulary.add(n))
+        values.append(feedback[n])
+        frozen.append(d["frozen"])
+    return {
+        "nodes": np.array(nodes, dtype=np.int32),
+        "feedback": np.array(values, dtype=np.float64),
+        "feedback_offsets": np.arange(len(nodes) + 1, dtype=np.int64),
+        "frozen": np.array(frozen, dtype=np.bool_)
+    }
+
+
+def set_node_feedback_state(G, feedback, concepts, state):
+    """
+        restores the state returned by get_node_feedback_state, the last value of each node becomes its feedback
+    """
+    offsets = state["feedback_offsets"]
+    values = state["feedback"]
+    for i, concept_id in enumerate(state["nodes"]):
+        n = concepts[concept_id]
+        # restoring is not an update, so the values are not recorded in the history
+        if offsets[i + 1] > offsets[i]:
+            feedback.values[feedback.ids[n]] = values[offsets[i + 1] - 1]
+        else:
+            feedback.values[feedback.ids[n]] = 0.0
+        G.node[n]["frozen"] = bool(state["frozen"][i])
+
+
+def normalize_rows(matrix):
+    """
+        scales the rows to unit length. Rows of zeros (concepts without any known word) stay zero.
+
+    :return: (normalized matrix, boolean mask of the non-zero rows)
+    """
+    norms = np.sqrt(np.einsum("ij,ij->i", matrix, matrix))
+    nonzero = norms > 0
+    normalized = np.zeros_like(matrix, dtype=np.float64)
+    normalized[nonzero] = matrix[nonzero] / norms[nonzero, np.newaxis]
+    return normalized, nonzero
+
+
+def similarity_matrix(matrix, cut_off_threshold, block_elements=SIMILARITY_BLOCK_ELEMENTS, neighbors=None,
+                      rows=None):
+    """
+        the cosine similarities between the rows of the matrix which are larger than cut_off_threshold, excluding the
+        diagonal. The similarities are computed in blocks of rows, so that no dense V x V matrix is allocated.
+
+    :param matrix: V x d matrix of the concept vectors
+    :param block_elements: maximum number of similarities per block
+    :param neighbors: keep only the k most similar concepts per row
+    :param rows: only compute the similarities of these rows (e.g. a sample), defaults to all rows
+    :return: scipy.sparse.csr_matrix V x V
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    V = matrix.shape[0]
+    if V == 0:
+        return sp.csr_matrix((0, 0), dtype=np.float64)
+    normalized, nonzero = normalize_rows(matrix)
+    if rows is None:
+        rows = np.arange(V)
+    block_size = max(1, block_elements // V)
+
+    result_rows = []
+    result_cols = []
+    data = []
+    for start in range(0, len(rows), block_size):
+        block = rows[start:start + block_size]
+        sims = normalized[block].dot(normalized.T)
+        # zero vectors have an undefined similarity, and a concept is not its own neighbor
+        selected = sims > cut_off_threshold
+        selected[:, ~nonzero] = False
+        selected[~nonzero[block], :] = False
+        selected[np.arange(len(block)), block] = False
+
+        if neighbors is not None and neighbors < V:
+            ranked = np.argpartition(-np.where(selected, sims, -np.inf), neighbors - 1, axis=1)[:, :neighbors]
+            top = np.zeros_like(selected)
+            top[np.arange(len(block))[:, np.newaxis], ranked] = True
+            selected &= top
+
+        r, c = np.nonzero(selected)
+        result_rows.append(block[r])
+        result_cols.append(c)
+        data.append(sims[r, c])
+
+    return sp.csr_matrix((np.concatenate(data), (np.concatenate(result_rows), np.concatenate(result_cols))),
+                         shape=(V, V))
+
+
+def approximate_similarity_matrix(matrix, cut_off_threshold, neighbors=None, tables=8, bits=12, seed=0):
+    """
+        like similarity_matrix, but only compares concepts which are candidates of each other according to a
+        random-projection LSH index (see algorithms.feedback.lsh). Some of the similar pairs are missed.
+
+    :return: scipy.sparse.csr_matrix V x V
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    V = matrix.shape[0]
+    if V == 0:
+        return sp.csr_matrix((0, 0), dtype=np.float64)
+    normalized, nonzero = normalize_rows(matrix)
+    index = RandomProjectionIndex(normalized, tables=tables, bits=bits, seed=seed)
+
+    indptr = [0]
+    indices = []
+    data = []
+    for i in range(V):
+        if nonzero[i]:
+            cols, sims = index.neighbors(i, cut_off_threshold, neighbors)
+            keep = nonzero[cols]
+            indices.append(cols[keep])
+            data.append(sims[keep])
+            indptr.append(indptr[-1] + int(keep.sum()))
+        else:
+            indptr.append(indptr[-1])
+
+    return sp.csr_matrix((np.concatenate(data) if data else np.zeros(0),
+                          np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64),
+                          np.array(indptr)), shape=(V, V))
+
+
+def similarity_recall(exact, approximate, rows=None):
+    """
+        the share of the edges of the exact similarity matrix (in the given rows) that the approximate one contains.
+    """
+    exact = exact.tocsr()
+    approximate = approximate.tocsr()
+    if rows is None:
+        rows = np.arange(exact.shape[0])
+    found = 0
+    total = 0
+    for i in rows:
+        expected = exact.indices[exact.indptr[i]:exact.indptr[i + 1]]
+        actual = approximate.indices[approximate.indptr[i]:approximate.indptr[i + 1]]
+        found += len(np.intersect1d(expected, actual))
+        total += len(expected)
+    if total == 0:
+        return 1.0
+    return float(found) / total
+
+
+class SimilarityCache(object):
+    """
+    Keeps the exact similarity adjacencies of node sets, so that feedback graphs over the same concepts (e.g. the
+    configurations of a grid search) do not compute them again. An adjacency also answers the requests with a higher
+    cut-off threshold, by dropping the edges below it.
+
+    The nodes are the key, so the vectors of the nodes must not change while the cache is used.
+    """
+
+    def __init__(self):
+        self.adjacencies = {}
+        """ tuple of nodes -> (cut-off threshold, adjacency) """
+
+    def __len__(self):
+        return len(self.adjacencies)
+
+    def get(self, nodes, cut_off_threshold):
+        """
+        :return: scipy.sparse.csr_matrix, or None if no adjacency with a lower or equal threshold is known
+        """
+        cached = self.adjacencies.get(tuple(nodes))
+        if cached is None or cached[0] > cut_off_threshold:
+            return None
+        threshold, adjacency = cached
+        if threshold == cut_off_threshold:
+            return adjacency
+        keep = adjacency.data > cut_off_threshold
+        rows = np.repeat(np.arange(adjacency.shape[0]), np.diff(adjacency.indptr))
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(rows[keep], minlength=adjacency.shape[0]))])
+        return sp.csr_matrix((adjacency.data[keep], adjacency.indices[keep], indptr), shape=adjacency.shape)
+
+    def put(self, nodes, cut_off_threshold, adjacency):
+        key = tuple(nodes)
+        cached = self.adjacencies.get(key)
+        if cached is None or cached[0] > cut_off_threshold:
+            self.adjacencies[key] = (cut_off_threshold, adjacency)
+
+
+def set_similarity_cache(cache):
+    """
+        makes similarity_adjacency use the cache (None disables it). Only exact adjacencies are cached, i.e. those
+        without the neighbors and lsh settings. Processes which are forked afterwards share the cached adjacencies,
+        other worker processes have to be passed get_similarity_cache().
+    """
+    global similarity_cache
+    similarity_cache = cache
+
+
+def get_similarity_cache():
+    return similarity_cache
+
+
+def similarity_adjacency(nodes, vectors, cut_off_threshold, block_elements=SIMILARITY_BLOCK_ELEMENTS, neighbors=None,
+                         lsh_tables=None, lsh_bits=None, recall_sample=RECALL_SAMPLE_SIZE):
+    """
+        the similarity matrix of the vectors of the nodes, see add_similarity_edges.
+
+    :param nodes: list of nodes, the rows and columns of the matrix
+    :param vectors: dict node -> vector
+    :return: scipy.sparse.csr_matrix V x V
+    """
+    cache = similarity_cache if neighbors is None and not lsh_tables else None
+    if cache is not None:
+        adjacency = cache.get(nodes, cut_off_threshold)
+        if adjacency is not None:
+            return adjacency
+
+    matrix = np.array([vectors[n] for n in nodes])
+    if lsh_tables:
+        adjacency = approximate_similarity_matrix(matrix, cut_off_threshold, neighbors=neighbors, tables=lsh_tables,
+                                                  bits=lsh_bits or 12)
+        sample = np.random.RandomState(0).permutation(len(nodes))[:recall_sample]
+        exact = similarity_matrix(matrix, cut_off_threshold, block_elements, neighbors=neighbors, rows=sample)
+        logging.getLogger("io").info("LSH similarity edges: %s, estimated recall %.3f on %s nodes" % (
+            adjacency.nnz, similarity_recall(exact, adjacency, sample), len(sample)))
+    else:
+        adjacency = similarity_matrix(matrix, cut_off_threshold, block_elements, neighbors=neighbors)
+
+    if cache is not None:
+        cache.put(nodes, cut_off_threshold, adjacency)
+    return adjacency
+
+
+def add_similarity_edges(G, vectors, cut_off_threshold, block_elements=SIMILARITY_BLOCK_ELEMENTS, neighbors=None,
+                         lsh_tables=None, lsh_bits=None, recall_sample=RECALL_SAMPLE_SIZE):
+    """
+        adds an edge u -> v with the attributes similarity and dissimilarity for each pair of nodes, whose vectors have
+        a cosine similarity above cut_off_threshold. Edges are added in the order of G.nodes().
+
+    :param vectors: dict node -> vector
+    :param neighbors: add edges to the k most similar nodes only
+    :param lsh_tables: if set, the neighbors are searched with an LSH index with this many tables and lsh_bits bits,
+        instead of comparing all pairs. The recall against the exact graph is estimated on recall_sample nodes and
+        logged.
+    """
+    nodes = G.nodes()
+    if not nodes:
+        return
+    adjacency = similarity_adjacency(nodes, vectors, cut_off_threshold, block_elements, neighbors=neighbors,
+                                     lsh_tables=lsh_tables, lsh_bits=lsh_bits, recall_sample=recall_sample)
+
+    indptr, indices, data = adjacency.indptr, adjacency.indices, adjacency.data
+    for i, u in enumerate(nodes):
+        G.add_edges_from((u, nodes[j], {"similarity": sim, "dissimilarity": 1 - sim})
+                         for j, sim in zip(indices[indptr[i]:indptr[i + 1]], data[indptr[i]:indptr[i + 1]]))
+
+
+def dict_order(keys):
+    """
+        the positions of the keys in the order in which a dict iterates them, if they are inserted in the given order.
+        networkx stores nodes and neighbors in dicts, so this is e.g. the order of G.successors(u) for edges which have
+        been added to u in the order of keys.
+    """
+    return list(dict((key, i) for i, key in enumerate(keys)).values())
+
+
+def order_like_networkx(adjacency, nodes):
+    """
+        reorders the columns of each row of a CSR matrix, whose columns are in the order in which add_similarity_edges
+        adds the edges, into the order of G.successors(u) of the resulting graph.
+
+    :param nodes: the labels of the rows and columns
+    :return: scipy.sparse.csr_matrix
+    """
+    indptr, indices, data = adjacency.indptr, adjacency.indices.copy(), adjacency.data.copy()
+    for i in range(len(nodes)):
+        start, end = indptr[i], indptr[i + 1]
+        if end - start > 1:
+            order = start + np.array(dict_order([nodes[j] for j in indices[start:end]]))
+            indices[start:end] = indices[order]
+            data[start:end] = data[order]
+    return sp.csr_matrix((data, indices, indptr.copy()), shape=adjacency.shape)
@@ -0,0 +1,52 @@
+import numpy as np
+
+
+class RandomProjectionIndex(object):
+    """
+    Random-projection LSH for the cosine similarity (Charikar, 2002).
+
+    Each of the hash tables assigns the vectors to buckets by the signs of `bits` random projections. Vectors which
+    share a bucket in at least one table are the neighbor candidates of each other; only those are compared exactly.
+    More tables increase the recall, more bits make the buckets smaller (and faster, but less exact).
+    """
+
+    def __init__(self, normalized, tables=8, bits=12, seed=0):
+        """
+        :param normalized: V x d matrix with unit length rows (see normalize_rows)
+        """
+        self.vectors = normalized
+        self.codes = []
+        """ per table: the bucket of each row """
+        self.buckets = []
+        """ per table: dict bucket -> array of rows """
+
+        rnd = np.random.RandomState(seed)
+        powers = 1 << np.arange(bits, dtype=np.int64)
+        for _ in range(tables):
+            planes = rnd.normal(size=(normalized.shape[1], bits))
+            codes = (normalized.dot(planes) > 0).dot(powers)
+            order = np.argsort(codes, kind="mergesort")
+            groups = np.split(order, np.flatnonzero(np.diff(codes[order])) + 1)
+            self.codes.append(codes)
+            self.buckets.append(dict((codes[group[0]], group) for group in groups if len(group)))
+
+    def candidates(self, i):
+        """
+        :return: sorted array of the rows which share a bucket with row i, without i itself
+        """
+        candidates = np.unique(np.concatenate([buckets[codes[i]] for codes, buckets in zip(self.codes, self.buckets)]))
+        return candidates[candidates != i]
+
+    def neighbors(self, i, cut_off_threshold, k=None):
+        """
+            the (at most k) candidates of row i with the highest similarity above cut_off_threshold.
+
+        :return: (array of rows in ascending order, array of similarities)
+        """
+        candidates = self.candidates(i)
+        sims = self.vectors[candidates].dot(self.vectors[i])
+        selected = np.flatnonzero(sims > cut_off_threshold)
+        if k is not None and len(selected) > k:
+            selected = selected[np.argsort(-sims[selected], kind="mergesort")[:k]]
+            selected.sort()
+        return candidates[selected], sims[selected]
@@ -4,6 +4,9 @@ from collections import defaultdict
 from copy import deepcopy
 import pandas as pd
 from math import log
+
+import numpy as np
+from summarizer.algorithms.concept_vocabulary import ConceptVocabulary, ConceptWeights
 from summarizer.algorithms.cost_model import CostModel
 
 # Strategies
@@ -29,21 +32,28 @@ class SentenceRanker(object):
     ValueSortedDict ranks_to_sentences: [{sent_id : metric_value}] where list index corresponds to rank
     dict concept_weights: original concept weights
     k: Parameter that sets how many sentences are fed into ILP
+
+    The concepts of the sentences are also kept as ids of a ConceptVocabulary (sentence_concepts, a flat array with
+    offsets per sentence row), and all_concept_weights mirrors the weights into a vector by id. Each sentence keeps the
+    sum of its concept weights (concept_sums), which is updated by the weight deltas, see apply_weight_changes.
     """
 
-    def __init__(self, sentences, concept_weights, summary_length, k, options):
+    def __init__(self, sentences, concept_weights, summary_length, k, options, vocabulary=None):
         '''
         :param sentences: List of Sentence objects
         :param concept_weights: Dictionary of weights for concept
         :param k: Number of k sentences that is fed into the ILP per feedback iteration
+        :param vocabulary: ConceptVocabulary of the topic, a new one if None
         '''
 
         # Sets sentences_dict, concept_to_sent dict and ranked_to_sent dict
 
+        self.vocabulary = ConceptVocabulary() if vocabulary is None else vocabulary
         if options['strategy'] == STRATIFIED:
             self.all_concept_weights = concept_weights
         else:
-            self.all_concept_weights = deepcopy(concept_weights)  # keep original concept weights
+            # keep original concept weights
+            self.all_concept_weights = ConceptWeights(self.vocabulary, deepcopy(concept_weights))
         self.initialize_sentences(sentences, concept_weights)
 
         self.k = k
@@ -72,37 +82,120 @@ class SentenceRanker(object):
         # Highest value --> first rank
         self.ranks_to_sentences = ValueSortedDict(lambda x: -x)
 
+        self.sentence_rows = {}
+        """ sent_id -> row of the sentence in the arrays below """
+        sentence_concepts = []
+        concept_offsets = [0]
+        lengths = []
+        concept_sums = []
+
         for sent in sentences:
             # Create sentences_dict
             sent_id = (sent.doc_id, sent.position)
             self.sentences_dict[sent_id] = sent
+            concepts = sent.concepts
 
             # Calculate concept density per sentence
             concept_density = 0
-            for concept in sent.concepts:
+            for concept in concepts:
                 concept_density += concept_weights[concept]
                 # Create concept2sent dic
                 self.concept_to_sentences[concept].add(sent_id)
+            concept_sums.append(concept_density)
 
             concept_density /= float(sent.length)
             # create ranks_to_sentences
             self.ranks_to_sentences[sent_id] = concept_density
 
+            self.sentence_rows[sent_id] = len(lengths)
+            if getattr(sent, "store", None) is not None and sent.store.vocabulary is self.vocabulary:
+                # the views of the SentenceStore of the topic already have the ids
+                sentence_concepts.extend(sent.concept_ids.tolist())
+            else:
+                sentence_concepts.extend(self.vocabulary.add(concept) for concept in concepts)
+            concept_offsets.append(len(sentence_concepts))
+            lengths.append(float(sent.length))
+
+        self.sentence_concepts = np.array(sentence_concepts, dtype=np.int32)
+        self.concept_offsets = np.array(concept_offsets, dtype=np.int64)
+        self.sentence_lengths = np.array(lengths, dtype=np.float64)
+        self.concept_sums = np.array(concept_sums, dtype=np.float64)
+
+        # the rows of the sentences of each concept, once per occurrence
+        order = np.argsort(self.sentence_concepts, kind='mergesort')
+        self.occurrence_rows = np.repeat(np.arange(len(lengths)), np.diff(self.concept_offsets))[order]
+        self.occurrence_offsets = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.sentence_concepts, minlength=len(self.vocabulary)),
+                  out=self.occurrence_offsets[1:])
+        # the weights which the concept_sums are based on. A shared vocabulary may also have concepts which are in
+        # none of the sentences.
+        self.sum_weights = np.array([concept_weights.get(c, 0.0) for c in self.vocabulary.concepts], dtype=np.float64)
+
+    def get_weight_vector(self):
+        '''Returns all_concept_weights as vector by concept id.'''
+        if isinstance(self.all_concept_weights, ConceptWeights):
+            return self.all_concept_weights.get_vector()
+        return np.array([self.all_concept_weights.get(c, 0.0) for c in self.vocabulary.concepts], dtype=np.float64)
+
+    def get_concept_ids(self, rows):
+        '''Returns the concept ids of the sentences in the given rows, concatenated in order.'''
+        starts = self.concept_offsets[rows]
+        counts = self.concept_offsets[rows + 1] - starts
+        positions = np.arange(counts.sum()) + np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        return self.sentence_concepts[positions]
+
+    def apply_weight_changes(self):
+        '''Adds the changes of all_concept_weights since the last call to the concept_sums of the sentences with the
+            changed concepts.'''
+        n = len(self.sum_weights)
+        weights = self.get_weight_vector()[:n]
+        changed = np.flatnonzero(weights != self.sum_weights)
+        if len(changed) == 0:
+            return
+        starts = self.occurrence_offsets[changed]
+        counts = self.occurrence_offsets[changed + 1] - starts
+        positions = np.arange(counts.sum()) + np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        np.add.at(self.concept_sums, self.occurrence_rows[positions],
+                  np.repeat(weights[changed] - self.sum_weights[changed], counts))
+        self.sum_weights[changed] = weights[changed]
+
+    def compute_densities(self, rows):
+        '''Returns the concept density of the sentences in the given rows, summed from scratch. The weights of a
+            sentence are added one concept after the other, like in initialize_sentences, so that the densities are
+            exactly the same.'''
+        weights = self.get_weight_vector()
+        starts = self.concept_offsets[rows]
+        counts = self.concept_offsets[rows + 1] - starts
+        densities = np.zeros(len(rows), dtype=np.float64)
+        for j in range(counts.max() if len(rows) else 0):
+            active = counts > j
+            densities[active] += weights[self.sentence_concepts[starts[active] + j]]
+        return densities / self.sentence_lengths[rows]
+
     def update_ranking(self, new_accepts, new_rejects, new_implicits):
         ''' Changes top k sentences after feedback based on changed concept weights.'''
         # TODO: implement implicits
         changed_concepts = new_accepts + new_rejects
+        # Affected sentences. A sentence which is affected by several concepts gets the same density each time, and
+        # its position among equal densities is the one of its last update, so it is updated once, in that order.
+        last_update = {}
+        n = 0
         for concept in changed_concepts:
-            # Update affected sentences
             for sent_id in self.concept_to_sentences[concept]:
-                sentence = self.sentences_dict[sent_id]
-                concept_density = 0
-                for c in sentence.concepts:
-                    concept_density += self.all_concept_weights[c]
-
-                concept_density /= float(sentence.length)
-
-                # Update the metric and rank
+                last_update[sent_id] = n
+                n += 1
+        sent_ids = sorted(last_update, key=last_update.get)
+
+        if sent_ids:
+            self.apply_weight_changes()
+            rows = np.array([self.sentence_rows[sent_id] for sent_id in sent_ids], dtype=np.int64)
+            densities = (self.concept_sums[rows] / self.sentence_lengths[rows]).tolist()
+
+            # Update the metric and rank: remove all affected sentences, then insert them in the order of their last
+            # update. ValueSortedDict.update would re-sort all sentences and lose the order among equal densities.
+            for sent_id in sent_ids:
+                del self.ranks_to_sentences[sent_id]
+            for sent_id, concept_density in zip(sent_ids, densities):
                 self.ranks_to_sentences[sent_id] = concept_density
 
         for concept in new_accepts:
@@ -118,6 +211,34 @@ class SentenceRanker(object):
             self.all_concept_weights[key] = value
         return
 
+    def get_state(self, vocabulary):
+        '''Returns the ranks, k and the feedback related sets as dict name -> numpy array, for the session snapshots.
+            The concept weights are not part of the state. Concepts are ids of the given ConceptVocabulary.
+            '''
+        ranked = list(self.ranks_to_sentences.items())
+        seen = sorted(self.seen_sentences)
+        state = {
+            "ranked_sentences": np.array([sent_id for sent_id, _ in ranked], dtype=np.int64).reshape(-1, 2),
+            "densities": np.array([density for _, density in ranked], dtype=np.float64),
+            "seen_sentences": np.array(seen, dtype=np.int64).reshape(-1, 2),
+            "important_concepts": vocabulary.to_ids(self.important_concepts, add=True),
+            "k": np.array(self.k)
+        }
+        if hasattr(self, "k_history"):
+            state["k_history"] = np.array(self.k_history)
+        return state
+
+    def set_state(self, concepts, state):
+        '''Restores the state returned by get_state into a ranker that has been set up with the same sentences.'''
+        self.ranks_to_sentences.clear()
+        for sent_id, density in zip(state["ranked_sentences"], state["densities"]):
+            self.ranks_to_sentences[(int(sent_id[0]), int(sent_id[1]))] = float(density)
+        self.seen_sentences = set((int(d), int(p)) for d, p in state["seen_sentences"])
+        self.important_concepts = set(concepts[i] for i in state["important_concepts"])
+        self.k = state["k"].item()
+        if "k_history" in state:
+            self.k_history = state["k_history"].tolist()
+
     def filter_concepts_of_top_k_sentences(self, new_accepts=[], new_rejects=[], k=None, sentences=None):
         ''' This method aggregates all relevant concepts based on top k sents and returns those.
             The ILP should only receive those concepts that are also in the subset of sentences
@@ -130,10 +251,14 @@ class SentenceRanker(object):
         if sentences is None:
             sentences = self.get_top_k_sentences(k)
 
+        # the concepts in the order of their first occurrence, which gives the dict the same order as inserting them
+        # sentence by sentence
+        rows = np.array([self.sentence_rows[(sent.doc_id, sent.position)] for sent in sentences], dtype=np.int64)
+        concept_ids = self.get_concept_ids(rows)
+        _, first = np.unique(concept_ids, return_index=True)
         concept_weights = {}
-        for sent in sentences:
-            for concept in sent.concepts:
-                concept_weights[concept] = self.all_concept_weights[concept]
+        for concept in self.vocabulary.to_concepts(concept_ids[np.sort(first)].tolist()):
+            concept_weights[concept] = self.all_concept_weights[concept]
 
         if new_accepts + new_rejects:
             for concept in new_accepts + new_rejects:
@@ -9,14 +9,15 @@ from abc import ABCMeta, abstractmethod
 from algorithms.feedback.BaselineFeedbackStore import BaselineFeedbackStore
 from algorithms.oracle.OldOracle import OldOracle
 from algorithms.sentence_ranker import SentenceRanker
+from algorithms.topic_artifacts import artifact_key
 sys.path.append(path.dirname(path.dirname(path.dirname(path.abspath(__file__)))))
 
 import tempfile
+import time
 from sets import Set
 import logging
 
 import numpy as np
-import pulp
 from nltk.corpus import stopwords
 from nltk.stem.snowball import SnowballStemmer
 from nltk.stem import WordNetLemmatizer
@@ -25,8 +26,12 @@ from sklearn import svm
 from algorithms.flight_recorder import FlightRecorder
 from summarizer.baselines import sume
 from summarizer.baselines.sume_wrap import SumeWrap
+from summarizer.baselines.sume.sentence_store import SentenceStore
+from summarizer.algorithms.concept_vocabulary import ConceptWeights
 from summarizer.utils.data_helpers import prune_ngrams, extract_ngrams2, get_parse_info, \
     prune_phrases
+from summarizer.baselines.sume.models.presolve import IlpPresolve
+from summarizer.utils.ilp_solvers import get_solver
 
 from constants import *
 import copy
@@ -181,12 +186,16 @@ class ISentenceUnwrapper():
 
 
 class SimulatedFeedback():
+    SUMMARY_ILP_SHARE = 0.5
+    """ share of deadline_ms for the summary ILP of an iteration, the joint feedback ILP gets the rest """
+
     def __init__(self, language, rouge, embeddings=None, svm_fvector=None, ngrams_size=2, top_n=100,
                  dump_base_dir=tempfile.mkdtemp(prefix="simufee-"), recommender=None, oracle=None, docs=None,
                  models=None, summary_length=None, oracle_type=None, ub_score=None,
                  ub_summary=None, parser_type=None, parse_info=None, max_iteration_count=25,
                  flightrecorder=None, magic_stats=False, feedbackstore=None, solver='cplex',
-                 k=0.1, adaptive_window_size=None, run_config={}, sweep_threshold=1, clusters=None):
+                 k=0.1, adaptive_window_size=None, run_config={}, sweep_threshold=1, clusters=None,
+                 incremental_ilp=True, artifact_cache=None, deadline_ms=None, summary_method=SUMMARY_METHOD_ILP):
 
         self.language = language  # document language. relevant for stemmer, embeddings, stopwords, parsing
         sumewrap = SumeWrap(
@@ -236,32 +245,26 @@ class SimulatedFeedback():
 
         # TODO move into actual summarizer class (?)
         # initialization of the self.new_summarizer instance
-        self.summarizer.sentences = sumewrap.load_sume_sentences(docs, parser_type, parse_info)
-
-        # extract bigrams as concepts
-        if parser_type == PARSE_TYPE_PARSE:
-            log.debug('Get concept types Phrases')
-            self.summarizer.extract_ngrams2(concept_type='phrase')
-        if parser_type == None or parser_type=='ngram':
-            log.debug('Get concept types ngrams')
-            self.summarizer.extract_ngrams2(concept_type='ngrams')
-
-        # compute document frequency as concept weights
-        self.summarizer.compute_document_frequency()
-        self.summarizer.compute_word_frequency()
-
-        # from all concepts that are going to be pruned, keep only those that also appear elsewhere
-        log.debug('Total concepts before sentence pruning: %s' % (len(self.summarizer.weights)))
-        old_sentences = self.summarizer.sentences
-        self.summarizer.prune_sentences(remove_citations=True, remove_redundancy=True, imp_list=[])
-        retained_concepts = [concept for s in self.summarizer.sentences for concept in s.concepts]
-        for sentence in Set(old_sentences).difference(self.summarizer.sentences):
-            for concept in sentence.concepts:
-                if concept not in retained_concepts and self.summarizer.weights.has_key(concept):
-                    del self.summarizer.weights[concept]
-        log.debug('Total concepts found: %s ' % (len(self.summarizer.weights)))
-
-        self.summarizer.all_sentences = copy.deepcopy(self.summarizer.sentences)
+        artifacts_key = artifacts = None
+        if artifact_cache is not None and not parse_info:
+            artifacts_key = artifact_key(docs, self.language, parser_type or 'ngram')
+            artifacts = artifact_cache.load(artifacts_key)
+            if artifacts is not None:
+                artifacts.apply(self.summarizer)
+                log.debug('Total concepts found: %s ' % (len(self.summarizer.weights)))
+        if artifacts is None:
+            self.__load_sentences__(sumewrap, docs, parser_type, parse_info)
+            # the sentences are not modified from here on, keep them in a compact columnar store. Its concept ids are
+            # the ones of the vocabulary of the topic, which is shared by everything that keeps concepts as ids.
+            self.summarizer.sentences = SentenceStore.from_sentences(self.summarizer.sentences,
+                                                                     self.summarizer.concept_vocabulary).views()
+            self.summarizer.weights = ConceptWeights(self.summarizer.concept_vocabulary, self.summarizer.weights)
+            if artifacts_key is not None:
+                artifact_cache.store(artifacts_key, self.summarizer, language=self.language,
+                                     concept_type=parser_type or 'ngram', n=2)
+
+        # the views are read-only, so all_sentences does not need a copy of them
+        self.summarizer.all_sentences = list(self.summarizer.sentences)
         self.summarizer.all_weights = copy.deepcopy(self.summarizer.weights)
         # TODO move to other classes: ##################################################################################
 
@@ -316,6 +319,7 @@ class SimulatedFeedback():
         # self.summarizer.prune_sentences(remove_citations=False, remove_redundancy=True, imp_list=[])
 
         # create the coocurence graph
+        self.feedbackstore.set_vocabulary(self.summarizer.concept_vocabulary)
         self.feedbackstore.add_sentences(sentences=self.summarizer.sentences,
                                          weights=self.summarizer.weights,
                                          max_weight=self.MAX_WEIGHT)
@@ -327,12 +331,46 @@ class SimulatedFeedback():
                                                      ref_ngrams=self.scorer.ref_ngrams)
 
         self.solver = solver or 'glpk'
+        self.incremental_ilp = incremental_ilp  # keep the ILP model alive between the feedback iterations
+        self.deadline_ms = deadline_ms  # time budget of the ILPs per iteration, None for solving them to optimality
+        self.ilp_deadline = None  # time.time() by which the ILPs of the running iteration have to be solved
+        self.summary_method = summary_method  # SUMMARY_METHOD_GREEDY or SUMMARY_METHOD_LP replace the exact ILP
 
         log.info('Summarizing %s sentences down to %s words' %
                  (len(self.summarizer.sentences), self.summary_length))
 
     ####################################################################################################################
 
+    def __load_sentences__(self, sumewrap, docs, parser_type, parse_info):
+        """
+            loads the sentences into self.summarizer, extracts the concepts, computes their weights and prunes the
+            sentences. The result can be cached, see TopicArtifactCache.
+        """
+        # extract bigrams as concepts
+        concept_type = None
+        if parser_type == PARSE_TYPE_PARSE:
+            log.debug('Get concept types Phrases')
+            concept_type = 'phrase'
+        if parser_type == None or parser_type=='ngram':
+            log.debug('Get concept types ngrams')
+            concept_type = 'ngrams'
+
+        # load the sentences, extract the concepts and compute document frequency as concept weights in one pass over
+        # the documents, which may be a DocumentStream
+        self.summarizer.load_sentences(sumewrap.iter_sume_sentences(docs, parser_type, parse_info),
+                                       concept_type=concept_type)
+
+        # from all concepts that are going to be pruned, keep only those that also appear elsewhere
+        log.debug('Total concepts before sentence pruning: %s' % (len(self.summarizer.weights)))
+        old_sentences = self.summarizer.sentences
+        self.summarizer.prune_sentences(remove_citations=True, remove_redundancy=True, imp_list=[])
+        retained_concepts = [concept for s in self.summarizer.sentences for concept in s.concepts]
+        for sentence in Set(old_sentences).difference(self.summarizer.sentences):
+            for concept in sentence.concepts:
+                if concept not in retained_concepts and self.summarizer.weights.has_key(concept):
+                    del self.summarizer.weights[concept]
+        log.debug('Total concepts found: %s ' % (len(self.summarizer.weights)))
+
     def get_implicit_feedback(self, summ_ngrams, list_concepts):
         feedback_keys = []
         for key in summ_ngrams:
@@ -388,7 +426,21 @@ class SimulatedFeedback():
         # solve the ilp model
 
 
-        value, subset = self.summarizer.solve_ilp_problem(summary_size=int(summary_length), units="WORDS")
+        if getattr(self, "summary_method", SUMMARY_METHOD_ILP) == SUMMARY_METHOD_GREEDY:
+            value, subset = self.summarizer.lazy_greedy_approximation(summary_size=int(summary_length), units="WORDS")
+        elif getattr(self, "summary_method", SUMMARY_METHOD_ILP) == SUMMARY_METHOD_LP:
+            value, subset = self.summarizer.solve_lp_rounding_problem(summary_size=int(summary_length), units="WORDS")
+        elif getattr(self, "deadline_ms", None):
+            value, subset = self.summarizer.solve_anytime_ilp_problem(summary_size=int(summary_length), units="WORDS",
+                                                                      deadline_ms=self.deadline_ms *
+                                                                      self.SUMMARY_ILP_SHARE,
+                                                                      solver=self.solver)
+        elif getattr(self, "incremental_ilp", False):
+            value, subset = self.summarizer.solve_incremental_ilp_problem(summary_size=int(summary_length),
+                                                                          units="WORDS", solver=self.solver)
+        else:
+            value, subset = self.summarizer.solve_ilp_problem(summary_size=int(summary_length), units="WORDS",
+                                                              solver=self.solver)
         summary = [self.summarizer.sentences[j].untokenized_form for j in subset]
 
         summary_text = '\n'.join(summary)
@@ -398,6 +450,19 @@ class SimulatedFeedback():
 
         return summary, score, subset
 
+    def get_alternative_summaries(self, k=3, min_distance=1):
+        """
+            The k best summaries for the current weights, which differ in at least min_distance sentences, so that
+            alternative summaries can be shown to the user. All of them come from one ILP model, see
+            ConceptBasedILPSummarizer.solve_ilp_solution_pool.
+        :param k: the number of summaries
+        :param min_distance: each summary leaves out at least this many sentences of every previous summary
+        :return: list of (summary, subset) tuples: the sentences of the summary and their indices, best first
+        """
+        pool = self.summarizer.solve_ilp_solution_pool(summary_size=int(self.summary_length), units="WORDS", k=k,
+                                                       min_distance=min_distance, solver=self.solver)
+        return [([self.summarizer.sentences[j].untokenized_form for j in subset], subset) for value, subset in pool]
+
     def check_break_condition(self, summary, iteration, max_iteration_count, current_score, prev_score):
         if not self.flight_recorder.latest().accept \
                 and not self.flight_recorder.latest().reject \
@@ -655,16 +720,21 @@ class SimulatedFeedback():
             log.info('## Ranking the subset')
             self.update_sentence_ranking(new_accepts, new_rejects, new_implicits)
 
-        current_summary, current_score, current_summary_sentence_ids = self.get_summary_details(iteration,
-                                                                                                self.summary_length)
-        self.__add_weights_to_history__(self.new_debug_dump_target_dir, iteration)
-        # _, recommendations = self.sentence_unwrapper.unwrap(current_summary_sentence_ids)
-        # samples = self.__convert_subset_to_concepts__(current_summary_sentence_ids, self.new_summarizer,
-        #                                               self.input_parse_type,
-        #                                               self.ref_phrases,
-        #                                               self.ref_ngrams)  # from all samples, use a sub-set
-        # current_summary, current_score, _ = self.get_summary_details(iteration, self.new_input_summary_length)
-        recommendations, recomm_sentence = self.get_recommendations(svm_flag)
+        if getattr(self, "deadline_ms", None):
+            self.ilp_deadline = time.time() + self.deadline_ms / 1000.0
+        try:
+            current_summary, current_score, current_summary_sentence_ids = self.get_summary_details(iteration,
+                                                                                                    self.summary_length)
+            self.__add_weights_to_history__(self.new_debug_dump_target_dir, iteration)
+            # _, recommendations = self.sentence_unwrapper.unwrap(current_summary_sentence_ids)
+            # samples = self.__convert_subset_to_concepts__(current_summary_sentence_ids, self.new_summarizer,
+            #                                               self.input_parse_type,
+            #                                               self.ref_phrases,
+            #                                               self.ref_ngrams)  # from all samples, use a sub-set
+            # current_summary, current_score, _ = self.get_summary_details(iteration, self.new_input_summary_length)
+            recommendations, recomm_sentence = self.get_recommendations(svm_flag)
+        finally:
+            self.ilp_deadline = None
         return current_score, current_summary, current_summary_sentence_ids, recommendations, recomm_sentence
 
     def __print_iteration_info__(self, subset, iteration=-1, text=None, score=(-1.0, -1.0, -1.0), recommendations=None, recommendations_sentences = None):
@@ -693,6 +763,7 @@ class SimulatedFeedback():
 
         accepted = fr.latest().accept
         rejected = fr.latest().reject
+        solve_info = getattr(self.summarizer, "solve_info", None) or {}
 
         row = [str(iteration), score[0], score[1], score[2], len(accepted), len(rejected),
                '\n'.join(text)]
@@ -712,7 +783,10 @@ class SimulatedFeedback():
             "rejected": list(rejected),
             "reject_count": len(rejected),
             "summary": text,
-            "requested_feedback_recommendations": list(set(recommendations))
+            "requested_feedback_recommendations": list(set(recommendations)),
+            "solver": solve_info.get("solver"),
+            "gap": solve_info.get("gap"),
+            "presolve": solve_info.get("presolve")
         })
 
     def __add_weights_to_history__(self, dump_dir=tempfile.mkdtemp(), iteration=0):
@@ -754,15 +828,29 @@ class SimulatedFeedback():
 
         return (Set(recommendations), subset_of_optimal_feedback)
 
+    def __joint_ilp_time_limit__(self):
+        """
+            the time limit of the joint feedback ILP in seconds: what is left of the budget of the running iteration
+            after the summary ILP, or the share of deadline_ms which the summary ILP does not get if no iteration is
+            running. None if the ILPs are solved to optimality.
+        """
+        if not getattr(self, "deadline_ms", None):
+            return None
+        if getattr(self, "ilp_deadline", None) is None:
+            return self.deadline_ms / 1000.0 * (1.0 - self.SUMMARY_ILP_SHARE)
+        return max(self.ilp_deadline - time.time(), 0.001)
+
     def __solve_joint_ilp__(self, feedback, non_feedback, summarizer, summary_length,
-                            uncertainity={}, labels={}, unique=False, excluded_solutions=[], solver='glpk'):
+                            uncertainity={}, labels={}, unique=False, excluded_solutions=[], solver=None,
+                            presolve=True):
         """
         :param summary_length: The size of the backpack. i.e. how many words are allowed in the summary.
         :param feedback:
         :param non_feedback:
         :param unique: if True, an boudin_2015 eq. (5) is applied to enforce a unique solution.
-        :param solver: default glpk
+        :param solver: the solver backend (see utils.ilp_solvers), defaults to self.solver
         :param excluded_solutions:
+        :param presolve: solve the model reduced by IlpPresolve. Not used together with unique.
         :return:
         """
         w = summarizer.weights
@@ -786,40 +874,51 @@ class SimulatedFeedback():
         # concepts = sorted(self.weights, key=self.weights.get, reverse=True)
 
         # formulation of the ILP problem
-        prob = pulp.LpProblem(summarizer.input_directory, pulp.LpMaximize)
+        model = get_solver(solver or self.solver).create_model(summarizer.input_directory)
+        time_limit = self.__joint_ilp_time_limit__()
+        if time_limit is not None and not model.set_time_limit(time_limit):
+            log.warning("the joint ilp cannot keep its time limit of %.3f s" % time_limit)
+
+        if presolve and not unique:
+            # the objective coefficient of each concept, as in the objective functions below
+            coefficients = {}
+            for concept in non_feedback:
+                if labels:
+                    coefficient = w[concept] * (1.0 - u[concept]) * labels[concept]
+                elif uncertainity:
+                    coefficient = w[concept] * u[concept]
+                else:
+                    coefficient = w[concept]
+                coefficients[concept] = coefficients.get(concept, 0) + coefficient
+            if not labels:
+                for concept in feedback:
+                    coefficient = w[concept] * u[concept] if uncertainity else w[concept]
+                    coefficients[concept] = coefficients.get(concept, 0) - coefficient
+
+            reduced = IlpPresolve([set(sentence.concepts) for sentence in summarizer.sentences], coefficients,
+                                  [sentence.length for sentence in summarizer.sentences],
+                                  drop_sentences=not excluded_solutions)
+            log.debug("joint ilp presolve: %s" % reduced.get_reduction())
+            s = reduced.build_model(model, L, excluded_solutions)
+            value = model.solve()
+            return (value, Set([j for j in reduced.sentences if model.is_selected(s[j])]))
 
         # initialize the concepts binary variables
-        nf = pulp.LpVariable.dicts(name='nf',
-                                   indexs=range(NF),
-                                   lowBound=0,
-                                   upBound=1,
-                                   cat='Integer')
-
-        f = pulp.LpVariable.dicts(name='F',
-                                  indexs=range(F),
-                                  lowBound=0,
-                                  upBound=1,
-                                  cat='Integer')
+        nf = model.binary_var_dict('nf', range(NF))
+
+        f = model.binary_var_dict('F', range(F))
 
         # initialize the sentences binary variables
-        s = pulp.LpVariable.dicts(name='s',
-                                  indexs=range(S),
-                                  lowBound=0,
-                                  upBound=1,
-                                  cat='Integer')
+        s = model.binary_var_dict('s', range(S))
 
         # initialize the word binary variables
-        t = pulp.LpVariable.dicts(name='t',
-                                  indexs=range(T),
-                                  lowBound=0,
-                                  upBound=1,
-                                  cat='Integer')
+        t = model.binary_var_dict('t', range(T))
 
         # OBJECTIVE FUNCTION
         if labels:
             # log.debug('solve for Active learning 2')
-            prob += pulp.lpSum(
-                w[non_feedback[i]] * (1.0 - u[non_feedback[i]]) * labels[non_feedback[i]] * nf[i] for i in range(NF))
+            model.maximize(model.sum(
+                w[non_feedback[i]] * (1.0 - u[non_feedback[i]]) * labels[non_feedback[i]] * nf[i] for i in range(NF)))
         if not labels:
             if uncertainity:
                 # log.debug('solve for Active learning')
@@ -827,83 +926,73 @@ class SimulatedFeedback():
                     # In this phase, we force new concepts to be chosen, and not those we already have feedback on, and
                     # therefore non_feedback is added while feedback is substracted from the problem. I.e. by
                     # substracting the feedback, those sentences will disappear from the solution.
-                    prob += pulp.lpSum(w[non_feedback[i]] * u[non_feedback[i]] * nf[i] for i in range(NF)) - pulp.lpSum(
-                        w[feedback[i]] * u[feedback[i]] * f[i] for i in range(F))
+                    model.maximize(model.sum(w[non_feedback[i]] * u[non_feedback[i]] * nf[i] for i in range(NF)) -
+                                   model.sum(w[feedback[i]] * u[feedback[i]] * f[i] for i in range(F)))
                 else:
-                    prob += pulp.lpSum(w[non_feedback[i]] * u[non_feedback[i]] * nf[i] for i in range(NF))
+                    model.maximize(model.sum(w[non_feedback[i]] * u[non_feedback[i]] * nf[i] for i in range(NF)))
             if not uncertainity:
                 # log.debug('solve for ILP feedback')
                 if feedback:
-                    prob += pulp.lpSum(w[non_feedback[i]] * nf[i] for i in range(NF)) - pulp.lpSum(
-                        w[feedback[i]] * f[i] for i in range(F))
+                    model.maximize(model.sum(w[non_feedback[i]] * nf[i] for i in range(NF)) -
+                                   model.sum(w[feedback[i]] * f[i] for i in range(F)))
                 else:
-                    prob += pulp.lpSum(w[non_feedback[i]] * nf[i] for i in range(NF))
+                    model.maximize(model.sum(w[non_feedback[i]] * nf[i] for i in range(NF)))
 
         if unique:
-            prob += pulp.lpSum(w[non_feedback[i]] * nf[i] for i in range(NF)) - pulp.lpSum(w[feedback[i]] * f[i] for i in range(F)) + \
-                    10e-6 * pulp.lpSum(f[tokens[k]] * t[k] for k in range(T))
+            model.maximize(model.sum(w[non_feedback[i]] * nf[i] for i in range(NF)) -
+                           model.sum(w[feedback[i]] * f[i] for i in range(F)) +
+                           10e-6 * model.sum(f[tokens[k]] * t[k] for k in range(T)))
 
         # CONSTRAINT FOR SUMMARY SIZE
-        prob += pulp.lpSum(s[j] * summarizer.sentences[j].length for j in range(S)) <= L
+        model.add_constraint(model.sum(s[j] * summarizer.sentences[j].length for j in range(S)) <= L)
 
         # INTEGRITY CONSTRAINTS
         for i in range(NF):
             for j in range(S):
                 if non_feedback[i] in summarizer.sentences[j].concepts:
-                    prob += s[j] <= nf[i]
+                    model.add_constraint(s[j] <= nf[i])
 
         for i in range(NF):
-            prob += pulp.lpSum(s[j] for j in range(S)
-                        if non_feedback[i] in summarizer.sentences[j].concepts) >= nf[i]
+            model.add_constraint(model.sum(s[j] for j in range(S)
+                                           if non_feedback[i] in summarizer.sentences[j].concepts) >= nf[i])
 
         for i in range(F):
             for j in range(S):
                 if feedback[i] in summarizer.sentences[j].concepts:
-                    prob += s[j] <= f[i]
+                    model.add_constraint(s[j] <= f[i])
 
         for i in range(F):
-            prob += pulp.lpSum(s[j] for j in range(S)
-                        if feedback[i] in summarizer.sentences[j].concepts) >= f[i]
+            model.add_constraint(model.sum(s[j] for j in range(S)
+                                           if feedback[i] in summarizer.sentences[j].concepts) >= f[i])
 
         # WORD INTEGRITY CONSTRAINTS
         if unique:
             for k in range(T):
                 for j in summarizer.w2s[tokens[k]]:
-                    prob += s[j] <= t[k]
+                    model.add_constraint(s[j] <= t[k])
 
             for k in range(T):
-                prob += pulp.lpSum(s[j] for j in summarizer.w2s[tokens[k]]) >= t[k]
+                model.add_constraint(model.sum(s[j] for j in summarizer.w2s[tokens[k]]) >= t[k])
 
         # CONSTRAINTS FOR FINDING OPTIMAL SOLUTIONS
         for sentence_set in excluded_solutions:
-            prob += pulp.lpSum([s[j] for j in sentence_set]) <= len(sentence_set) - 1
-
-        # prob.writeLP('test.lp')
+            model.add_constraint(model.sum([s[j] for j in sentence_set]) <= len(sentence_set) - 1)
 
         # solving the ilp problem
-        try:
-            #print('Solving using CPLEX')
-            prob.solve(pulp.CPLEX(msg=0))
-        except:
-            #print('Fallback to mentioned solver')
-            if solver == 'gurobi':
-                prob.solve(pulp.GUROBI(msg=0))
-            elif solver == 'glpk':
-                prob.solve(pulp.GLPK(msg=0))
-            else:
-                sys.exit('no solver specified')
+        value = model.solve()
 
         # retreive the optimal subset of sentences
-        solution = Set([j for j in range(S) if s[j].varValue == 1])
+        solution = Set([j for j in range(S) if model.is_selected(s[j])])
 
         # returns the (objective function value, solution) tuple
-        return (pulp.value(prob.objective), solution)
+        return (value, solution)
 
     def initialize_sentence_ranking(self):
         self.run_config['adaptive_window_size'] = self.adaptive_window_size
         self.run_config['sweep_threshold'] = self.sweep_threshold
         self.sentence_ranker = SentenceRanker(
-            self.summarizer.sentences, self.summarizer.weights, self.summary_length, self.k, self.run_config)
+            self.summarizer.sentences, self.summarizer.weights, self.summary_length, self.k, self.run_config,
+            vocabulary=self.summarizer.concept_vocabulary)
         self.change_sentence_subset()
 
     def update_sentence_ranking(self, new_accepts=[], new_rejects=[], new_implicits=[]):
@@ -912,6 +1001,48 @@ class SimulatedFeedback():
         self.sentence_ranker.update_ranking(new_accepts, new_rejects, new_implicits)
         self.change_sentence_subset(new_accepts, new_rejects)
 
+    def change_k(self, k):
+        """
+            changes the number of sentences which are passed to the ILP, and re-ranks all sentences if only a subset
+            of the sentences is used.
+        """
+        self.k = k
+        if self.run_config['rank_subset']:
+            self.summarizer.sentences = self.summarizer.all_sentences
+            self.summarizer.weights = self.sentence_ranker.all_concept_weights
+            self.initialize_sentence_ranking()
+
+    def get_concept_weights(self):
+        """
+            the weights of all concepts, i.e. including the ones which are not part of the current sentence subset.
+        :return: dict concept -> weight
+        """
+        if self.run_config['rank_subset']:
+            return self.sentence_ranker.all_concept_weights
+        return self.summarizer.weights
+
+    def replay_feedback(self, records, weight_overrides=None):
+        """
+            Re-applies the given feedback records without solving any ILP, e.g. to restore a session from an earlier
+            state. Afterwards the given weights are set, as the propagation of some feedback stores is randomized.
+
+        :param records: list of Record
+        :param weight_overrides: dict concept -> weight
+        """
+        for record in records:
+            self.flight_recorder.add_record(record)
+            self.recalculate_weights(self.new_oracle_type)
+            if self.run_config['rank_subset']:
+                self.update_sentence_ranking(list(record.accept), list(record.reject), list(record.implicit_reject))
+
+        if weight_overrides:
+            if self.run_config['rank_subset']:
+                latest = self.flight_recorder.latest()
+                self.sentence_ranker.update_weights(weight_overrides)
+                self.change_sentence_subset(list(latest.accept), list(latest.reject))
+            else:
+                self.summarizer.weights.update(weight_overrides)
+
     def change_sentence_subset(self, new_accepts=[], new_rejects=[], new_implicits=[]):
         log.info('Num of sentences %d' % len(self.summarizer.sentences))
         self.summarizer.sentences = self.sentence_ranker.get_input_sentences()
@@ -1005,13 +1136,16 @@ class SimulatedFeedback():
                 if not subset:
                     flag = 1
                     print('Solving regular ILP with flag %s (no subset)' % (flag))
-                    _, subset = summarizer.solve_ilp_problem(summary_size=int(self.summary_length), units="WORDS")
+                    _, subset = summarizer.solve_ilp_problem(summary_size=int(self.summary_length), units="WORDS",
+                                                             solver=self.solver)
             else:
                 print('Solving regular ILP with flag %s (else)' % (flag))
-                _, subset = summarizer.solve_ilp_problem(summary_size=int(self.summary_length), units="WORDS")
+                _, subset = summarizer.solve_ilp_problem(summary_size=int(self.summary_length), units="WORDS",
+                                                         solver=self.solver)
         # elif oracle_type == ORACLE_TYPE_CUSTOM_WEIGHT:
         #     log.debug("oracle == ", ORACLE_TYPE_CUSTOM_WEIGHT)
         else:
             # solve the ilp model
-            _, subset = summarizer.solve_ilp_problem(summary_size=int(self.summary_length), units="WORDS")
+            _, subset = summarizer.solve_ilp_problem(summary_size=int(self.summary_length), units="WORDS",
+                                                     solver=self.solver)
         return subset
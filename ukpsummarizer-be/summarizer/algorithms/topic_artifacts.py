@@ -0,0 +1,206 @@
+"""
+Content-addressed cache of the preprocessed sentences of a topic.
+
+SimulatedFeedback tokenizes all sentences of a topic, extracts the concepts, computes the document and word frequencies
+and prunes the sentences. The result only depends on the documents, the language and the concept extraction, so it is
+stored once per such key and loaded by every later run on the same topic (e.g. the configurations of a grid search):
+
+    <cache_dir>/<key>/
+        header.json         version, key parameters, the list of arrays
+        strings.npy         the tokens, words and texts as one UTF-8 byte blob; the other arrays reference them by
+        strings_offsets.npy index, string i is strings[strings_offsets[i]:strings_offsets[i + 1]]
+        vocabulary.npy      the concepts, in the order of their ids in the ConceptVocabulary of the topic, stored like
+        vocabulary_offsets.npy the strings
+        sentences.npy       (doc_id, position, length, untokenized form) per sentence
+        tokens.npy          the tokens of all sentences, sentence i has tokens[tokens_offsets[i]:tokens_offsets[i + 1]]
+        concepts.npy        the concept ids and the untokenized concepts of all sentences, same layout as the tokens
+        untokenized_concepts.npy
+        weights.npy         (concept id, document frequency)
+        word_frequencies.npy (word, frequency)
+        w2s.npy             the sentence indices of each word of word_frequencies, same layout as the tokens
+
+The key is a hash of the document names and the digests of their sentences, the language, the concept type and n, so a
+changed document gets a new entry. Only topics without parse info are cached.
+"""
+from __future__ import print_function
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from collections import defaultdict
+from os import path
+
+import numpy as np
+
+from summarizer.algorithms.concept_vocabulary import ConceptVocabulary, ConceptWeights
+from summarizer.baselines.sume.sentence_store import SentenceStore
+from model.document_stream import document_digest
+from utils.writer import write_to_file
+
+ARTIFACTS_VERSION = 4
+HEADER_FILE = "header.json"
+
+log = logging.getLogger("TopicArtifacts")
+
+
+def artifact_key(docs, language, concept_type, n=2):
+    """
+    :param docs: list of (filename, list of sentences), as returned by Topic.get_docs, or a DocumentStream. The
+        LazyDocuments of a stream compute their digest in the same scan as their line index and keep their file mapped,
+        so loading the sentences afterwards does not open the files again.
+    """
+    m = hashlib.sha256()
+    m.update(json.dumps([ARTIFACTS_VERSION, language, concept_type, n]))
+    for (f, sentences) in docs:
+        m.update(path.split(f)[1].encode("utf-8"))
+        m.update(document_digest(sentences))
+    return m.hexdigest()
+
+
+def encode_strings(strings):
+    """
+        stores strings as one UTF-8 byte blob plus offsets, instead of a unicode array which pads every string to the
+        longest one.
+
+    :return: (np.ndarray of uint8, np.ndarray of int32 offsets, string i is blob[offsets[i]:offsets[i + 1]])
+    """
+    encoded = [s if isinstance(s, bytes) else s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int32)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def decode_strings(blob, offsets):
+    """
+        the strings stored by encode_strings, as list of unicode strings
+    """
+    data = blob.tobytes()
+    offsets = offsets.tolist()
+    return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+class TopicArtifacts(object):
+    """
+    The state of a ConceptBasedILPSummarizer after loading, concept extraction, frequency computation and pruning.
+    """
+
+    def __init__(self, arrays):
+        """
+        :param arrays: dict name -> np.ndarray, see module description
+        """
+        self.arrays = arrays
+
+    @classmethod
+    def from_summarizer(cls, summarizer):
+        """
+        :param summarizer: its sentences are the views of a SentenceStore on summarizer.concept_vocabulary
+        """
+        store = summarizer.sentences[0].store if summarizer.sentences else \
+            SentenceStore.from_sentences([], summarizer.concept_vocabulary)
+        strings = list(store.strings)
+        ids = dict((string, i) for i, string in enumerate(strings))
+
+        def intern(s):
+            i = ids.get(s)
+            if i is None:
+                i = ids[s] = len(strings)
+                strings.append(s)
+            return i
+
+        vocabulary = summarizer.concept_vocabulary
+        arrays = {
+            "sentences": np.column_stack([store.doc_ids, store.positions, store.lengths, store.forms]).astype(np.int64),
+            "tokens": store.tokens,
+            "tokens_offsets": store.token_offsets,
+            "concepts": store.concepts,
+            "concepts_offsets": store.concept_offsets,
+            "untokenized_concepts": store.untokenized_concepts,
+            "weights": np.array([(vocabulary.add(c), w) for c, w in summarizer.weights.items()],
+                                dtype=np.int64).reshape(-1, 2)
+        }
+        words = list(summarizer.word_frequencies)
+        arrays["word_frequencies"] = np.array([(intern(w), summarizer.word_frequencies[w]) for w in words],
+                                              dtype=np.int64).reshape(-1, 2)
+        w2s = [sorted(summarizer.w2s[w]) for w in words]
+        arrays["w2s_offsets"] = np.concatenate([[0], np.cumsum([len(l) for l in w2s])]).astype(np.int64)
+        arrays["w2s"] = np.array([i for l in w2s for i in l], dtype=np.int64)
+        arrays["strings"], arrays["strings_offsets"] = encode_strings(strings)
+        arrays["vocabulary"], arrays["vocabulary_offsets"] = encode_strings(vocabulary.concepts)
+        return cls(arrays)
+
+    def apply(self, summarizer):
+        """
+            brings a freshly created summarizer into the cached state. The sentences are the views of a SentenceStore
+            on the cached arrays, and the concepts get the same ids in summarizer.concept_vocabulary as when they were
+            stored.
+        """
+        a = self.arrays
+        strings = decode_strings(a["strings"], a["strings_offsets"])
+        vocabulary = summarizer.concept_vocabulary = ConceptVocabulary(decode_strings(a["vocabulary"],
+                                                                                      a["vocabulary_offsets"]))
+        sentences = a["sentences"].astype(np.int32)
+        store = SentenceStore(strings, vocabulary, sentences[:, 0], sentences[:, 1], sentences[:, 2], sentences[:, 3],
+                              a["tokens"], a["tokens_offsets"], a["concepts"], a["untokenized_concepts"],
+                              a["concepts_offsets"])
+        summarizer.sentences = store.views()
+
+        summarizer.weights = ConceptWeights(vocabulary, [(vocabulary.concepts[c], w) for c, w in a["weights"].tolist()])
+        summarizer.word_frequencies = defaultdict(int)
+        summarizer.w2s = defaultdict(set)
+        offsets = a["w2s_offsets"]
+        w2s = a["w2s"]
+        for i, (word, frequency) in enumerate(a["word_frequencies"].tolist()):
+            summarizer.word_frequencies[strings[word]] = frequency
+            summarizer.w2s[strings[word]] = set(w2s[offsets[i]:offsets[i + 1]].tolist())
+        return summarizer
+
+
+class TopicArtifactCache(object):
+    def __init__(self, cache_dir=path.normpath(path.expanduser("~/.ukpsummarizer/cache/artifacts"))):
+        self.cache_dir = cache_dir
+
+    def load(self, key):
+        """
+        :rtype: TopicArtifacts or None, if the key is unknown
+        """
+        location = path.join(self.cache_dir, key)
+        header_file = path.join(location, HEADER_FILE)
+        if not path.isfile(header_file):
+            return None
+        with open(header_file) as fp:
+            header = json.load(fp)
+        if header.get("version") != ARTIFACTS_VERSION:
+            log.info("ignoring topic artifacts %s with version %s" % (key, header.get("version")))
+            return None
+        log.info("loading topic artifacts %s" % (key))
+        return TopicArtifacts(dict((name, np.load(path.join(location, name + ".npy"))) for name in header["arrays"]))
+
+    def store(self, key, summarizer, **parameters):
+        """
+            stores the state of the summarizer under the key. The entry is written to a temporary directory and
+            renamed, so concurrent runs on the same topic never see incomplete entries.
+
+        :param parameters: stored in the header, for information
+        """
+        location = path.join(self.cache_dir, key)
+        if path.isdir(location):
+            return
+        if not path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+        artifacts = TopicArtifacts.from_summarizer(summarizer)
+        tmp = tempfile.mkdtemp(prefix=key + ".", dir=self.cache_dir)
+        try:
+            for name, arr in artifacts.arrays.items():
+                np.save(path.join(tmp, name + ".npy"), arr)
+            header = {"version": ARTIFACTS_VERSION, "key": key, "arrays": sorted(artifacts.arrays)}
+            header.update(parameters)
+            write_to_file(json.dumps(header), path.join(tmp, HEADER_FILE))
+            os.rename(tmp, location)
+            log.info("stored topic artifacts %s" % (key))
+        except OSError:
+            # another process has stored the same entry in the meantime
+            shutil.rmtree(tmp, ignore_errors=True)
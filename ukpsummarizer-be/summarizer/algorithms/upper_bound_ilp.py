@@ -1,4 +1,3 @@
-import pulp
 import numpy as np
 import nltk
 #nltk.download('punkt')
@@ -13,6 +12,7 @@ sys.path.append(path.dirname(path.dirname(path.dirname(path.abspath(__file__))))
 
 from summarizer.utils.data_helpers import extract_ngrams2, prune_ngrams, untokenize
 from summarizer.baselines.sume.base import Sentence
+from summarizer.utils.ilp_solvers import get_solver
 from _summarizer import Summarizer
 from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
@@ -20,7 +20,8 @@ from nltk.stem import WordNetLemmatizer
 sent_detector = LPickle('tokenizers/punkt/english.pickle')
 
 class ExtractiveUpperbound(Summarizer):
-    def __init__(self, language):
+    def __init__(self, language, solver=None):
+        self.solver = solver
         self.sentences = []
         self.docs = []
         self.models = []
@@ -148,31 +149,28 @@ class ExtractiveUpperbound(Summarizer):
                 if self.ref_ngrams[j] in sngrams:
                     A[i][j] = 1
 
+        # Define ILP problem, maximum coverage of grams from the reference summaries
+        model = get_solver(self.solver).create_model("ExtractiveUpperBound")
+
         # Define ILP variable, x_i is 1 if sentence i is selected, z_j is 1 if gram j appears in the created summary
-        x = pulp.LpVariable.dicts('sentences', self.sentences_idx, lowBound=0, upBound=1, cat=pulp.LpInteger)
-        z = pulp.LpVariable.dicts('grams', self.ref_ngrams_idx, lowBound=0, upBound=1, cat=pulp.LpInteger)
+        x = model.binary_var_dict('sentences', self.sentences_idx)
+        z = model.binary_var_dict('grams', self.ref_ngrams_idx)
 
-        # Define ILP problem, maximum coverage of grams from the reference summaries
-        prob = pulp.LpProblem("ExtractiveUpperBound", pulp.LpMaximize)
-        prob += pulp.lpSum(z[j] for j in self.ref_ngrams_idx)
+        model.maximize(model.sum(z[j] for j in self.ref_ngrams_idx))
 
         # Define ILP constraints, length constraint and consistency constraint (impose that z_j is 1 if j
         # appears in the created summary)
-        prob += pulp.lpSum(x[i] * self.sentences[i].length for i in self.sentences_idx) <= self.sum_length
+        model.add_constraint(model.sum(x[i] * self.sentences[i].length for i in self.sentences_idx) <= self.sum_length)
 
         for j in self.ref_ngrams_idx:
-            prob += pulp.lpSum(A[i][j] * x[i] for i in self.sentences_idx) >= z[j]
+            model.add_constraint(model.sum(A[i][j] * x[i] for i in self.sentences_idx) >= z[j])
 
         # Solve ILP problem and post-processing to get the summary
-
-        try:
-            prob.solve(pulp.CPLEX(msg=0))
-        except:
-            prob.solve(pulp.GLPK(msg=0))
+        model.solve()
 
         summary_idx = []
         for idx in self.sentences_idx:
-            if x[idx].value() == 1.0:
+            if model.is_selected(x[idx]):
                 summary_idx.append(idx)
 
         return summary_idx
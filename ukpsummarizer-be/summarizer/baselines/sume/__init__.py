@@ -1,2 +1,3 @@
 from base import *
+from sentence_store import SentenceStore, SentenceView
 from models import *
@@ -33,7 +33,7 @@ class State:
         self.length = 0
         self.score = 0
 
-class Sentence:
+class Sentence(object):
     """The sentence data structure.
 
     Args: 
@@ -42,7 +42,16 @@ class Sentence:
           comes from.
         position (int): the position of the sentence in the source document.
     """
-    def __init__(self, tokens, doc_id, position, phrases = None, dict_tokens_pos=None, raw_phrases=None):
+    __slots__ = ('raw_phrases', 'tokens', 'doc_id', 'position', 'concepts',
+                 'untokenized_concepts', 'untokenized_form', 'length',
+                 'phrases', 'tokens_pos')
+
+    def __init__(self, tokens=None, doc_id=None, position=None, phrases = None, dict_tokens_pos=None, raw_phrases=None):
+        # the defaults are only there for (c)pickle, which calls Sentence() for sentences pickled as instances of the
+        # former old-style class, and then restores their __dict__ with __setstate__
+        if tokens is None:
+            tokens = []
+
         if phrases is None:
             phrases = []
 
@@ -78,6 +87,15 @@ class Sentence:
         
         self.tokens_pos = dict_tokens_pos
 
+    def __getstate__(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        # also restores the __dict__ of sentences pickled before __slots__
+        for name, value in state.items():
+            if name in self.__slots__:
+                setattr(self, name, value)
+
 class LoadFile(object):
     """Objects which inherit from this class have read file functions.
 
@@ -9,17 +9,23 @@
 """
 
 from collections import defaultdict, deque
+import heapq
+import itertools
 import re
 import random
-import sys
+import time
 
 import logging
-import pulp
 from nltk.corpus import stopwords
 from nltk.stem.snowball import SnowballStemmer
 from nltk.stem import WordNetLemmatizer
+from summarizer.algorithms.concept_vocabulary import ConceptVocabulary
 from summarizer.baselines.sume.base import LoadFile, State
+from summarizer.baselines.sume.models.incremental_ilp import IncrementalConceptILP
+from summarizer.baselines.sume.models.lp_relaxation import solve_lp_relaxation
+from summarizer.baselines.sume.models.presolve import IlpPresolve
 from summarizer.utils.data_helpers import prune_ngrams, extract_ngrams2, unstem_ngram
+from summarizer.utils.ilp_solvers import get_solver
 
 log = logging.getLogger("ConceptBasedILPSummarizer")
 class ConceptBasedILPSummarizer(LoadFile):
@@ -55,6 +61,22 @@ class ConceptBasedILPSummarizer(LoadFile):
         self.word_frequencies = defaultdict(int)
         self.w2s = defaultdict(set)
 
+        self.ilp_model = None
+        """ long-lived ILP model, used by solve_incremental_ilp_problem. """
+
+        self.solve_info = None
+        """ {"solver": .., "gap": ..} of the last solve: which method produced the summary and its optimality gap
+            (0.0 if optimal, None if unknown). """
+
+        self.concept_vocabulary = ConceptVocabulary()
+        """ the concept ids of the topic, shared by the SentenceStore of the sentences and the concept weights """
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # pickled before the vocabulary of the topic, the store of the sentences has its own
+        if "concept_vocabulary" not in state:
+            stores = [s.store for s in self.sentences[:1] if hasattr(s, "store")]
+            self.concept_vocabulary = stores[0].vocabulary if stores else ConceptVocabulary()
 
     def extract_ngrams2(self, concept_type='ngrams', n=2):
         """Extract the ngrams of words from the input sentences.
@@ -62,23 +84,27 @@ class ConceptBasedILPSummarizer(LoadFile):
         Args:
             n (int): the number of words for ngrams, defaults to 2
         """
-        for i, sentence in enumerate(self.sentences):
-            untokenized_concepts = []
-            if concept_type == 'ngrams':
-                ngrams = extract_ngrams2([sentence.untokenized_form], self.stemmer, self.LANGUAGE, n)
-                pruned_list = prune_ngrams(ngrams, self.stoplist, n)
-            elif concept_type == 'phrase':
-                pruned_list = self.sentences[i].phrases
-
-            for concept in pruned_list:
-                wrds = unstem_ngram(concept, sentence)
-                untokenized_concepts.append(" ".join(wrds))
-
-            self.sentences[i].concepts = pruned_list
-            self.sentences[i].untokenized_concepts = untokenized_concepts
-            #print(untokenized_concepts)
-            if len(self.sentences[i].concepts) != len(self.sentences[i].untokenized_concepts):
-                raise BaseException("unexpected length difference between concepts and untokenized_concepts")
+        for sentence in self.sentences:
+            self.extract_sentence_ngrams2(sentence, concept_type, n)
+
+    def extract_sentence_ngrams2(self, sentence, concept_type='ngrams', n=2):
+        """Extract the concepts of a single sentence, see extract_ngrams2."""
+        untokenized_concepts = []
+        if concept_type == 'ngrams':
+            ngrams = extract_ngrams2([sentence.untokenized_form], self.stemmer, self.LANGUAGE, n)
+            pruned_list = prune_ngrams(ngrams, self.stoplist, n)
+        elif concept_type == 'phrase':
+            pruned_list = sentence.phrases
+
+        for concept in pruned_list:
+            wrds = unstem_ngram(concept, sentence)
+            untokenized_concepts.append(" ".join(wrds))
+
+        sentence.concepts = pruned_list
+        sentence.untokenized_concepts = untokenized_concepts
+        #print(untokenized_concepts)
+        if len(sentence.concepts) != len(sentence.untokenized_concepts):
+            raise BaseException("unexpected length difference between concepts and untokenized_concepts")
 
     def extract_ngrams(self, n=2):
         """Extract the ngrams of words from the input sentences.
@@ -138,14 +164,44 @@ class ConceptBasedILPSummarizer(LoadFile):
         """Compute the frequency of each word in the set of documents. """
 
         for i, sentence in enumerate(self.sentences):
-            for token in sentence.tokens:
-                t = token.lower()
-                if not re.search('[a-zA-Z0-9]', t) or t in self.stoplist:
-                    continue
-                #t = self.stemmer.stem(t)
-                t = self.stemmer.lemmatize(t)
-                self.w2s[t].add(i)
-                self.word_frequencies[t] += 1
+            self.add_word_frequency(i, sentence)
+
+    def add_word_frequency(self, i, sentence):
+        """Count the words of the i-th sentence, see compute_word_frequency."""
+        for token in sentence.tokens:
+            t = token.lower()
+            if not re.search('[a-zA-Z0-9]', t) or t in self.stoplist:
+                continue
+            #t = self.stemmer.stem(t)
+            t = self.stemmer.lemmatize(t)
+            self.w2s[t].add(i)
+            self.word_frequencies[t] += 1
+
+    def load_sentences(self, sentences, concept_type='ngrams', n=2):
+        """Load the sentences, extract their concepts and compute the document
+        and word frequencies in a single pass, the same as setting
+        self.sentences and calling extract_ngrams2, compute_document_frequency
+        and compute_word_frequency.
+
+        Args:
+            sentences (iterable): the sentences, e.g. a generator over a
+              DocumentStream, which is consumed once
+            concept_type (str): 'ngrams', 'phrase', or None to keep the
+              concepts of the sentences
+        """
+        self.sentences = []
+        for i, sentence in enumerate(sentences):
+            if concept_type is not None:
+                self.extract_sentence_ngrams2(sentence, concept_type, n)
+            for concept in sentence.concepts:
+                if concept not in self.weights:
+                    self.weights[concept] = set([])
+                self.weights[concept].add(sentence.doc_id)
+            self.add_word_frequency(i, sentence)
+            self.sentences.append(sentence)
+
+        for concept in self.weights:
+            self.weights[concept] = len(self.weights[concept])
 
     def prune_sentences(self,
                         mininum_sentence_length=5,
@@ -169,6 +225,8 @@ class ConceptBasedILPSummarizer(LoadFile):
         if imp_list is None:
             imp_list = []
         retained_sentences = []
+        # the tokens of the retained sentences, read once
+        retained_tokens = []
 
         # loop over the sentences
         for i, sentence in enumerate(self.sentences):
@@ -180,7 +238,8 @@ class ConceptBasedILPSummarizer(LoadFile):
                 continue
 
             # prune citations
-            first_token, last_token = sentence.tokens[0], sentence.tokens[-1]
+            tokens = sentence.tokens
+            first_token, last_token = tokens[0], tokens[-1]
 
             if remove_citations and \
                (first_token == u"``" or first_token == u'"' \
@@ -199,8 +258,8 @@ class ConceptBasedILPSummarizer(LoadFile):
             # prune identical and almost identical sentences
             if remove_redundancy:
                 is_redundant = False
-                for prev_sentence in retained_sentences:
-                    if sentence.tokens == prev_sentence.tokens:
+                for prev_tokens in retained_tokens:
+                    if tokens == prev_tokens:
                         is_redundant = True
                         break
 
@@ -209,9 +268,10 @@ class ConceptBasedILPSummarizer(LoadFile):
 
             # otherwise add the sentence to the pruned sentence container
             retained_sentences.append(sentence)
+            retained_tokens.append(tokens)
 
         # from all concepts that are going to be pruned, keep only those that also appear elsewhere
-        retained_concepts = [concept for s in retained_sentences for concept in s.concepts]
+        retained_concepts = set(concept for s in retained_sentences for concept in s.concepts)
 
         for sentence in set(self.sentences).difference(retained_sentences):
             for concept in sentence.concepts:
@@ -296,8 +356,7 @@ class ConceptBasedILPSummarizer(LoadFile):
         """Compute the concept sets for each sentence."""
 
         for i, sentence in enumerate(self.sentences):
-            for concept in sentence.concepts:
-                self.concept_sets[i] |= {concept}
+            self.concept_sets[i] |= frozenset(sentence.concepts)
 
     def greedy_approximation(self, summary_size=100):
         """Greedy approximation of the ILP model.
@@ -324,10 +383,14 @@ class ConceptBasedILPSummarizer(LoadFile):
         # compute indices of our sentences
         sentences = range(len(self.sentences))
 
+        # the concepts of each sentence, read once (SentenceViews decode them
+        # on each access)
+        concept_sets = [set(sentence.concepts) for sentence in self.sentences]
+
         # compute initial weights and fill the reverse index
         # while keeping track of the best singleton solution
         for i, sentence in enumerate(self.sentences):
-            weights[i] = sum(self.weights[c] for c in set(sentence.concepts))
+            weights[i] = sum(self.weights[c] for c in concept_sets[i])
             if sentence.length <= summary_size\
                and weights[i] > best_singleton_score:
                 best_singleton_score = weights[i]
@@ -368,13 +431,13 @@ class ConceptBasedILPSummarizer(LoadFile):
             sel_length -= rev_length
 
             # update sentence weights with the reverse index
-            for concept in set(self.sentences[sentence_index].concepts):
+            for concept in concept_sets[sentence_index]:
                 if concept not in sel_concepts:
                     for sentence in self.c2s[concept]:
                         weights[sentence] -= self.weights[concept]
 
             # update the last selected subset property
-            sel_concepts.update(self.sentences[sentence_index].concepts)
+            sel_concepts.update(concept_sets[sentence_index])
 
         # check if a singleton has a better score than our greedy solution
         if best_singleton_score > sel_score:
@@ -383,6 +446,141 @@ class ConceptBasedILPSummarizer(LoadFile):
         # returns the (objective function value, solution) tuple
         return sel_score, sel_subset
 
+    def lazy_greedy_approximation(self, summary_size=100, units="WORDS",
+                                  partial_enumeration=0):
+        """Greedy approximation of the ILP model with lazy evaluations.
+
+        Selects the same sentences as greedy_approximation, but keeps the
+        sentences in a priority queue by gain / size instead of sorting all of
+        them in every round. As the gain of a sentence can only decrease while
+        sentences are selected (for non-negative weights), a queue entry is
+        only re-evaluated when it reaches the top, and an up to date entry at
+        the top is the best sentence. Sentences that do not fit anymore are
+        dropped from the queue.
+
+        The better of the greedy solution and the best single sentence is a
+        (1 - 1/e) / 2 approximation of the budgeted maximum coverage problem,
+        with partial enumeration of 3 sentences a (1 - 1/e) approximation
+        (Khuller et al., 1999).
+
+        Args:
+            summary_size (int): the maximum size of the summary, defaults to
+              100.
+            units (str): "WORDS" (default) or "CHARACTERS".
+            partial_enumeration (int): k, defaults to 0. If k > 0, all
+              feasible sets of less than k sentences are considered, and the
+              greedy selection is also started from every feasible set of k
+              sentences, i.e. O(S^k) greedy runs.
+
+        Returns:
+            (value, set) tuple (int, list): the value of the approximated
+              objective function and the set of selected sentences as a tuple.
+
+        """
+        # the sentences may have changed since the last call
+        self.c2s = defaultdict(set)
+        self.compute_c2s()
+
+        if units == "CHARACTERS":
+            sizes = [len(sentence.untokenized_form)
+                     for sentence in self.sentences]
+        else:
+            sizes = [sentence.length for sentence in self.sentences]
+
+        # the concepts of each sentence, read once (SentenceViews decode them
+        # on each access)
+        concept_sets = [set(sentence.concepts) for sentence in self.sentences]
+
+        # compute the best singleton
+        best_score, best_subset = 0, set()
+        for i, sentence in enumerate(self.sentences):
+            score = sum(self.weights[c] for c in concept_sets[i])
+            if sizes[i] <= summary_size and score > best_score:
+                best_score, best_subset = score, set([i])
+
+        candidates = [()]
+        if partial_enumeration:
+            feasible = [i for i in range(len(self.sentences))
+                        if sizes[i] <= summary_size]
+            for k in range(1, partial_enumeration + 1):
+                for seed in itertools.combinations(feasible, k):
+                    if sum(sizes[i] for i in seed) > summary_size:
+                        continue
+                    if k == partial_enumeration:
+                        candidates.append(seed)
+                        continue
+                    concepts = set(c for i in seed for c in concept_sets[i])
+                    score = sum(self.weights[c] for c in concepts)
+                    if score > best_score:
+                        best_score, best_subset = score, set(seed)
+
+        for seed in candidates:
+            score, subset = self.__lazy_greedy__(summary_size, sizes,
+                                                 concept_sets, seed)
+            if score > best_score:
+                best_score, best_subset = score, subset
+
+        self.solve_info = {"solver": "lazy-greedy", "gap": None}
+
+        # returns the (objective function value, solution) tuple
+        return best_score, best_subset
+
+    def __lazy_greedy__(self, summary_size, sizes, concept_sets, seed=()):
+        """Greedy selection of lazy_greedy_approximation, starting with the
+        sentences of the seed."""
+        # compute initial weights
+        weights = {}
+        for i in range(len(self.sentences)):
+            weights[i] = sum(self.weights[c] for c in concept_sets[i])
+
+        # initialize the selected solution properties
+        sel_subset, sel_concepts, sel_length, sel_score = set(), set(), 0, 0
+
+        def select(i):
+            sel_subset.add(i)
+            # update sentence weights with the reverse index
+            for concept in concept_sets[i]:
+                if concept not in sel_concepts:
+                    for sentence in self.c2s[concept]:
+                        weights[sentence] -= self.weights[concept]
+            sel_concepts.update(concept_sets[i])
+
+        for i in seed:
+            sel_score += weights[i]
+            sel_length += sizes[i]
+            select(i)
+
+        # the same order as greedy_approximation: gain, reverse size, index
+        queue = [(-weights[i] / float(sizes[i]), sizes[i], -i)
+                 for i in range(len(self.sentences)) if i not in sel_subset]
+        heapq.heapify(queue)
+
+        while queue:
+            neg_gain, size, neg_index = queue[0]
+            i = -neg_index
+
+            # the sentence will never fit again
+            if sel_length + size > summary_size:
+                heapq.heappop(queue)
+                continue
+
+            # outdated entry, re-evaluate it
+            gain = weights[i] / float(size)
+            if gain != -neg_gain:
+                heapq.heapreplace(queue, (-gain, size, neg_index))
+                continue
+
+            # if the gain is null, stop
+            if not weights[i]:
+                break
+
+            heapq.heappop(queue)
+            sel_score += weights[i]
+            sel_length += size
+            select(i)
+
+        return sel_score, sel_subset
+
     def tabu_search(self,
                     summary_size=100,
                     memory_size=10,
@@ -559,33 +757,32 @@ class ConceptBasedILPSummarizer(LoadFile):
             state.score -= weights[sentence_index]
         return state
 
-    def solve_ilp_problem(self,
+    def build_ilp_problem(self,
                           summary_size=100, units="WORDS",
-                          solver='glpk',
                           excluded_solutions=None,
-                          unique=False):
-        """Solve the ILP formulation of the concept-based model.
+                          unique=False,
+                          solver=None):
+        """Build the ILP formulation of the concept-based model.
+
+            The integrity constraints are emitted from the sparse concept to sentences incidence (see compute_c2s),
+            i.e. only for the (concept, sentence) pairs where the concept actually occurs in the sentence.
 
             :param summary_size: the maximum size in words of the summary, defaults to 100.
             :param units: defaults to "WORDS"
-            :param solver: the solver used, defaults to glpk
             :param excluded_solutions: (list of list): a list of subsets of sentences that are to be excluded,
                 defaults to []
             :param unique: (bool): modify the model so that it produces only one optimal solution, defaults to False
+            :param solver: the solver backend the model is built for, see summarizer.utils.ilp_solvers.get_solver
 
-            :return: (value, set) tuple (int, list): the value of the objective function
-                and the set of selected sentences as a tuple.
+            :return: (model, s) tuple (IlpModel, dict): the ILP model and the sentence binary variables.
 
         """
 
         if excluded_solutions is None:
             excluded_solutions = []
-        # initialize container shortcuts
-        concepts = self.weights.keys()
 
         w = self.weights
         L = summary_size
-        C = len(concepts)
         S = len(self.sentences)
 
         if not self.word_frequencies:
@@ -597,87 +794,349 @@ class ConceptBasedILPSummarizer(LoadFile):
 
         # HACK Sort keys
         concepts = sorted(self.weights, key=self.weights.get, reverse=True)
+        C = len(concepts)
+
+        # the sentences may have changed since the last call (e.g. sentence ranking), so the inverted index is
+        # rebuilt once per model
+        self.c2s = defaultdict(set)
+        self.compute_c2s()
 
         # formulation of the ILP problem
-        prob = pulp.LpProblem(self.input_directory, pulp.LpMaximize)
+        model = get_solver(solver).create_model(self.input_directory)
 
         # initialize the concepts binary variables
-        c = pulp.LpVariable.dicts(name='c',
-                                  indexs=range(C),
-                                  lowBound=0,
-                                  upBound=1,
-                                  cat='Integer')
+        c = model.binary_var_dict('c', range(C))
 
         # initialize the sentences binary variables
-        s = pulp.LpVariable.dicts(name='s',
-                                  indexs=range(S),
-                                  lowBound=0,
-                                  upBound=1,
-                                  cat='Integer')
+        s = model.binary_var_dict('s', range(S))
 
         # initialize the word binary variables
-        t = pulp.LpVariable.dicts(name='t',
-                                  indexs=range(T),
-                                  lowBound=0,
-                                  upBound=1,
-                                  cat='Integer')
+        t = model.binary_var_dict('t', range(T))
 
         # OBJECTIVE FUNCTION
-        prob += pulp.lpSum(w[concepts[i]] * c[i] for i in range(C))
+        model.maximize(model.sum(w[concepts[i]] * c[i] for i in range(C)))
 
         if unique:
-            prob += pulp.lpSum(w[concepts[i]] * c[i] for i in range(C)) + \
-                    10e-6 * pulp.lpSum(f[tokens[k]] * t[k] for k in range(T))
+            model.maximize(model.sum(w[concepts[i]] * c[i] for i in range(C)) +
+                           10e-6 * model.sum(f[tokens[k]] * t[k] for k in range(T)))
 
         # CONSTRAINT FOR SUMMARY SIZE
         if units == "WORDS":
-            prob += pulp.lpSum(s[j] * self.sentences[j].length for j in range(S)) <= L
+            model.add_constraint(model.sum(s[j] * self.sentences[j].length for j in range(S)) <= L)
         if units == "CHARACTERS":
-            prob += pulp.lpSum(s[j] * len(self.sentences[j].untokenized_form) for j in range(S)) <= L
+            model.add_constraint(model.sum(s[j] * len(self.sentences[j].untokenized_form) for j in range(S)) <= L)
 
-
-        # INTEGRITY CONSTRAINTS
+        # INTEGRITY CONSTRAINTS (only for the nonzero entries of the incidence)
         for i in range(C):
-            for j in range(S):
-                if concepts[i] in self.sentences[j].concepts:
-                    prob += s[j] <= c[i]
+            for j in self.c2s.get(concepts[i], ()):
+                model.add_constraint(s[j] <= c[i])
 
         for i in range(C):
-            prob += pulp.lpSum(s[j] for j in range(S)
-                        if concepts[i] in self.sentences[j].concepts) >= c[i]
+            model.add_constraint(model.sum(s[j] for j in self.c2s.get(concepts[i], ())) >= c[i])
 
         # WORD INTEGRITY CONSTRAINTS
         if unique:
             for k in range(T):
                 for j in self.w2s[tokens[k]]:
-                    prob += s[j] <= t[k]
+                    model.add_constraint(s[j] <= t[k])
 
             for k in range(T):
-                prob += pulp.lpSum(s[j] for j in self.w2s[tokens[k]]) >= t[k]
+                model.add_constraint(model.sum(s[j] for j in self.w2s[tokens[k]]) >= t[k])
 
         # CONSTRAINTS FOR FINDING OPTIMAL SOLUTIONS
         for sentence_set in excluded_solutions:
-            prob += pulp.lpSum([s[j] for j in sentence_set]) <= len(sentence_set)-1
+            model.add_constraint(model.sum([s[j] for j in sentence_set]) <= len(sentence_set)-1)
 
-        # prob.writeLP('test.lp')
+        return model, s
 
-        # solving the ilp problem
-        # solving the ilp problem
-        try:
-            print('BASEILP with CPLEX')
-            prob.solve(pulp.CPLEX(msg=0))
-        except:
-            #print('BASEILP fallback to %s' % (solver))
-            if solver == 'gurobi':
-                prob.solve(pulp.GUROBI(msg=0))
-            elif solver == 'glpk':
-                print('BASEILP with GLPK')
-                prob.solve(pulp.GLPK(msg=0)) 
+    def solve_ilp_problem(self,
+                          summary_size=100, units="WORDS",
+                          solver=None,
+                          excluded_solutions=None,
+                          unique=False,
+                          presolve=True):
+        """Solve the ILP formulation of the concept-based model.
+
+            :param summary_size: the maximum size in words of the summary, defaults to 100.
+            :param units: defaults to "WORDS"
+            :param solver: the solver used: cplex (in-memory, falls back to pulp), pulp, glpk or gurobi.
+                Defaults to cplex
+            :param excluded_solutions: (list of list): a list of subsets of sentences that are to be excluded,
+                defaults to []
+            :param unique: (bool): modify the model so that it produces only one optimal solution, defaults to False
+            :param presolve: (bool): solve the model reduced by IlpPresolve instead of the full model, defaults to
+                True. Not used together with unique. The reduction is reported in self.solve_info["presolve"].
+
+            :return: (value, set) tuple (int, list): the value of the objective function
+                and the set of selected sentences as a tuple.
+
+        """
+        S = len(self.sentences)
+        backend = get_solver(solver)
+
+        if presolve and not unique:
+            if units == "CHARACTERS":
+                sizes = [len(sentence.untokenized_form) for sentence in self.sentences]
             else:
-                sys.exit('no solver specified')
+                sizes = [sentence.length for sentence in self.sentences]
+            reduced = IlpPresolve([set(sentence.concepts) for sentence in self.sentences], self.weights, sizes,
+                                  drop_sentences=not excluded_solutions)
+            reduction = reduced.get_reduction()
+            log.debug("presolve removed %(sentences).1f%% of the sentences, %(concepts).1f%% of the concepts and "
+                      "%(constraints).1f%% of the constraints" % dict((k, 100 * v) for k, v in reduction.items()))
+
+            model = backend.create_model(self.input_directory)
+            s = reduced.build_model(model, summary_size, excluded_solutions)
+            value = model.solve()
+
+            # the sentences keep their indices in the reduced model
+            solution = set([j for j in reduced.sentences if model.is_selected(s[j])])
+            self.solve_info = {"solver": backend.name, "gap": model.get_gap(), "presolve": reduction}
+            return (value, solution)
+
+        model, s = self.build_ilp_problem(summary_size=summary_size,
+                                          units=units,
+                                          excluded_solutions=excluded_solutions,
+                                          unique=unique,
+                                          solver=backend)
+
+        # solving the ilp problem
+        value = model.solve()
 
         # retreive the optimal subset of sentences
-        solution = set([j for j in range(S) if s[j].varValue == 1])
+        solution = set([j for j in range(S) if model.is_selected(s[j])])
+        self.solve_info = {"solver": backend.name, "gap": model.get_gap()}
+
+        # returns the (objective function value, solution) tuple
+        return (value, solution)
+
+    def solve_ilp_solution_pool(self,
+                                summary_size=100, units="WORDS",
+                                k=5,
+                                min_distance=1,
+                                solver=None,
+                                presolve=True):
+        """The k best distinct solutions of the concept-based model.
+
+            The model is built once and solved k times. After each solve, a cut excludes all solutions which share
+            more than |solution| - min_distance sentences with the last one, and the same model is solved again. The
+            in-memory cplex backend keeps the solver state between the solves.
+
+            :param summary_size: the maximum size in words of the summary, defaults to 100.
+            :param units: defaults to "WORDS"
+            :param k: the number of solutions, defaults to 5.
+            :param min_distance: each solution leaves out at least this many sentences of every previous solution,
+                defaults to 1 (the solutions are distinct).
+            :param solver: the solver used: cplex (in-memory, falls back to pulp), pulp, glpk or gurobi.
+                Defaults to cplex
+            :param presolve: (bool): solve the model reduced by IlpPresolve (without dropping dominated sentences,
+                which may be part of the next solutions), defaults to True.
+
+            :return: list of (value, set) tuples, the best solution first. Less than k if there are no more solutions.
+
+        """
+        backend = get_solver(solver)
+
+        if presolve:
+            if units == "CHARACTERS":
+                sizes = [len(sentence.untokenized_form) for sentence in self.sentences]
+            else:
+                sizes = [sentence.length for sentence in self.sentences]
+            reduced = IlpPresolve([set(sentence.concepts) for sentence in self.sentences], self.weights, sizes,
+                                  drop_sentences=False)
+            model = backend.create_model(self.input_directory)
+            s = reduced.build_model(model, summary_size)
+            candidates = reduced.sentences
+        else:
+            model, s = self.build_ilp_problem(summary_size=summary_size, units=units, solver=backend)
+            candidates = range(len(self.sentences))
+
+        solutions = []
+        for i in range(k):
+            value = model.solve()
+            if value is None:
+                break
+            solution = set(j for j in candidates if model.is_selected(s[j]))
+            if not solution:
+                break
+            solutions.append((value, solution))
+            self.solve_info = {"solver": backend.name, "gap": model.get_gap()}
+
+            # CUT OFF THE SOLUTION AND ITS NEIGHBOURHOOD
+            model.add_constraint(model.sum(s[j] for j in solution) <= max(0, len(solution) - min_distance))
+
+        return solutions
+
+    def solve_anytime_ilp_problem(self,
+                                  summary_size=100, units="WORDS",
+                                  deadline_ms=1000,
+                                  solver=None,
+                                  heuristic="greedy"):
+        """Solve the concept-based model within a deadline.
+
+            A heuristic solution is computed first, which is then improved by the ILP until the deadline. The ILP
+            starts from the heuristic solution (if the solver supports MIP starts), and the better of both solutions
+            is returned. self.solve_info tells which one it is and its optimality gap.
+
+            :param summary_size: the maximum size in words of the summary, defaults to 100.
+            :param units: defaults to "WORDS". The tabu search only knows about words, so with "CHARACTERS" it is
+                skipped and only the ILP is run.
+            :param deadline_ms: the time budget in milliseconds, including the heuristic and building the model. If
+                the solver cannot keep the time left for the ILP, the heuristic solution is returned.
+            :param solver: the solver used: cplex (in-memory, falls back to pulp), pulp, glpk or gurobi.
+                Defaults to cplex
+            :param heuristic: "greedy" (lazy_greedy_approximation) or "tabu" (tabu_search)
+
+            :return: (value, set) tuple (int, list): the value of the objective function
+                and the set of selected sentences as a tuple.
+
+        """
+        start = time.time()
+        S = len(self.sentences)
+
+        value, solution, method = 0, set(), None
+        if heuristic == "tabu" and units == "WORDS":
+            value, solution = self.tabu_search(summary_size=summary_size)
+            method = heuristic
+        elif heuristic != "tabu":
+            value, solution = self.lazy_greedy_approximation(summary_size=summary_size, units=units)
+            method = heuristic
+
+        remaining = deadline_ms / 1000.0 - (time.time() - start)
+        if remaining <= 0 and method is not None:
+            log.debug("no time left for the ILP after the %s heuristic" % method)
+            self.solve_info = {"solver": method, "gap": None}
+            return value, solution
+
+        backend = get_solver(solver)
+        model, s = self.build_ilp_problem(summary_size=summary_size, units=units, solver=backend)
+
+        # a partial start: the solver derives the concept variables from the sentences
+        model.set_start(dict((s[j], 1 if j in solution else 0) for j in range(S)))
+        remaining = deadline_ms / 1000.0 - (time.time() - start)
+        if not model.set_time_limit(max(remaining, 0.001)) and method is not None:
+            log.warning("%s cannot keep the %.3f s left of the deadline, keeping the %s solution" % (
+                backend.name, remaining, method))
+            self.solve_info = {"solver": method, "gap": None}
+            return value, solution
+
+        ilp_value = model.solve()
+        ilp_gap = model.get_gap()
+
+        if ilp_value is not None and (method is None or ilp_value >= value):
+            self.solve_info = {"solver": backend.name, "gap": ilp_gap}
+            return ilp_value, set(j for j in range(S) if model.is_selected(s[j]))
+
+        # the heuristic is better than the incumbent of the ILP: its gap is relative to the bound of the ILP
+        gap = None
+        if ilp_value is not None and ilp_gap is not None and value:
+            gap = max(0.0, (ilp_value + ilp_gap * abs(ilp_value) - value) / abs(value))
+        self.solve_info = {"solver": method or backend.name, "gap": gap}
+        return value, solution
+
+    def solve_lp_rounding_problem(self,
+                                  summary_size=100, units="WORDS",
+                                  roundings=20,
+                                  seed=0):
+        """Near-optimal solution of the concept-based model by rounding its LP relaxation.
+
+            The LP relaxation (see lp_relaxation.solve_lp_relaxation) is solved in-process. Each rounding picks every
+            sentence with the probability of its fractional value, keeps the most likely of the picked sentences that
+            fit into the summary, and fills the remaining space greedily (see lazy_greedy_approximation). The first rounding
+            is deterministic: the sentences by decreasing fractional value. The best of all roundings and the plain
+            greedy selection is returned.
+            The objective of the relaxation is an upper bound of the optimum, so self.solve_info has the "bound" and
+            the "gap" of the returned solution relative to it.
+
+            :param summary_size: the maximum size in words of the summary, defaults to 100.
+            :param units: defaults to "WORDS"
+            :param roundings: the number of randomized roundings, defaults to 20.
+            :param seed: the seed of the randomized roundings, so that a run can be reproduced.
+
+            :return: (value, set) tuple (int, list): the value of the objective function
+                and the set of selected sentences as a tuple.
+
+        """
+        if units == "CHARACTERS":
+            sizes = [len(sentence.untokenized_form) for sentence in self.sentences]
+        else:
+            sizes = [sentence.length for sentence in self.sentences]
+
+        relaxation = solve_lp_relaxation(self.sentences, self.weights, sizes, summary_size)
+        if relaxation is None:
+            return self.lazy_greedy_approximation(summary_size=summary_size, units=units)
+        bound, x = relaxation
+
+        # the sentences may have changed since the last call
+        self.c2s = defaultdict(set)
+        self.compute_c2s()
+
+        # the sentences of the support, by decreasing value and increasing size
+        support = sorted((j for j in range(len(self.sentences)) if x[j] > 1e-9),
+                         key=lambda j: (-x[j], sizes[j], j))
+
+        # the concepts of each sentence, read once
+        concept_sets = [set(sentence.concepts) for sentence in self.sentences]
+
+        # the plain greedy selection, in case the roundings are worse
+        best_value, best_subset = self.__lazy_greedy__(summary_size, sizes, concept_sets)
+
+        rnd = random.Random(seed)
+        for r in range(roundings + 1):
+            if r == 0:
+                picked = support
+            else:
+                picked = [j for j in support if rnd.random() < x[j]]
+
+            # keep the most likely sentences that fit
+            rounded, length = [], 0
+            for j in picked:
+                if length + sizes[j] <= summary_size:
+                    rounded.append(j)
+                    length += sizes[j]
+
+            value, subset = self.__lazy_greedy__(summary_size, sizes, concept_sets, rounded)
+            if value > best_value:
+                best_value, best_subset = value, subset
+
+        gap = (bound - best_value) / float(best_value) if best_value else None
+        self.solve_info = {"solver": "lp-rounding", "gap": max(0.0, gap) if gap is not None else None, "bound": bound}
 
         # returns the (objective function value, solution) tuple
-        return (pulp.value(prob.objective), solution)
+        return best_value, best_subset
+
+    def solve_incremental_ilp_problem(self, summary_size=100, units="WORDS", solver=None, excluded_solutions=None,
+                                      unique=False):
+        """Solve the ILP formulation of the concept-based model on a long-lived model.
+
+            In contrast to solve_ilp_problem, the model is kept between two calls. Only the objective coefficients
+            are replaced and sentence columns are added or removed according to the current self.sentences. The
+            previous solution is used as warm start.
+
+            With excluded_solutions or unique, which the long-lived model does not know about, this is the same as
+            solve_ilp_problem.
+
+            :param summary_size: the maximum size in words of the summary, defaults to 100.
+            :param units: defaults to "WORDS"
+            :param solver: the solver used, see solve_ilp_problem. Defaults to cplex
+            :param excluded_solutions: see solve_ilp_problem
+            :param unique: see solve_ilp_problem
+
+            :return: (value, set) tuple (int, list): the value of the objective function
+                and the set of selected sentences as a tuple.
+
+        """
+        backend = get_solver(solver)
+        if excluded_solutions or unique:
+            return self.solve_ilp_problem(summary_size=summary_size, units=units, solver=backend,
+                                          excluded_solutions=excluded_solutions, unique=unique)
+
+        # instances unpickled from older versions do not know about the model yet
+        if getattr(self, "ilp_model", None) is None:
+            self.ilp_model = IncrementalConceptILP(self.input_directory, solver=backend)
+        self.ilp_model.set_solver(backend)
+
+        self.ilp_model.update(self.sentences, self.weights, summary_size=summary_size, units=units)
+        value, subset = self.ilp_model.solve(self.sentences)
+        self.solve_info = {"solver": "incremental-%s" % backend.name, "gap": self.ilp_model.get_gap()}
+        return value, subset
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+""" Long-lived ILP model of the concept-based summarizer.
+
+    The model keeps its variables and its coverage constraints across feedback iterations. Between two solves only the
+    objective coefficients are replaced, and sentence columns are added or removed when the set of candidate sentences
+    changes (e.g. when the SentenceRanker moves sentences in or out of the top-k).
+
+    The model is built through the IlpModel interface of summarizer.utils.ilp_solvers. With the default (docplex)
+    backend the changes are applied to the CPLEX model in memory, which is solved again from the previous solution;
+    the pulp backends write the changed model to an LP file for each solve.
+"""
+
+from collections import defaultdict
+import logging
+
+from summarizer.utils.ilp_solvers import get_solver
+
+log = logging.getLogger("IncrementalConceptILP")
+
+
+def sentence_key(sentence):
+    """ sentences are identified the same way the SentenceRanker does: (doc_id, position) """
+    return sentence.doc_id, sentence.position
+
+
+class IncrementalConceptILP(object):
+    """Persistent formulation of the concept-based ILP (Gillick & Favre, 2009).
+
+    Args:
+        name (str): the name of the underlying IlpModel
+        warm_start (bool): use the previous solution as MIP start, if the solver supports it.
+        solver (str or IlpSolver): the solver backend, see utils.ilp_solvers.get_solver
+
+    The model itself is not pickled, as the docplex models cannot be. An unpickled instance rebuilds it on the next
+    update and starts from the last solution.
+    """
+
+    def __init__(self, name="IncrementalConceptILP", warm_start=True, solver=None):
+        self.name = name
+        self.warm_start = warm_start
+        self.solution = set()
+        """ keys of the sentences of the last solution """
+        self.backend = None
+        self.set_solver(solver)
+
+    def __getstate__(self):
+        return {
+            "name": self.name,
+            "warm_start": self.warm_start,
+            "solution": self.solution
+        }
+
+    def __setstate__(self, state):
+        # the instances pickled with a pulp.LpProblem have no name
+        self.name = state.get("name", "IncrementalConceptILP")
+        self.warm_start = state.get("warm_start", True)
+        self.solution = state.get("solution", set())
+        self.backend = None
+        self.model = None
+
+    def set_solver(self, solver):
+        """
+            uses the given solver backend from now on. The model is rebuilt if the backend changes.
+        """
+        backend = get_solver(solver)
+        if self.backend is None or self.backend.name != backend.name:
+            self.backend = backend
+            self.__reset__()
+
+    def __reset__(self):
+        self.model = self.backend.create_model(self.name)
+
+        self.c = {}
+        """ concept -> binary concept variable """
+
+        self.s = {}
+        """ sentence key -> binary sentence variable (also holds the columns that are currently removed) """
+
+        self.sentences = {}
+        """ sentence key -> Sentence, for the sentences that are currently part of the model """
+
+        self.concept_sentences = defaultdict(set)
+        """ concept -> keys of the sentences in the model which contain the concept """
+
+        self.integrity = {}
+        """ (sentence key, concept) -> handle of the constraint s <= c """
+
+        self.coverage = {}
+        """ concept -> handle of the constraint sum(s) >= c """
+
+        self.length = None
+        """ handle of the length constraint """
+
+    def update(self, sentences, weights, summary_size=100, units="WORDS"):
+        """Synchronize the model with the given sentences and concept weights.
+
+        :param sentences: list of Sentence objects that are candidates for the summary
+        :param weights: dict concept -> weight. Concepts that are missing get a zero objective coefficient.
+        :param summary_size: the maximum size of the summary in units
+        :param units: "WORDS" or "CHARACTERS"
+        """
+        if self.model is None:
+            self.set_solver(None)
+        model = self.model
+
+        keys = [sentence_key(sentence) for sentence in sentences]
+        current = set(keys)
+
+        # concepts whose coverage constraint has to be rebuilt
+        changed = set()
+
+        removed = [key for key in self.sentences if key not in current]
+        for key in removed:
+            changed.update(self.__remove_sentence__(key))
+
+        for concept in weights:
+            if concept not in self.c:
+                self.__add_concept__(concept)
+                changed.add(concept)
+
+        for key, sentence in zip(keys, sentences):
+            if key not in self.sentences:
+                changed.update(self.__add_sentence__(key, sentence))
+
+        # COVERAGE CONSTRAINTS of the concepts whose sentences changed
+        changed = [concept for concept in changed if concept in self.c]
+        model.remove_constraints([self.coverage.pop(concept) for concept in changed if concept in self.coverage])
+        for concept in changed:
+            self.coverage[concept] = model.add_constraint(
+                model.sum(self.s[key] for key in self.concept_sentences.get(concept, ())) >= self.c[concept])
+
+        # the length constraint is cheap compared to the coverage constraints, so it is simply rebuilt.
+        if self.length is not None:
+            model.remove_constraints([self.length])
+        self.length = model.add_constraint(
+            model.sum(self.s[key] * self.__sentence_size__(sentence, units)
+                      for key, sentence in self.sentences.items()) <= summary_size)
+
+        # OBJECTIVE FUNCTION: only the coefficients change between two iterations
+        model.maximize(model.sum(weights[concept] * self.c[concept] for concept in weights))
+
+        log.debug("model with %s sentences (-%s) and %s concepts" % (len(self.sentences), len(removed), len(self.c)))
+
+    def solve(self, sentences):
+        """Solve the current model.
+
+        :param sentences: the list of sentences that has been passed to update. The solution is reported as indices
+            into this list, just like solve_ilp_problem does.
+        :return: (value, set) tuple: the value of the objective function and the set of selected sentence indices.
+        """
+        model = self.model
+        if self.warm_start and self.solution:
+            model.set_start(dict((self.s[key], 1 if key in self.solution else 0) for key in self.sentences))
+
+        value = model.solve()
+
+        self.solution = set(key for key in self.sentences if model.is_selected(self.s[key]))
+        subset = set(j for j, sentence in enumerate(sentences) if sentence_key(sentence) in self.solution)
+
+        return value, subset
+
+    def get_gap(self):
+        """
+        :return: the relative gap of the last solution, see IlpModel.get_gap
+        """
+        return self.model.get_gap()
+
+    def __sentence_size__(self, sentence, units):
+        if units == "CHARACTERS":
+            return len(sentence.untokenized_form)
+        return sentence.length
+
+    def __add_concept__(self, concept):
+        self.c[concept] = self.model.binary_var("c_%s" % len(self.c))
+
+        # INTEGRITY CONSTRAINTS with the sentences that are already part of the model
+        for key in self.concept_sentences.get(concept, ()):
+            self.integrity[key, concept] = self.model.add_constraint(self.s[key] <= self.c[concept])
+
+    def __add_sentence__(self, key, sentence):
+        """
+        :return: the concepts of the sentence
+        """
+        if key not in self.s:
+            self.s[key] = self.model.binary_var("s_%s" % len(self.s))
+        self.sentences[key] = sentence
+
+        concepts = set(sentence.concepts)
+        for concept in concepts:
+            self.concept_sentences[concept].add(key)
+            if concept in self.c:
+                self.integrity[key, concept] = self.model.add_constraint(self.s[key] <= self.c[concept])
+        return concepts
+
+    def __remove_sentence__(self, key):
+        """
+            removes the constraints of the sentence. Its variable stays in the model, but without constraints and
+            objective coefficient it is inert, and it is reused if the sentence comes back.
+        :return: the concepts of the sentence
+        """
+        sentence = self.sentences.pop(key)
+
+        concepts = set(sentence.concepts)
+        for concept in concepts:
+            self.concept_sentences[concept].discard(key)
+        self.model.remove_constraints([self.integrity.pop((key, concept)) for concept in concepts
+                                       if (key, concept) in self.integrity])
+        self.solution.discard(key)
+        return concepts
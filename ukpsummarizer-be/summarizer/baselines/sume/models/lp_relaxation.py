@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+""" LP relaxation of the concept-based ILP.
+
+    The relaxation has the same variables and constraints as the model of
+    ConceptBasedILPSummarizer.build_ilp_problem, with all variables in [0, 1]
+    instead of binary. It is built as a sparse matrix and solved in-process
+    with scipy. Its objective is an upper bound of the ILP optimum, and the
+    fractional sentence values are the input of the rounding in
+    ConceptBasedILPSummarizer.solve_lp_rounding_problem.
+"""
+
+import logging
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.optimize import linprog
+
+log = logging.getLogger("LpRelaxation")
+
+LP_METHODS = [("highs", {}), ("interior-point", {"sparse": True})]
+""" scipy.optimize.linprog methods that take a sparse constraint matrix, in
+    the order they are tried (the older scipy versions only know the second). """
+
+
+def solve_lp_relaxation(sentences, weights, sizes, summary_size):
+    """Solve the LP relaxation of the concept-based model.
+
+    Args:
+        sentences (list of Sentence): the candidate sentences.
+        weights (dict): concept -> weight, the concepts of the model.
+        sizes (list of int): the size of each sentence, in the units of
+          summary_size.
+        summary_size (int): the maximum size of the summary.
+
+    Returns:
+        (bound, x) tuple (float, np.ndarray): the objective of the relaxation,
+          i.e. an upper bound of the ILP, and the fractional value of each
+          sentence. None if the LP could not be solved.
+    """
+    concepts = sorted(weights, key=weights.get, reverse=True)
+    concept_ids = dict((concept, i) for i, concept in enumerate(concepts))
+    C, S = len(concepts), len(sentences)
+
+    # the (concept, sentence) pairs of the incidence
+    rows, cols = [], []
+    for j, sentence in enumerate(sentences):
+        for concept in set(sentence.concepts):
+            i = concept_ids.get(concept)
+            if i is not None:
+                rows.append(i)
+                cols.append(j)
+    rows = np.array(rows, dtype=np.int64)
+    cols = np.array(cols, dtype=np.int64)
+    N = len(rows)
+
+    # the variables are c_0 .. c_C-1, s_0 .. s_S-1; constraints:
+    #   length:     sum_j size_j s_j <= L
+    #   integrity:  s_j - c_i <= 0            for each pair (i, j)
+    #   coverage:   c_i - sum_j s_j <= 0      for each concept i
+    integrity = np.arange(1, N + 1)
+    coverage = 1 + N + np.arange(C)
+    A = sp.coo_matrix((np.concatenate([np.asarray(sizes, dtype=np.float64),
+                                       np.ones(N), -np.ones(N),
+                                       np.ones(C), -np.ones(N)]),
+                       (np.concatenate([np.zeros(S, dtype=np.int64),
+                                        integrity, integrity,
+                                        coverage, 1 + N + rows]),
+                        np.concatenate([C + np.arange(S), C + cols, rows,
+                                        np.arange(C), C + cols]))),
+                      shape=(1 + N + C, C + S)).tocsr()
+    b = np.zeros(1 + N + C)
+    b[0] = summary_size
+
+    # linprog minimizes
+    objective = -np.array([weights[concept] for concept in concepts],
+                          dtype=np.float64)
+    objective = np.concatenate([objective, np.zeros(S)])
+
+    for i, (method, options) in enumerate(LP_METHODS):
+        try:
+            result = linprog(objective, A_ub=A, b_ub=b, bounds=(0, 1),
+                             method=method, options=options)
+            break
+        except ValueError:
+            if i + 1 == len(LP_METHODS):
+                raise
+            log.debug("linprog method %s is not available, falling back to %s"
+                      % (method, LP_METHODS[i + 1][0]))
+
+    if result.status != 0:
+        log.debug("the LP relaxation could not be solved: %s" % result.message)
+        return None
+    return -result.fun, np.clip(result.x[C:], 0.0, 1.0)
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+""" Presolve of the concept coverage ILPs.
+
+    Reduces the model before it is passed to the solver:
+
+    * concepts with a zero objective coefficient (plentiful after rejects) and
+      concepts that occur in no sentence are dropped,
+    * sentences that are dominated are dropped: another sentence is at most as
+      long, covers all of their positive concepts and none of the negative
+      concepts they do not cover as well,
+    * concepts that occur in exactly one sentence are folded into the
+      objective coefficient of that sentence, as the concept is selected iff
+      the sentence is.
+
+    The sentence variables keep the indices of the full model, so a solution
+    of the reduced model is a solution of the full model with the same
+    objective value.
+"""
+
+from collections import defaultdict
+import logging
+
+log = logging.getLogger("IlpPresolve")
+
+
+class IlpPresolve(object):
+    """Reduced formulation of a concept coverage ILP.
+
+    Args:
+        concept_sets (list of set): the concepts of each sentence.
+        coefficients (dict): concept -> objective coefficient. Concepts that
+          are missing are not part of the model.
+        sizes (list of int): the size of each sentence in the units of the
+          length constraint.
+        drop_sentences (bool): drop dominated sentences. Must be False if some
+          solutions are excluded, as the dominating solution may be excluded.
+    """
+
+    def __init__(self, concept_sets, coefficients, sizes, drop_sentences=True):
+        self.coefficients = coefficients
+        self.sizes = sizes
+        S = len(concept_sets)
+
+        # size of the full model
+        self.full_sentences = S
+        self.full_concepts = len(coefficients)
+        self.full_pairs = sum(1 for concepts in concept_sets for concept in concepts if concept in coefficients)
+
+        # the concepts of each sentence which count in the objective, split by sign
+        positive = [frozenset(c for c in concepts if coefficients.get(c, 0) > 0) for concepts in concept_sets]
+        negative = [frozenset(c for c in concepts if coefficients.get(c, 0) < 0) for concepts in concept_sets]
+
+        dropped = set()
+        if drop_sentences:
+            c2s = defaultdict(list)
+            for j in range(S):
+                for concept in positive[j]:
+                    c2s[concept].append(j)
+
+            # b dominates a if it is at least as good in each respect; ties are broken by this key, so that of two
+            # equal sentences only one is dropped
+            def key(j):
+                return sizes[j], -len(positive[j]), len(negative[j]), j
+
+            for a in range(S):
+                if not positive[a]:
+                    # the sentence can only decrease the objective
+                    dropped.add(a)
+                    continue
+                rarest = min(positive[a], key=lambda concept: len(c2s[concept]))
+                for b in c2s[rarest]:
+                    if b != a and key(b) < key(a) and sizes[b] <= sizes[a] \
+                            and positive[a] <= positive[b] and negative[b] <= negative[a]:
+                        dropped.add(a)
+                        break
+
+        self.sentences = [j for j in range(S) if j not in dropped]
+        """ indices of the sentences of the reduced model """
+
+        self.c2s = defaultdict(list)
+        """ concept -> indices of the sentences in the reduced model which contain the concept """
+        for j in self.sentences:
+            for concept in positive[j] | negative[j]:
+                self.c2s[concept].append(j)
+
+        # fold the concepts of a single sentence into the objective of the sentence
+        self.objective = dict((j, 0) for j in self.sentences)
+        """ sentence index -> objective coefficient """
+        self.concepts = []
+        """ concepts of the reduced model """
+        for concept in sorted(self.c2s, key=coefficients.get, reverse=True):
+            sentences = self.c2s[concept]
+            if len(sentences) == 1:
+                self.objective[sentences[0]] += coefficients[concept]
+            else:
+                self.concepts.append(concept)
+
+        self.pairs = sum(len(self.c2s[concept]) for concept in self.concepts)
+
+    def build_model(self, model, summary_size, excluded_solutions=None):
+        """Adds the variables, objective and constraints of the reduced problem to the model.
+
+        :param model: an empty IlpModel, see summarizer.utils.ilp_solvers
+        :param summary_size: the maximum size of the summary
+        :param excluded_solutions: (list of list): subsets of sentences that are to be excluded
+        :return: dict sentence index -> binary sentence variable
+        """
+        s = model.binary_var_dict('s', self.sentences)
+        c = model.binary_var_dict('c', range(len(self.concepts)))
+
+        # OBJECTIVE FUNCTION
+        model.maximize(model.sum(self.coefficients[concept] * c[i] for i, concept in enumerate(self.concepts)) +
+                       model.sum(self.objective[j] * s[j] for j in self.sentences if self.objective[j]))
+
+        # CONSTRAINT FOR SUMMARY SIZE
+        model.add_constraint(model.sum(s[j] * self.sizes[j] for j in self.sentences) <= summary_size)
+
+        # INTEGRITY CONSTRAINTS
+        for i, concept in enumerate(self.concepts):
+            for j in self.c2s[concept]:
+                model.add_constraint(s[j] <= c[i])
+
+        for i, concept in enumerate(self.concepts):
+            model.add_constraint(model.sum(s[j] for j in self.c2s[concept]) >= c[i])
+
+        # CONSTRAINTS FOR FINDING OPTIMAL SOLUTIONS
+        for sentence_set in excluded_solutions or []:
+            model.add_constraint(model.sum([s[j] for j in sentence_set if j in s]) <= len(sentence_set) - 1)
+
+        return s
+
+    def get_reduction(self):
+        """
+        :return: dict with the share of the sentences, concepts and constraints removed from the full model
+        """
+        def ratio(reduced, full):
+            return 1.0 - reduced / float(full) if full else 0.0
+
+        return {
+            "sentences": ratio(len(self.sentences), self.full_sentences),
+            "concepts": ratio(len(self.concepts), self.full_concepts),
+            "constraints": ratio(1 + self.pairs + len(self.concepts), 1 + self.full_pairs + self.full_concepts)
+        }
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+""" Columnar storage of the sentences of a topic.
+
+    A SentenceStore keeps the tokens, concepts and untokenized concepts of all
+    sentences as interned string ids in flat numpy arrays with per-sentence
+    offsets, instead of one object with its own lists and dict per sentence.
+    SentenceView is the read-only Sentence of a store.
+"""
+
+import numpy as np
+
+from summarizer.algorithms.concept_vocabulary import ConceptVocabulary
+
+
+class SentenceStore(object):
+    """The sentences of a topic in columnar form.
+
+    Sentence i has the tokens strings[tokens[token_offsets[i]:token_offsets[i + 1]]],
+    and likewise the untokenized concepts (which share the concept offsets).
+    The concepts are ids of the ConceptVocabulary of the topic, so that they
+    can be used as they are by everything else that works on concept ids.
+    Phrases, tokens_pos and raw_phrases are only set for parsed topics; they
+    are kept as they are, for the sentences which have them.
+
+    Args:
+        strings (list of str): the tokens, forms and untokenized concepts,
+          each string once.
+        vocabulary (ConceptVocabulary): the concepts.
+    """
+    def __init__(self, strings, vocabulary, doc_ids, positions, lengths, forms,
+                 tokens, token_offsets, concepts, untokenized_concepts,
+                 concept_offsets, parse_data=None):
+        self.strings = strings
+        self.vocabulary = vocabulary
+        self.doc_ids = doc_ids
+        self.positions = positions
+        self.lengths = lengths
+        self.forms = forms
+        """ string id of the untokenized form of each sentence. """
+        self.tokens = tokens
+        self.token_offsets = token_offsets
+        self.concepts = concepts
+        self.untokenized_concepts = untokenized_concepts
+        self.concept_offsets = concept_offsets
+        self.parse_data = parse_data or {}
+        """ sentence index -> (phrases, tokens_pos, raw_phrases) """
+
+    @classmethod
+    def from_sentences(cls, sentences, vocabulary=None):
+        """Build a store from Sentence objects, whose doc_id is an int.
+
+        Args:
+            vocabulary (ConceptVocabulary): the vocabulary of the topic, which
+              is extended by the concepts of the sentences. A new one if None.
+        """
+        if vocabulary is None:
+            vocabulary = ConceptVocabulary()
+        ids = {}
+        strings = []
+
+        def intern(s):
+            i = ids.get(s)
+            if i is None:
+                i = ids[s] = len(strings)
+                strings.append(s)
+            return i
+
+        def ragged(lists, intern=intern):
+            offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+            np.cumsum([len(l) for l in lists], out=offsets[1:])
+            flat = np.array([intern(s) for l in lists for s in l],
+                            dtype=np.int32)
+            return flat, offsets
+
+        tokens, token_offsets = ragged([s.tokens for s in sentences])
+        concepts, concept_offsets = ragged([s.concepts for s in sentences],
+                                           vocabulary.add)
+        untokenized_concepts, _ = ragged([s.untokenized_concepts
+                                          for s in sentences])
+        parse_data = dict((i, (s.phrases, s.tokens_pos, s.raw_phrases))
+                          for i, s in enumerate(sentences)
+                          if s.phrases or s.tokens_pos or s.raw_phrases)
+        return cls(strings, vocabulary,
+                   np.array([s.doc_id for s in sentences], dtype=np.int32),
+                   np.array([s.position for s in sentences], dtype=np.int32),
+                   np.array([s.length for s in sentences], dtype=np.int32),
+                   np.array([intern(s.untokenized_form) for s in sentences],
+                            dtype=np.int32),
+                   tokens, token_offsets, concepts, untokenized_concepts,
+                   concept_offsets, parse_data)
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def views(self):
+        """Returns a SentenceView per sentence, to be kept instead of the Sentences."""
+        return [SentenceView(self, i) for i in range(len(self))]
+
+    def get_tokens(self, i):
+        strings = self.strings
+        return [strings[t] for t in
+                self.tokens[self.token_offsets[i]:self.token_offsets[i + 1]].tolist()]
+
+    def get_concepts(self, i, untokenized=False):
+        if untokenized:
+            strings, column = self.strings, self.untokenized_concepts
+        else:
+            strings, column = self.vocabulary.concepts, self.concepts
+        return [strings[c] for c in
+                column[self.concept_offsets[i]:self.concept_offsets[i + 1]].tolist()]
+
+    def get_concept_ids(self, i):
+        """The ids of the concepts of sentence i in the vocabulary."""
+        return self.concepts[self.concept_offsets[i]:self.concept_offsets[i + 1]]
+
+    def nbytes(self):
+        """Size of the arrays in bytes (without the strings and the vocabulary)."""
+        return sum(a.nbytes for a in (self.doc_ids, self.positions, self.lengths, self.forms, self.tokens,
+                                      self.token_offsets, self.concepts, self.untokenized_concepts,
+                                      self.concept_offsets))
+
+    def __deepcopy__(self, memo):
+        # the store is never modified, copies can share it
+        return self
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # pickled before the concepts were ids of a ConceptVocabulary
+        if "vocabulary" not in state:
+            self.vocabulary = ConceptVocabulary()
+            self.concepts = self.vocabulary.to_ids(
+                [self.strings[c] for c in self.concepts.tolist()], add=True)
+
+
+class SentenceView(object):
+    """The Sentence at index i of a SentenceStore.
+
+    Has the attributes of Sentence, but they are read-only and the lists are
+    built from the store on each access: loops should read them once per
+    sentence (see concept_occurrences in algorithms.feedback), or use
+    concept_ids.
+    """
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    @property
+    def tokens(self):
+        return self.store.get_tokens(self.index)
+
+    @property
+    def doc_id(self):
+        return int(self.store.doc_ids[self.index])
+
+    @property
+    def position(self):
+        return int(self.store.positions[self.index])
+
+    @property
+    def concepts(self):
+        return self.store.get_concepts(self.index)
+
+    @property
+    def concept_ids(self):
+        return self.store.get_concept_ids(self.index)
+
+    @property
+    def untokenized_concepts(self):
+        return self.store.get_concepts(self.index, untokenized=True)
+
+    @property
+    def untokenized_form(self):
+        return self.store.strings[self.store.forms[self.index]]
+
+    @property
+    def length(self):
+        return int(self.store.lengths[self.index])
+
+    @property
+    def phrases(self):
+        return self.store.parse_data.get(self.index, ([], {}, []))[0]
+
+    @property
+    def tokens_pos(self):
+        return self.store.parse_data.get(self.index, ([], {}, []))[1]
+
+    @property
+    def raw_phrases(self):
+        return self.store.parse_data.get(self.index, ([], {}, []))[2]
+
+    def __reduce__(self):
+        return SentenceView, (self.store, self.index)
+
+    def __deepcopy__(self, memo):
+        return self
@@ -7,13 +7,19 @@ from nltk.tokenize import word_tokenize
 import summarizer.baselines.sume as sume
 from sume import Sentence, untokenize
 from summarizer.algorithms._summarizer import Summarizer
+from summarizer.constants import SUMMARY_METHOD_ILP, SUMMARY_METHOD_GREEDY, SUMMARY_METHOD_LP
 from summarizer.utils.data_helpers import get_parse_info, prune_phrases
 from nltk.corpus import stopwords
 from nltk.stem.snowball import SnowballStemmer
 
 class SumeWrap(Summarizer):
-    def __init__(self, language):
+    def __init__(self, language, method=SUMMARY_METHOD_ILP):
+        """
+        :param method: how the summary is selected: "ilp" (the exact ILP), "greedy" (lazy greedy approximation,
+            for topics where the ILP is too slow) or "lp" (rounding of the LP relaxation, with an upper bound)
+        """
         self.s = sume.ConceptBasedILPSummarizer(" ", language)
+        self.method = method
         self.LANGUAGE = language
         self.stoplist = set(stopwords.words(self.LANGUAGE))
         self.stemmer = SnowballStemmer(self.LANGUAGE)
@@ -30,20 +36,29 @@ class SumeWrap(Summarizer):
         @type parse_type: str
         @type parse_info: list
         """
+        return list(self.iter_sume_sentences(docs, parse_type, parse_info))
+
+    def iter_sume_sentences(self, docs, parse_type=None, parse_info=None):
+        """
+            like load_sume_sentences, but yields the sentences one at a time, so that the documents (e.g. a
+            DocumentStream) are read lazily
+        """
         if parse_info is None:
             parse_info = []
             # System should work even without parser, it is optional
             # print("Warning!!!!! No parse_info available for docs %s" % docs)
             # raise BaseException("Warning!!!!! No parse_info available")
 
-        doc_sentences = []
         doc_id = 0
         for doc_id, doc in enumerate(docs):
             doc_name, doc_sents = doc
+            if parse_info:
+                # fetch the parsed document once per document, not per sentence
+                parse_sents = parse_info[0][doc_id][1]
             for sent_pos, sentence in enumerate(doc_sents):
                 token_sentence = word_tokenize(sentence, self.LANGUAGE)
                 if parse_info:
-                    parse_sent = parse_info[0][doc_id][1][sent_pos]
+                    parse_sent = parse_sents[sent_pos]
                     # _, raw_phrases = get_parse_info(parse_sent, self.stemmer, self.LANGUAGE, self.stoplist, use_stems=False)
                     hash_tokens_pos, phrases = get_parse_info(parse_sent, self.stemmer, self.LANGUAGE, self.stoplist)
                     pruned_phrases = prune_phrases(phrases, self.stoplist, self.stemmer, self.LANGUAGE)
@@ -55,9 +70,7 @@ class SumeWrap(Summarizer):
                 untokenized_form = untokenize(token_sentence)
                 sentence_s.untokenized_form = untokenized_form
                 sentence_s.length = len(untokenized_form.split(' '))
-                doc_sentences.append(sentence_s)
-            
-        return doc_sentences
+                yield sentence_s
 
     def __call__(self, docs, length=100, units="WORDS", rejected_list=[], imp_list=[], parser_type=None):
         try:
@@ -82,7 +95,12 @@ class SumeWrap(Summarizer):
         #self.s.prune_sentences(remove_citations=True, remove_redundancy=True, imp_list=imp_list)
     
         # solve the ilp model
-        value, subset = self.s.solve_ilp_problem(summary_size=length, units=units)
+        if self.method == SUMMARY_METHOD_GREEDY:
+            value, subset = self.s.lazy_greedy_approximation(summary_size=length, units=units)
+        elif self.method == SUMMARY_METHOD_LP:
+            value, subset = self.s.solve_lp_rounding_problem(summary_size=length, units=units)
+        else:
+            value, subset = self.s.solve_ilp_problem(summary_size=length, units=units)
     
         return [self.s.sentences[j].untokenized_form for j in subset]
 
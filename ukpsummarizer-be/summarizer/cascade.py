@@ -5,24 +5,34 @@ import codecs
 
 import itertools
 import json
+import logging
 import random
+import sys
+import time
+import traceback
 
 from nltk import SnowballStemmer
 from os import path
 
 import single_iteration_pipes
 import utils.reader
+from constants import SUMMARY_METHOD_ILP, SUMMARY_METHOD_GREEDY, SUMMARY_METHOD_LP
 from algorithms.feedback import BaselineFeedbackStore
 from algorithms.feedback.ConceptEmbedder import ConceptEmbedder
 from algorithms.feedback.SimpleNgramFeedbackGraph import SimpleNgramFeedbackGraph
+from algorithms.feedback.WordEmbeddingArrayFeedbackGraph import PROPAGATION_ENGINE_GRAPH, PROPAGATION_ENGINE_ARRAY
+from algorithms.feedback.WordEmbeddingGaussianArrayFeedbackGraph import WordEmbeddingGaussianArrayFeedbackGraph
 from algorithms.feedback.WordEmbeddingGaussianFeedbackGraph import WordEmbeddingGaussianFeedbackGraph
 from algorithms.feedback.WordEmbeddingRandomWalkDiffusionFeedbackGraph import \
     WordEmbeddingRandomWalkDiffusionFeedbackGraph
+from algorithms.feedback.WordEmbeddingRandomWalkDiffusionArrayFeedbackGraph import \
+    WordEmbeddingRandomWalkDiffusionArrayFeedbackGraph
 
 from model.dataset import DataSet
 from model.topic import Topic
 from utils.data_helpers import load_w2v_embeddings
 from utils.writer import write_to_file
+from web.session_store import SessionStore, DEFAULT_CAPACITY
 from web.single_iteration_runner import SingleTopicRunner
 from rouge.rouge import Rouge
 
@@ -59,12 +69,27 @@ def get_fbs_args(args):
         fbs_type = "bl"
         feedback_store_kwargs = {}
 
+    if getattr(args, "ann", None) and fbs_type in ["rw", "gb"]:
+        feedback_store_kwargs["neighbors"] = int(args.ann[0])
+        feedback_store_kwargs["lsh_tables"] = int(args.ann[1])
+        feedback_store_kwargs["lsh_bits"] = int(args.ann[2])
+    if getattr(args, "feedback_history", None) and fbs_type in ["rw", "gb"]:
+        feedback_store_kwargs["history_size"] = args.feedback_history
+
     return fbs_type, feedback_store_kwargs
 
 
-def get_fbs(fbclass, fbkwargs, embedder=None, language=None, stemmer=None):
-    if fbclass == "rw":
+def get_fbs(fbclass, fbkwargs, embedder=None, language=None, stemmer=None, engine=PROPAGATION_ENGINE_GRAPH):
+    """
+    :param engine: PROPAGATION_ENGINE_GRAPH for the networkx based -rw and -gb stores, PROPAGATION_ENGINE_ARRAY for
+        their array-backed variants
+    """
+    if fbclass == "rw" and engine == PROPAGATION_ENGINE_ARRAY:
+        return WordEmbeddingRandomWalkDiffusionArrayFeedbackGraph(embedder, **fbkwargs)
+    elif fbclass == "rw":
         return WordEmbeddingRandomWalkDiffusionFeedbackGraph(embedder, **fbkwargs)
+    elif fbclass == "gb" and engine == PROPAGATION_ENGINE_ARRAY:
+        return WordEmbeddingGaussianArrayFeedbackGraph(embedder, **fbkwargs)
     elif fbclass == "gb":
         return WordEmbeddingGaussianFeedbackGraph(embedder, **fbkwargs)
     elif fbclass == "cg":
@@ -73,10 +98,63 @@ def get_fbs(fbclass, fbkwargs, embedder=None, language=None, stemmer=None):
         return None
 
 
+def get_fbs_from_config(config, embedder=None, language=None, stemmer=None):
+    """
+        rebuilds a feedback store from its get_config(), e.g. for loading a session snapshot.
+    """
+    fbs_type = config.get("type")
+    engine = config.get("propagation_engine", PROPAGATION_ENGINE_GRAPH)
+    optional_kwargs = dict((k, config[k]) for k in ["neighbors", "lsh_tables", "lsh_bits", "history_size"]
+                           if k in config)
+    if fbs_type == "WordEmbeddingRandomWalkDiffusionFeedbackGraph":
+        fbkwargs = dict((k, config[k]) for k in ["mass_accept", "mass_reject", "iterations_accept",
+                                                 "iterations_reject", "cut_off_threshold",
+                                                 "propagation_abort_threshold"])
+        fbkwargs.update(optional_kwargs)
+        return get_fbs("rw", fbkwargs, embedder, language=language, stemmer=stemmer, engine=engine)
+    elif fbs_type == "WordEmbeddingGaussianFeedbackGraph":
+        fbkwargs = dict((k, config[k]) for k in ["mass_accept", "mass_reject", "iterations_accept",
+                                                 "iterations_reject"])
+        fbkwargs["cut_off_threshold"] = config["cutoff_threshold"]
+        fbkwargs.update(optional_kwargs)
+        return get_fbs("gb", fbkwargs, embedder, language=language, stemmer=stemmer, engine=engine)
+    elif fbs_type == "SimpleNgramFeedbackGraph":
+        fbkwargs = {
+            "N": config["N"],
+            "factor_accept": config["multiplier_accept"],
+            "factor_reject": config["multiplier_reject"]
+        }
+        return get_fbs("cg", fbkwargs, embedder, language=language, stemmer=stemmer)
+    else:
+        raise BaseException("Cannot rebuild feedback store of type %s" % (fbs_type))
+
+
+def get_fbs_factory(iobasedir, embeddings=None):
+    """
+        the feedbackstore_factory for the SingleTopicRunner. Embeddings are only loaded if a store needs them.
+
+    :param embeddings: dict language -> embeddings, see run_summarize
+    """
+    if embeddings is None:
+        embeddings = {}
+
+    def factory(config, language):
+        if embeddings.get(language) is None:
+            embeddings[language] = load_w2v_embeddings(path.normpath(path.join(iobasedir, "embeddings")), language,
+                                                       "active_learning")
+        return get_fbs_from_config(config, ConceptEmbedder(embeddings[language]), language=language,
+                                   stemmer=SnowballStemmer(language))
+
+    return factory
+
+
+log = logging.info
+
+
 class Summary(object):
-    def __init__(self, summary_file):
+    def __init__(self, summary_file, topics=None):
         p, f = path.split(summary_file)
-        self.topic = Topic(path.normpath(path.join(p, "..")))
+        self.topic = get_topic(path.normpath(path.join(p, "..")), topics)
 
         self.idx = None
 
@@ -93,28 +171,32 @@ class Summary(object):
         return self.topic
 
 
-if __name__ == '__main__':
+def get_topic(topic_path, topics=None):
+    """
+        returns the Topic at the given path, reusing the instance from the topics cache, if given.
+    """
+    if topics is None:
+        return Topic(topic_path)
+    if topic_path not in topics:
+        topics[topic_path] = Topic(topic_path)
+    return topics[topic_path]
+
 
-    def resolve_filename(filename, base="~/.ukpsummarizer"):
-        p, f = path.split(path.join(base, filename))
+def resolve_filename(filename, base="~/.ukpsummarizer"):
+    p, f = path.split(path.join(base, filename))
+    if path.exists(p):
+        resolved_name = path.join(base, filename)
+    else:
+        p, f = path.split(filename)
         if path.exists(p):
-            resolved_name = path.join(base, filename)
+            resolved_name = filename
         else:
-            p, f = path.split(filename)
-            if path.exists(p):
-                resolved_name = filename
-            else:
-                raise BaseException("Cannot resolve %s to a existing path" % (filename))
+            raise BaseException("Cannot resolve %s to a existing path" % (filename))
 
-        return resolved_name
+    return resolved_name
 
 
-    import logging
-    import logging.config
-
-    logging.config.fileConfig('logging.conf')
-    log = logging.info
-
+def get_parser():
     parser = argparse.ArgumentParser(
         description='CASCADE - Computer Assisted Summarization Combatting Accelerated Decline in Electronic Journalism')
 
@@ -122,10 +204,16 @@ if __name__ == '__main__':
     io = parser.add_argument_group("I/O")
     io.add_argument('-r', '--rouge', type=str, help='Rouge: ROUGE directory', required=False,
                     default="rouge/RELEASE-1.5.5/")
+    io.add_argument('--rouge_engine', type=str, help="Rouge: 'python' (in-process), 'perl' (ROUGE-1.5.5.pl) or "
+                                                     "'verify' (both, logs differences)",
+                    required=False, default="python", choices=["python", "perl", "verify"])
     io.add_argument('-io', '--iobasedir', type=str, help="IO base directory. default is '~/.ukpsummarizer'",
                     required=False,
                     default=path.join(path.expanduser("~"), ".ukpsummarizer"))
 
+    io.add_argument('--session_format', type=str, default="pickle", choices=["pickle", "snapshot"],
+                    help="how the summarizer is stored for later continue calls: 'pickle' (dill) or 'snapshot' "
+                         "(compact arrays, rebuilt from the topic on load). Both can be read.")
     io.add_argument('-out', '--output_filename', type=str, help="output file for JSON", default='tmp/output', required=False)
     # io.add_argument('-fb', '--feedback', type=str, help="List of feedbacks to incorporate prior running any summarization.", default=None, required=False)
     io.add_argument('--scores_dir', type=str, help="scores dumping directory", default="scores_cascade", required=False)
@@ -151,6 +239,17 @@ if __name__ == '__main__':
     fim.add_argument("-rw", nargs=6, type=str, help="random walk", metavar=("ma", "mr", "ia", "ir", "co", "pat"))
     fim.add_argument("-gb", nargs=5, type=str, help="gaussian blur", metavar=("ma", "mr", "ia", "ir", "co"))
     fim.add_argument("-cg", nargs=3, type=str, help="cooccurence graph", metavar=("ws", "fa", "fr"))
+    fi.add_argument("-ann", nargs=3, type=str, metavar=("k", "tables", "bits"),
+                    help="for -rw and -gb: connect each concept only to its k most similar concepts above the cut off, "
+                         "found with a random-projection LSH index with the given number of hash tables and bits "
+                         "instead of comparing all pairs. The estimated recall is logged.")
+    fi.add_argument("-pe", "--propagation_engine", choices=[PROPAGATION_ENGINE_GRAPH, PROPAGATION_ENGINE_ARRAY],
+                    default=PROPAGATION_ENGINE_GRAPH,
+                    help="for -rw and -gb: propagate the feedback on a networkx graph, or on a CSR adjacency with a "
+                         "feedback vector. Both give the same weights, the array engine is faster on large graphs.")
+    fi.add_argument("-fh", "--feedback_history", type=int, default=0, metavar="N",
+                    help="for -rw and -gb: keep the last N feedback updates of the propagation for analysis. Only "
+                         "the current feedback of each concept is kept by default.")
 
     sc = summarizer_parser.add_argument_group("Summarizer configuration")
     sc.add_argument("-s", "--summarizer", choices=["SUME", "UPPER_BOUND", "PROPAGATION"],
@@ -170,6 +269,14 @@ if __name__ == '__main__':
     # sc.add_argument("--weights", type=str, help='Json File which contains the weights for the sumarizer.')
 
     sc.add_argument("--k_size", help="Size of the sentences to be considered for density estimation", type=float, default=0.1)
+    sc.add_argument("--deadline_ms", type=int, default=None,
+                    help="time budget of the ILP per iteration in milliseconds: a greedy summary is improved by the ILP "
+                         "until the deadline. Solves to optimality if not set")
+    sc.add_argument("--summary_method", choices=[SUMMARY_METHOD_ILP, SUMMARY_METHOD_GREEDY, SUMMARY_METHOD_LP],
+                    default=SUMMARY_METHOD_ILP,
+                    help="how the summary is selected: the exact ILP, the lazy greedy approximation or the best "
+                         "rounding of the LP relaxation (with the LP objective as upper bound) for topics where the "
+                         "ILP is too slow")
     sc.add_argument("--pickleout", type=str,
                                    help="Use to pickle summarizer")
 
@@ -184,6 +291,12 @@ if __name__ == '__main__':
     continuation_parser.add_argument("--oracle_labels", type=str,
                                      help='Json File which contains labeled data that has been provided by a human user')
     continuation_parser.add_argument("--k_size", help="Size of the sentences to be considered for density estimation", type=float, default=0.1)
+    continuation_parser.add_argument("--deadline_ms", type=int, default=None,
+                                     help="time budget of the ILP per iteration in milliseconds")
+    continuation_parser.add_argument("--summary_method",
+                                     choices=[SUMMARY_METHOD_ILP, SUMMARY_METHOD_GREEDY, SUMMARY_METHOD_LP],
+                                     default=SUMMARY_METHOD_ILP,
+                                     help="the exact ILP, the lazy greedy approximation or the LP rounding")
 
     #### dataset and other data-related settings
     dc = summarizer_parser.add_argument_group("Data configuration")
@@ -197,162 +310,361 @@ if __name__ == '__main__':
     rouge_parser.add_argument("reference", help="dataset, topic or modelsummary relative to the iobasedir", type=str)
     rouge_parser.add_argument("input", help="the file which contains the text to calc rouge for",type=str)
 
-    args = parser.parse_args()
+    #### persistent worker
+    serve_parser = subparsers.add_parser("serve",
+                                         help="Runs as worker: reads JSON requests {\"id\": .., \"args\": [..]} line by "
+                                              "line, where args are the command line arguments of a single cascade.py "
+                                              "call, and answers with one JSON line per request.")
+    serve_parser.add_argument("--port", type=int, default=None,
+                              help="listen on this port on localhost instead of reading stdin")
+    serve_parser.add_argument("--max_sessions", type=int, default=DEFAULT_CAPACITY,
+                              help="number of summarizer sessions kept in memory; the least recently used ones are "
+                                   "written to disk as delta to their last pickle")
+
+    return parser
+
+
+def run_continue(args, iobasedir, embeddings=None, rouge=None, sessions=None):
+    log("continue !")
+
+    runner = SingleTopicRunner(iobasedir,
+                               args.rouge,
+                               scores_dir=args.scores_dir.replace("\"",""),
+                               out=args.output_filename.replace("\"",""),
+                               override_results_files=args.override_results,
+                               k=args.k_size,
+                               rouge_engine=args.rouge_engine,
+                               rouge=rouge,
+                               session_store=sessions,
+                               session_format=args.session_format,
+                               feedbackstore_factory=get_fbs_factory(iobasedir, embeddings),
+                               deadline_ms=args.deadline_ms,
+                               summary_method=args.summary_method)
+
+    if args.oracle_labels is not None:
+
+        js = json.load(open(path.normpath(args.oracle_labels.replace("\"",""))))
+    else:
+        js = []
 
-    iobasedir = path.expanduser(path.normpath(args.iobasedir.replace("\"","")))
+    picklein = resolve_filename(args.picklein.replace("\"",""), base=iobasedir)
 
-    #args.output_filename= path.join(iobasedir, args.output_filename)
-    log("Output file: %s" % (args.output_filename))
-    if args.command == 'continue':
-        log("continue !")
+    if args.pickleout is None:
+        pickleout=None
+    else:
+        pickleout = resolve_filename(args.pickleout.replace("\"",""), base=iobasedir)
+
+    runner.single_iteration(picklein=picklein, pickleout=pickleout,
+                            feedbacks=js)
+
+
+def run_summarize(args, iobasedir, embeddings=None, topics=None, rouge=None, sessions=None):
+    """
+    :param embeddings: dict language -> embeddings, which is filled lazily and can be reused for further calls.
+    :param topics: cache path -> Topic, see get_topic
+    :param rouge: Rouge instance to use instead of creating a new one
+    :param sessions: SessionStore which keeps the new session in memory
+    """
+
+    # check if the path refers to a dataset, a topic or a sole model:
+    queue = []
+    f = utils.reader.resolve_against_iobase(args.file, iobasedir)
+    if path.exists(path.join(f, "index.json")):
+        # is_dataset
+        d = DataSet(f)
+        # unroll to get topics
+        for t in d.get_topics():
+            for (mf, mt) in t.get_models():
+                mf = path.normpath(mf)
+                pref = path.commonprefix([mf, iobasedir])
+                tn = mf[len(pref) + 1:]
+                print("shortened:", tn)
+                queue.append(mf)
+
+                # topics.append([t.get_name for t in d.get_topics()])
+
+    elif path.exists(path.join(f, "task.json")):
+        # is topic
+        t = get_topic(f, topics)
+        for (mf, mt) in t.get_models():
+            mf = path.normpath(mf)
+            pref = path.commonprefix([mf, iobasedir])
+            tn = mf[len(pref) + 1:]
+            print("shortened:", tn)
+            queue.append(mf)
+    elif path.exists(path.join(f, "..", "..", "task.json")) \
+            and path.exists(f):
+        # should be model
+        queue.append(f)
+    else:
+        raise BaseException("Invalid file given.", f, " is neither a dataset nor a topic nor a model.")
+
+    if args.max_models:
+        queue = queue[:args.max_models]
+
+    if args.pickleout:
+        queue = queue[:1]
+
+
+    queue = [Summary(i, topics) for i in queue]
+
+    embeddings_path = path.normpath(path.join(iobasedir, "embeddings"))
+    if embeddings is None:
+        embeddings = {
+            "english": None,
+            "german": None
+        }
+
+    for m in queue:
+        t = m.get_topic()
+        i = m.get_index()
+
+        log("%s - %s" % (t.get_name(), t.get_language()))
+
+        summary_size = args.summary_size or t.get_summary_size()
+
+        # parse the feedbackstore arguments
+        fbclass, fbkwargs = get_fbs_args(args)
+        if embeddings[t.get_language()] is None:
+            embeddings[t.get_language()] = load_w2v_embeddings(embeddings_path, t.get_language(), "active_learning")
+        e = embeddings[t.get_language()]
+
+        fbs = get_fbs(fbclass, fbkwargs, ConceptEmbedder(e), language=t.get_language(),
+                      stemmer=SnowballStemmer(t.get_language()),
+                      engine=getattr(args, "propagation_engine", PROPAGATION_ENGINE_GRAPH))
+
+        if args.pickleout is not None:
+            pickleout= resolve_filename(args.pickleout.replace("\"",""))
+        else:
+            pickleout=None
 
         runner = SingleTopicRunner(iobasedir,
                                    args.rouge,
                                    scores_dir=args.scores_dir.replace("\"",""),
                                    out=args.output_filename.replace("\"",""),
                                    override_results_files=args.override_results,
-                                   k=args.k_size)
+                                   pickle_store=pickleout,
+                                   k=args.k_size,
+                                   rouge_engine=args.rouge_engine,
+                                   rouge=rouge,
+                                   session_store=sessions,
+                                   session_format=args.session_format,
+                                   deadline_ms=args.deadline_ms,
+                                   summary_method=args.summary_method)
+
+        runner.run(t,
+                   size=summary_size,
+                   summarizer=args.summarizer,
+                   summary_idx=i,
+                   parser=args.concept_type,
+                   oracle=args.oracle,
+                   # feedback_log=args.feedback,
+                   # propagation=False,
+                   max_iteration_count=args.max_iteration_count,
+                   preload_embeddings=e,
+                   feedbackstore=fbs)
+
+    log("finished SingleTopicRunner")
+
+
+def run_rouge(args, iobasedir, topics=None, rouge=None):
+    log("Doing rouge")
+    rouge_dir = args.rouge
+    outfile = path.normpath(args.output_filename)
+    input_file = path.normpath(args.input)
+    with codecs.open(input_file, 'r', 'utf-8') as fp:
+        text = fp.read().splitlines()
+    summary = text or ""
+
+    f = utils.reader.resolve_against_iobase(args.reference, iobasedir)
+    if path.exists(path.join(f, "task.json")):
+        # is topic
+        t = get_topic(f, topics)
+
+        # run rouge on topic
+        lang = t.get_language()
+        max_size = t.get_summary_size()
+
+        # resolved_rouge_dir = path.normpath(path.expanduser(rouge_dir))
+        if rouge is None:
+            rouge = Rouge(rouge_dir, engine=args.rouge_engine)
+        # reference_summaries = [mt for _, mt in t.get_models()]
+
+        r1,r2,r4 = rouge(summary, t.get_models(), max_size)
+        outputfilecontents = {
+            "R1": r1,
+            "R2": r2,
+            "R4": r4
+        }
+        write_to_file(json.dumps(outputfilecontents), outfile)
+    else:
+        raise BaseException("Invalid file given.", f, " is neither a topic nor a model.")
 
-        if args.oracle_labels is not None:
+    log("Done with rouge")
 
-            js = json.load(open(path.normpath(args.oracle_labels.replace("\"",""))))
-        else:
-            js = []
 
-        picklein = resolve_filename(args.picklein.replace("\"",""), base=iobasedir)
+def run_command(args, embeddings=None, topics=None, rouges=None, sessions=None):
+    """
+        executes the continue, summarize or rouge command.
 
-        if args.pickleout is None:
-            pickleout=None
-        else:
-            pickleout = resolve_filename(args.pickleout.replace("\"",""), base=iobasedir)
+    :param rouges: cache (rouge directory, engine) -> Rouge
+    :param sessions: SessionStore, see web.session_store
+    """
+    iobasedir = path.expanduser(path.normpath(args.iobasedir.replace("\"","")))
 
-        runner.single_iteration(picklein=picklein, pickleout=pickleout,
-                                feedbacks=js)
+    rouge = None
+    if rouges is not None:
+        key = (args.rouge, args.rouge_engine)
+        if key not in rouges:
+            rouges[key] = Rouge(args.rouge, engine=args.rouge_engine)
+        rouge = rouges[key]
 
+    #args.output_filename= path.join(iobasedir, args.output_filename)
+    log("Output file: %s" % (args.output_filename))
+    if args.command == 'continue':
+        run_continue(args, iobasedir, embeddings=embeddings, rouge=rouge, sessions=sessions)
     elif args.command == 'summarize':
-
-        # check if the path refers to a dataset, a topic or a sole model:
-        queue = []
-        f = utils.reader.resolve_against_iobase(args.file, iobasedir)
-        if path.exists(path.join(f, "index.json")):
-            # is_dataset
-            d = DataSet(f)
-            # unroll to get topics
-            for t in d.get_topics():
-                for (mf, mt) in t.get_models():
-                    mf = path.normpath(mf)
-                    pref = path.commonprefix([mf, iobasedir])
-                    tn = mf[len(pref) + 1:]
-                    print("shortened:", tn)
-                    queue.append(mf)
-
-                    # topics.append([t.get_name for t in d.get_topics()])
-
-        elif path.exists(path.join(f, "task.json")):
-            # is topic
-            t = Topic(f)
-            for (mf, mt) in t.get_models():
-                mf = path.normpath(mf)
-                pref = path.commonprefix([mf, iobasedir])
-                tn = mf[len(pref) + 1:]
-                print("shortened:", tn)
-                queue.append(mf)
-        elif path.exists(path.join(f, "..", "..", "task.json")) \
-                and path.exists(f):
-            # should be model
-            queue.append(f)
-        else:
-            raise BaseException("Invalid file given.", f, " is neither a dataset nor a topic nor a model.")
-
-        if args.max_models:
-            queue = queue[:args.max_models]
-
-        if args.pickleout:
-            queue = queue[:1]
+        run_summarize(args, iobasedir, embeddings=embeddings, topics=topics, rouge=rouge, sessions=sessions)
+    elif args.command == 'rouge':
+        run_rouge(args, iobasedir, topics=topics, rouge=rouge)
+    log("Done")
 
 
-        queue = [Summary(i) for i in queue]
+class Worker(object):
+    """
+        Executes cascade.py commands in a long-running process. The imports, the embeddings, the topics and the ROUGE
+        engine (including its reference indices) are kept between the requests, as well as the most recently used
+        summarizer sessions.
+    """
 
-        embeddings_path = path.normpath(path.join(iobasedir, "embeddings"))
-        embeddings = {
+    def __init__(self, parser, max_sessions=DEFAULT_CAPACITY):
+        self.parser = parser
+        self.embeddings = {
             "english": None,
             "german": None
         }
+        self.topics = {}
+        self.rouges = {}
+        self.sessions = SessionStore(max_sessions)
+
+    def execute(self, request):
+        """
+        :param request: dict with the command line arguments in "args" and an optional "id"
+        :return: the response dict
+        """
+        response = {"id": request.get("id")}
+        start = time.time()
+        try:
+            args = self.parser.parse_args(request["args"])
+            if args.command == 'serve':
+                raise ValueError("serve cannot be nested")
+            run_command(args, embeddings=self.embeddings, topics=self.topics, rouges=self.rouges,
+                        sessions=self.sessions)
+            response["status"] = "ok"
+            response["output_filename"] = args.output_filename
+        except SystemExit as e:
+            # argparse exits on invalid arguments
+            response["status"] = "error"
+            response["error"] = "invalid arguments (exit code %s)" % (e.code)
+        except KeyboardInterrupt:
+            raise
+        except BaseException as e:
+            # cascade raises BaseException for invalid input files
+            logging.getLogger("Worker").exception("request %s failed" % (response["id"]))
+            response["status"] = "error"
+            response["error"] = "%s: %s" % (type(e).__name__, e)
+            response["traceback"] = traceback.format_exc()
+        response["time"] = time.time() - start
+        return response
+
+    def handle_line(self, line):
+        """
+        :return: the response as JSON line, or None if the worker should shut down.
+        """
+        line = line.strip()
+        if not line:
+            return ""
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return json.dumps({"id": None, "status": "error", "error": "invalid request: %s" % (e)}) + "\n"
+        if request.get("shutdown"):
+            return None
+        return json.dumps(self.execute(request)) + "\n"
+
+    def close(self):
+        """
+            writes the deltas of the sessions in memory, so that they can be resumed by the next worker.
+        """
+        self.sessions.spill_all()
+
+
+def serve_stdin(worker):
+    """
+        JSON lines protocol on stdin/stdout. All other output (prints, log messages) is moved to stderr.
+    """
+    protocol_out = sys.stdout
+    for logger in [logging.getLogger()] + list(logging.Logger.manager.loggerDict.values()):
+        for handler in getattr(logger, "handlers", []):
+            if isinstance(handler, logging.StreamHandler) and handler.stream is sys.stdout:
+                handler.stream = sys.stderr
+    sys.stdout = sys.stderr
+
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            break
+        response = worker.handle_line(line)
+        if response is None:
+            break
+        protocol_out.write(response)
+        protocol_out.flush()
+
+
+def serve_socket(worker, port):
+    """
+        JSON lines protocol on a TCP socket on localhost. Requests are handled one after the other.
+    """
+    import SocketServer
+
+    class RequestHandler(SocketServer.StreamRequestHandler):
+        def handle(self):
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    break
+                response = worker.handle_line(line)
+                if response is None:
+                    self.server.shutdown_requested = True
+                    break
+                self.wfile.write(response)
+                self.wfile.flush()
+
+    SocketServer.TCPServer.allow_reuse_address = True
+    server = SocketServer.TCPServer(("127.0.0.1", port), RequestHandler)
+    server.shutdown_requested = False
+    log("serving on 127.0.0.1:%s" % (port))
+    while not server.shutdown_requested:
+        server.handle_request()
+    server.server_close()
 
-        for m in queue:
-            t = m.get_topic()
-            i = m.get_index()
 
-            log("%s - %s" % (t.get_name(), t.get_language()))
-
-            summary_size = args.summary_size or t.get_summary_size()
+if __name__ == '__main__':
+    import logging.config
 
-            # parse the feedbackstore arguments
-            fbclass, fbkwargs = get_fbs_args(args)
-            if embeddings[t.get_language()] is None:
-                embeddings[t.get_language()] = load_w2v_embeddings(embeddings_path, t.get_language(), "active_learning")
-            e = embeddings[t.get_language()]
+    logging.config.fileConfig('logging.conf')
 
-            fbs = get_fbs(fbclass, fbkwargs, ConceptEmbedder(e), language=t.get_language(),
-                          stemmer=SnowballStemmer(t.get_language()))
+    parser = get_parser()
+    args = parser.parse_args()
 
-            if args.pickleout is not None:
-                pickleout= resolve_filename(args.pickleout.replace("\"",""))
+    if args.command == 'serve':
+        worker = Worker(parser, max_sessions=args.max_sessions)
+        try:
+            if args.port is None:
+                serve_stdin(worker)
             else:
-                pickleout=None
-
-            runner = SingleTopicRunner(iobasedir,
-                                       args.rouge,
-                                       scores_dir=args.scores_dir.replace("\"",""),
-                                       out=args.output_filename.replace("\"",""),
-                                       override_results_files=args.override_results,
-                                       pickle_store=pickleout,
-                                       k=args.k_size)
-
-            runner.run(t,
-                       size=summary_size,
-                       summarizer=args.summarizer,
-                       summary_idx=i,
-                       parser=args.concept_type,
-                       oracle=args.oracle,
-                       # feedback_log=args.feedback,
-                       # propagation=False,
-                       max_iteration_count=args.max_iteration_count,
-                       preload_embeddings=e,
-                       feedbackstore=fbs)
-
-        log("finished SingleTopicRunner")
-    elif args.command == 'rouge':
-        log("Doing rouge")
-        rouge_dir = args.rouge
-        outfile = path.normpath(args.output_filename)
-        input_file = path.normpath(args.input)
-        with codecs.open(input_file, 'r', 'utf-8') as fp:
-            text = fp.read().splitlines()
-        summary = text or ""
-
-        f = utils.reader.resolve_against_iobase(args.reference, iobasedir)
-        if path.exists(path.join(f, "task.json")):
-            # is topic
-            t = Topic(f)
-
-            # run rouge on topic
-            lang = t.get_language()
-            max_size = t.get_summary_size()
-
-            # resolved_rouge_dir = path.normpath(path.expanduser(rouge_dir))
-            rouge = Rouge(rouge_dir)
-            # reference_summaries = [mt for _, mt in t.get_models()]
-
-            r1,r2,r4 = rouge(summary, t.get_models(), max_size)
-            outputfilecontents = {
-                "R1": r1,
-                "R2": r2,
-                "R4": r4
-            }
-            write_to_file(json.dumps(outputfilecontents), outfile)
-        else:
-            raise BaseException("Invalid file given.", f, " is neither a topic nor a model.")
-
-        log("Done with rouge")
-    log("Done")
+                serve_socket(worker, args.port)
+        finally:
+            worker.close()
+    else:
+        run_command(args)
@@ -18,3 +18,7 @@ ORACLE_TYPE_REJECT_ALL = 'reject_all'
 CHANGE_WEIGHT_MODE_ACCEPT = 'accept'
 CHANGE_WEIGHT_MODE_REJECT = 'reject'
 CHANGE_WEIGHT_MODE_IMPLICIT_REJECT = 'implicit_reject'
+
+SUMMARY_METHOD_ILP = 'ilp'
+SUMMARY_METHOD_GREEDY = 'greedy'
+SUMMARY_METHOD_LP = 'lp'
@@ -1,4 +1,6 @@
+import hashlib
 import json
+import multiprocessing
 import sys, os.path as path
 import codecs
 import unicodedata
@@ -21,10 +23,70 @@ from nltk.tokenize import word_tokenize
 PROJECT_PATH = path.dirname(path.dirname(path.dirname(path.abspath(__file__))))
 PUNCT = tuple(string.punctuation + "'")
 
+PARSER_BATCH_SIZE = 500
+""" sentences per call of the Stanford parser, each call starts a new parser process """
+INGEST_STAMP = "ingest.json"
+""" written into the processed topic directory when all outputs of a topic are written """
+INGEST_VERSION = 1
+
+cleaner = None
+""" the CorpusCleaner of a worker process of the parallel ingest """
+
+
+def input_signature(files, parse_type):
+    """
+        hash over the names, sizes and modification times of the input files of a topic, and the parse type. A topic
+        whose signature matches the one of its ingest stamp is up to date.
+    """
+    m = hashlib.sha256()
+    m.update(json.dumps([INGEST_VERSION, parse_type]))
+    for f in sorted(files):
+        st = os.stat(f)
+        m.update(json.dumps([path.basename(f), st.st_size, int(st.st_mtime)]))
+    return m.hexdigest()
+
+
+def list_files(*directories):
+    files = []
+    for d in directories:
+        if path.isdir(d):
+            files.extend(path.join(d, f) for f in os.listdir(d))
+    return files
+
+
+def batch_docs(docs, batch_size):
+    """
+        groups consecutive documents into batches of at least one document and at most batch_size sentences (unless a
+        single document is longer)
+    """
+    batch = []
+    count = 0
+    for doc_name, doc in docs:
+        if batch and count + len(doc) > batch_size:
+            yield batch
+            batch = []
+            count = 0
+        batch.append((doc_name, doc))
+        count += len(doc)
+    if batch:
+        yield batch
+
+
+def init_worker(corpus_cleaner):
+    global cleaner
+    cleaner = corpus_cleaner
+
+
+def process_topic_job(job):
+    ctopic, load, parse_type, signature = job
+    docs, summaries = cleaner.load_topic(load)
+    return cleaner.process_topic(ctopic, docs, summaries, parse_type, signature)
+
 
 class CorpusCleaner(object):
-    def __init__(self, datasets_path, corpus_name, parse_type, lang='english'):
+    def __init__(self, datasets_path, corpus_name, parse_type, lang='english', parser_batch_size=PARSER_BATCH_SIZE):
         self.datasets_path = datasets_path
+        self.parser_batch_size = parser_batch_size
         self.corpus_name = corpus_name
         self.corpus_path = path.join(datasets_path, 'raw', corpus_name)
         self.docs_path = path.join(self.corpus_path, "docs")
@@ -129,46 +191,119 @@ class CorpusCleaner(object):
             summaries.append((model_file, data))
         return (docs, summaries)
 
-    def cleanWiki_data(self, parse_type):
-        for ctopic in os.listdir(self.corpus_path):
-            docs, summaries = self.loadWiki_cluster(ctopic)
-            print 'TOPIC:', ctopic
-            if parse_type == 'parse':
-                parsed_docs = self.runparser_data(docs)
-                parsed_summaries = self.runparser_data(summaries)
-                self.create_processed(ctopic, parsed_docs, doc_type='docs.parsed')
-                self.create_processed(ctopic, parsed_summaries, doc_type='summaries.parsed')
-            self.create_processed(ctopic, docs, doc_type='docs')
-            self.create_processed(ctopic, summaries, doc_type='summaries')
+    def cleanWiki_data(self, parse_type, workers=1):
+        def topics():
+            for ctopic in os.listdir(self.corpus_path):
+                cluster_path = '%s/%s/' % (self.corpus_path, ctopic)
+                inputs = list_files('%s/input/' % (cluster_path), '%s/reference/' % (cluster_path))
+                yield ctopic, inputs, ('loadWiki_cluster', (ctopic,))
 
-    def cleanDIP_data(self, parse_type):
-        for ctopic in os.listdir(self.corpus_path):
-            docs, summaries = self.load_processDIP(ctopic)
-            ctopic = ctopic[:ctopic.rfind('.')]
-            dir_path = path.join(self.cleaned_path, self.corpus_name, ctopic, "docs")
-            if parse_type == 'parse':
-                parsed_docs = self.runparser_data(docs)
-                parsed_summaries = self.runparser_data(summaries)
-                self.create_processed(ctopic, parsed_docs, doc_type='docs.parsed')
-                self.create_processed(ctopic, parsed_summaries, doc_type='summaries.parsed')
-            self.create_processed(ctopic, docs, doc_type='docs')
-            self.create_processed(ctopic, summaries, doc_type='summaries')
+        self.ingest(topics(), parse_type, workers)
+
+    def cleanDIP_data(self, parse_type, workers=1):
+        def topics():
+            for cfile in os.listdir(self.corpus_path):
+                ctopic = cfile[:cfile.rfind('.')]
+                yield ctopic, [path.join(self.corpus_path, cfile)], ('load_processDIP', (cfile,))
 
+        self.ingest(topics(), parse_type, workers)
 
-    def cleanDBS_data(self, parse_type):
+    def cleanDBS_data(self, parse_type, workers=1):
         docs_file = "%s/dbs-documents.xml" % (self.docs_path)
         summaries_file = "%s/dbs-summary.xml" % (self.models_path)
-        docs_data, summaries_data = self.load_processDBS(docs_file, summaries_file)
-        for ctopic in docs_data:
-            docs, summaries = docs_data[ctopic], summaries_data[ctopic]
-            dir_path = path.join(self.cleaned_path, self.corpus_name, ctopic, "docs")
+        # both files hold all topics, they are parsed once and passed to the workers with the CorpusCleaner
+        self.dbs_data = self.load_processDBS(docs_file, summaries_file)
+
+        def topics():
+            for ctopic in self.dbs_data[0]:
+                yield ctopic, [docs_file, summaries_file], ('load_DBS_topic', (ctopic,))
+
+        self.ingest(topics(), parse_type, workers)
+
+    def load_DBS_topic(self, ctopic):
+        docs_data, summaries_data = self.dbs_data
+        return docs_data[ctopic], summaries_data[ctopic]
+
+    def ingest(self, topics, parse_type, workers=1):
+        """
+            writes the processed (and parsed) documents and summaries of the topics which are not up to date. With more
+            than one worker, the topics are processed in a process pool. Only the topic names and loaders are passed to
+            the workers, which load the documents themselves, so the documents of at most one topic per worker are in
+            memory at a time.
+
+        :param topics: iterable of (topic name, list of input files, load), where load is a (method name, arguments)
+            tuple, see load_topic
+        """
+        def pending():
+            for ctopic, inputs, load in topics:
+                signature = input_signature(inputs, parse_type)
+                if self.is_up_to_date(ctopic, signature):
+                    print 'Up to date:', ctopic
+                    continue
+                print "Cleaning ", ctopic
+                yield ctopic, load, parse_type, signature
+
+        if workers > 1:
+            pool = multiprocessing.Pool(workers, initializer=init_worker, initargs=(self,))
+            try:
+                for ctopic, done in pool.imap_unordered(process_topic_job, pending()):
+                    print 'Finished:' if done else 'Failed:', ctopic
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for ctopic, load, parse_type, signature in pending():
+                docs, summaries = self.load_topic(load)
+                self.process_topic(ctopic, docs, summaries, parse_type, signature)
+
+    def load_topic(self, load):
+        """
+        :param load: (method name, arguments) of the method of this CorpusCleaner which loads the topic, e.g.
+            ('clean_DUC_cluster', (ctopic,)). Unlike a closure, it can be sent to a worker process.
+        :return: (docs, summaries)
+        """
+        method, args = load
+        return getattr(self, method)(*args)
+
+    def stamp_file(self, ctopic):
+        return path.join(self.cleaned_path, self.corpus_name, ctopic, INGEST_STAMP)
+
+    def is_up_to_date(self, ctopic, signature):
+        stamp = self.stamp_file(ctopic)
+        if not path.isfile(stamp):
+            return False
+        with open(stamp) as fp:
+            return json.load(fp).get("signature") == signature
+
+    def process_topic(self, ctopic, docs, summaries, parse_type, signature=None):
+        """
+            writes the processed (and parsed) documents and summaries of a topic, and then the ingest stamp with the
+            signature of the inputs. A failed topic has no stamp and is processed again by the next ingest.
+
+        :return: (ctopic, True if the topic was written)
+        """
+        stamp = self.stamp_file(ctopic)
+        if path.isfile(stamp):
+            os.remove(stamp)
+        try:
             if parse_type == 'parse':
-                parsed_docs = self.runparser_data(docs)
-                parsed_summaries = self.runparser_data(summaries)
-                self.create_processed(ctopic, parsed_docs, doc_type='docs.parsed')
-                self.create_processed(ctopic, parsed_summaries, doc_type='summaries.parsed')
+                self.runparser_data(docs, ctopic=ctopic, doc_type='docs.parsed')
+                self.runparser_data(summaries, ctopic=ctopic, doc_type='summaries.parsed')
+            if parse_type == 'props':
+                parsed_docs = self.runprops_data(docs)
+                parsed_summaries = self.runprops_data(summaries)
+                self.create_processed(ctopic, parsed_docs, doc_type='docs.props')
+                self.create_processed(ctopic, parsed_summaries, doc_type='summaries.props')
+
             self.create_processed(ctopic, docs, doc_type='docs')
             self.create_processed(ctopic, summaries, doc_type='summaries')
+        except Exception:
+            t, v, st = sys.exc_info()
+            print "error cleaning %s - type: %s, value %s" % (ctopic, t, v)
+            return ctopic, False
+        if signature is not None:
+            write_to_file(json.dumps({"signature": signature, "parse_type": parse_type}), stamp)
+        return ctopic, True
 
     def create_processed(self, ctopic, docs, doc_type):
         for doc_name, doc_sents in docs:
@@ -179,16 +314,29 @@ class CorpusCleaner(object):
             filename = path.join(dir_path, doc_name)
             write_to_file(data, filename)
 
-    def runparser_data(self, docs):
+    def runparser_data(self, docs, batch_size=None, ctopic=None, doc_type=None):
+        """
+            parses the documents with the Stanford parser. The sentences of consecutive documents are parsed in one call
+            of up to batch_size sentences (default self.parser_batch_size). If ctopic and doc_type are given, the parsed
+            documents of each batch are written as soon as the batch is done.
+        """
         new_docs = []
-        for doc_name, doc in docs:
-            print 'Processing:', doc_name
-            sentences = self.parser.raw_parse_sents(doc)
+        for batch in batch_docs(docs, batch_size or self.parser_batch_size):
+            print 'Processing:', ', '.join([doc_name for doc_name, _ in batch])
+            sentences = self.parser.raw_parse_sents([sent for _, doc in batch for sent in doc])
             sents = []
             for sent in sentences:
                 parsestr = unicode(list(sent)[0])
                 sents.append(remove_spaces_lines(parsestr))
-            new_docs.append((doc_name, sents))
+
+            parsed_batch = []
+            start = 0
+            for doc_name, doc in batch:
+                parsed_batch.append((doc_name, sents[start:start + len(doc)]))
+                start += len(doc)
+            if ctopic is not None:
+                self.create_processed(ctopic, parsed_batch, doc_type)
+            new_docs.extend(parsed_batch)
         return new_docs
     
     def props_exception(self, doc_name, doc):
@@ -222,38 +370,25 @@ class CorpusCleaner(object):
             new_docs.append((doc_name, parse_sents))
         return new_docs
 
-    def cleanDuc_data(self, parse_type):
+    def cleanDuc_data(self, parse_type, workers=1):
         if path.exists(self.topics_file):
             task_extractor = TaskExtractor(path.join(self.cleaned_path, self.corpus_name))
             task_extractor.process(self.topics_file)
-        for ctopic in os.listdir(self.docs_path):
-            print "Cleaning ", ctopic
-            try:
-                docs, summaries = self.clean_DUC_cluster(ctopic)
+
+        def topics():
+            for ctopic in os.listdir(self.docs_path):
                 dir_path = path.join(self.cleaned_path, self.corpus_name, ctopic, "docs.props")
-                
                 if path.isdir(dir_path):
                     print 'Cleaning:', dir_path
                     #clean_create_dir(dir_path)
                     continue
-                
-                if parse_type == 'parse':
-                    parsed_docs = self.runparser_data(docs)
-                    parsed_summaries = self.runparser_data(summaries)
-                    self.create_processed(ctopic, parsed_docs, doc_type='docs.parsed')
-                    self.create_processed(ctopic, parsed_summaries, doc_type='summaries.parsed')
-                if parse_type == 'props':
-                    parsed_docs = self.runprops_data(docs)
-                    parsed_summaries = self.runprops_data(summaries)
-                    self.create_processed(ctopic, parsed_docs, doc_type='docs.props')
-                    self.create_processed(ctopic, parsed_summaries, doc_type='summaries.props')
-                    
-                self.create_processed(ctopic, docs, doc_type='docs')
-                self.create_processed(ctopic, summaries, doc_type='summaries')
-            except 'Exception':
-                t, v, st = sys.exc_info()
-                print "error cleaning %s - type: %s, value %s" % (ctopic, t, v)
-                exit(0)
+
+                cid = "%s.M." % (ctopic[:-1].upper())
+                inputs = list_files(path.join(self.docs_path, ctopic)) + \
+                    [path.join(self.models_path, f) for f in os.listdir(self.models_path) if f.startswith(cid)]
+                yield ctopic, inputs, ('clean_DUC_cluster', (ctopic,))
+
+        self.ingest(topics(), parse_type, workers)
 
     def copy_ssummaries(self, topic_summ, smodels_org, smodels_dir):
         for ssumm_file in topic_summ:
@@ -3,8 +3,9 @@ import os
 sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
 
 import argparse
+import multiprocessing
 
-from corpus_cleaner import CorpusCleaner
+from corpus_cleaner import CorpusCleaner, PARSER_BATCH_SIZE
 
 
 def make_data_argument_parser():
@@ -24,6 +25,11 @@ def make_data_argument_parser():
 
     parser.add_argument('-l', '--language', help="Language", type=str, required=False)
 
+    parser.add_argument('-w', '--workers', help="Number of worker processes, 0 uses all cores. Topics whose inputs did not change since the last run are skipped", type=int, required=False, default=1)
+
+    parser.add_argument('-b', '--batch_size', help="Sentences per call of the Stanford parser", type=int, required=False,
+                        default=PARSER_BATCH_SIZE)
+
     # iobasedir
     # parser.add_argument('-i', '--iobase',
     #                     help="base directory",
@@ -43,19 +49,20 @@ def main():
     language = args.language
     # iobase_dir = args.iobase
     data_path = path.normpath(args.data_path)
+    workers = args.workers or multiprocessing.cpu_count()
 
     if parse_type !=None and language==None:
         raise AttributeError('Please specify language')
         
-    corpus = CorpusCleaner(data_path, corpus_name, parse_type, language)
+    corpus = CorpusCleaner(data_path, corpus_name, parse_type, language, parser_batch_size=args.batch_size)
     if corpus_name[:3] == 'DUC' or corpus_name[:3] == 'TAC':
-        corpus.cleanDuc_data(parse_type)
+        corpus.cleanDuc_data(parse_type, workers)
     if corpus_name[:3] == 'DBS':
-        corpus.cleanDBS_data(parse_type)
+        corpus.cleanDBS_data(parse_type, workers)
     if corpus_name == 'WikiAIPHES':
-        corpus.cleanWiki_data(parse_type)
+        corpus.cleanWiki_data(parse_type, workers)
     if corpus_name[:3] == 'DIP':
-        corpus.cleanDIP_data(parse_type)
+        corpus.cleanDIP_data(parse_type, workers)
     else:
         pass
 
@@ -0,0 +1,154 @@
+import hashlib
+import mmap
+import os
+from os import path
+
+
+class LazyDocument(object):
+    """
+    The sentences of a processed document (one per line), read from the memory-mapped file when they are iterated,
+    instead of a list of all lines. Gives the same lines as codecs.open(filename, 'r', 'utf-8').read().splitlines().
+
+    The file is mapped on first use and stays mapped for the lifetime of the document (or until close()). Random access
+    (doc[i], len(doc)) and digest() scan the file once, which builds an index of the line positions and the digest of
+    the lines; the text is not kept.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.map = None
+        self.index = None
+        """ list of (start, end, k): line i is the k-th line of the bytes start:end of the file """
+        self.sha256 = None
+
+    def __map__(self):
+        """
+        :return: the mmap of the file, None if the file is empty
+        """
+        if self.map is None:
+            with open(self.filename, 'rb') as fp:
+                if os.fstat(fp.fileno()).st_size == 0:
+                    return None
+                # the mapping stays valid after the file is closed
+                self.map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.map
+
+    def __chunks__(self):
+        """
+        :return: iterator of (start, end, bytes) of the lines of the file, split at "\\n" only
+        """
+        m = self.__map__()
+        if m is None:
+            return
+        start, size = 0, len(m)
+        while start < size:
+            end = m.find(b"\n", start)
+            end = size if end < 0 else end + 1
+            yield start, end, m[start:end]
+            start = end
+
+    def __iter__(self):
+        for _, _, chunk in self.__chunks__():
+            # splitlines also splits at "\r" and the unicode line breaks, like reading the whole file
+            for line in chunk.decode('utf-8').splitlines():
+                yield line
+
+    def __scan__(self):
+        index = []
+        m = hashlib.sha256()
+        for start, end, chunk in self.__chunks__():
+            lines = chunk.decode('utf-8').splitlines()
+            index.extend((start, end, k) for k in range(len(lines)))
+            for line in lines:
+                m.update(b"\n")
+                m.update(line.encode('utf-8'))
+        self.index = index
+        self.sha256 = m.hexdigest()
+
+    def digest(self):
+        """
+        :return: the sha256 of the lines of the document, see document_digest
+        """
+        if self.sha256 is None:
+            self.__scan__()
+        return self.sha256
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+    def __len__(self):
+        if self.index is None:
+            self.__scan__()
+        return len(self.index)
+
+    def __getitem__(self, i):
+        if self.index is None:
+            self.__scan__()
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self.index)))]
+        start, end, k = self.index[i]
+        return self.__map__()[start:end].decode('utf-8').splitlines()[k]
+
+    def __getstate__(self):
+        # the file is mapped again on the next access
+        state = self.__dict__.copy()
+        state["map"] = None
+        return state
+
+    def __repr__(self):
+        return "LazyDocument(%r)" % (self.filename)
+
+
+def document_digest(sentences):
+    """
+    the sha256 of the sentences of a document, each one preceded by "\\n". A LazyDocument computes it together with its
+    line index, so it is read once.
+
+    :param sentences: LazyDocument or list of sentences
+    """
+    if hasattr(sentences, "digest"):
+        return sentences.digest()
+    m = hashlib.sha256()
+    for sentence in sentences:
+        m.update(b"\n")
+        m.update(sentence.encode('utf-8'))
+    return m.hexdigest()
+
+
+class DocumentStream(object):
+    """
+    The documents of a directory as (filename, LazyDocument) tuples, a drop-in for the (filename, list of sentences)
+    lists of Topic.read: it can be iterated several times, indexed and has a length, but no sentence is held in memory.
+    Every access returns the same LazyDocument of a file, so its mapping, line index and digest are reused.
+    """
+
+    def __init__(self, location, file_names=None):
+        """
+        :param file_names: the files of the location to use, in this order. Default: all, in the order of os.listdir
+        """
+        self.location = location
+        if file_names is None:
+            file_names = os.listdir(location)
+        self.files = [path.normpath(path.join(location, f)) for f in file_names]
+        self.documents = [None] * len(self.files)
+
+    def __len__(self):
+        return len(self.files)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self.files)))]
+        if self.documents[i] is None:
+            self.documents[i] = LazyDocument(self.files[i])
+        return self.files[i], self.documents[i]
+
+    def __iter__(self):
+        for i in range(len(self.files)):
+            yield self[i]
+
+    def close(self):
+        for document in self.documents:
+            if document is not None:
+                document.close()
@@ -3,6 +3,8 @@ import json
 import os
 from os import path
 
+from model.document_stream import DocumentStream
+
 
 class Topic(object):
     """
@@ -36,15 +38,20 @@ class Topic(object):
         (_, f) = path.split(self.base_path)
         return f
 
-    def get_docs(self, parsed=False):
-        if parsed:
-            return self.read(self.parsed_docs_dir)
-        return self.read(self.docs_dir)
+    def get_docs(self, parsed=False, stream=False):
+        """
+        :param stream: if True, return a DocumentStream, which reads the sentences lazily
+        """
+        location = self.parsed_docs_dir if parsed else self.docs_dir
+        if stream:
+            return DocumentStream(location)
+        return self.read(location)
 
-    def get_models(self, parsed=False):
-        if parsed:
-            return self.read(self.parsed_models_dir)
-        return self.read(self.models_dir)
+    def get_models(self, parsed=False, stream=False):
+        location = self.parsed_models_dir if parsed else self.models_dir
+        if stream:
+            return DocumentStream(location)
+        return self.read(location)
 
     def get_language(self):
         return self.dataset_info["language"]
@@ -68,8 +75,11 @@ class Topic(object):
         return documents
 
     def get_parse_info(self, m_idx):
-        parse_docs = self.read(self.parsed_docs_dir)
-        parse_models = self.read(self.parsed_models_dir)
+        """
+            the parse trees of the docs and of the m_idx-th model, as documents which are read on access
+        """
+        parse_docs = DocumentStream(self.parsed_docs_dir)
+        parse_models = DocumentStream(self.parsed_models_dir)
         return [parse_docs, [parse_models[m_idx]]]
 
     def get_summary_size(self):
@@ -0,0 +1,58 @@
+"""
+Shows the memory footprint of the feedback of a word-embedding feedback store across feedback iterations: the size of
+the FeedbackHistory arrays, the size of the pickled store (i.e. its share of a session pickle), and for comparison the
+estimated size of the former per-node lists, which kept every propagated value.
+
+    python performance_utils/feedback_memory_benchmark.py --concepts 2000 --iterations 20 --iterations_accept 10000
+    python performance_utils/feedback_memory_benchmark.py --store gb --engine array --history_size 100000
+"""
+from __future__ import print_function
+
+import argparse
+import pickle
+import random
+import sys
+import os.path as path
+
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+
+from algorithms.flight_recorder import FlightRecorder
+from performance_utils.propagation_benchmark import STORES, make_topic, make_records
+
+LIST_ENTRY_BYTES = 8 + 24
+""" a float in a python list: the pointer in the list plus the float object """
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Memory footprint of the feedback history per session')
+    parser.add_argument('--store', choices=sorted(STORES), default="rw")
+    parser.add_argument('--engine', choices=["graph", "array"], default="graph")
+    parser.add_argument('--concepts', type=int, default=2000)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--iterations_accept', type=int, default=1000,
+                        help="propagation iterations per accepted and rejected concept")
+    parser.add_argument('--history_size', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    embedder, sentences, weights = make_topic(args.concepts, seed=args.seed)
+    records = make_records(sorted(weights), args.iterations, seed=args.seed)
+
+    graph_cls, array_cls = STORES[args.store]
+    cls = graph_cls if args.engine == "graph" else array_cls
+    fbs = cls(embedder, iterations_accept=args.iterations_accept, iterations_reject=args.iterations_accept,
+              history_size=args.history_size)
+    fbs.add_sentences(sentences, weights, max(weights.values()))
+    # the embedder is shared by all sessions of a topic, it is not part of the footprint
+    fbs.concept_embedder = None
+
+    random.seed(args.seed)
+    recorder = FlightRecorder()
+    print("%9s %12s %16s %16s %20s" % ("iteration", "updates", "feedback [B]", "pickle [B]", "former lists [B]"))
+    for iteration, (accept, reject) in enumerate(records):
+        recorder.record(accept, reject, [])
+        fbs.incorporate_feedback(recorder)
+        updates = fbs.feedback.updates
+        print("%9d %12d %16d %16d %20d" % (iteration + 1, updates, fbs.feedback.nbytes(),
+                                           len(pickle.dumps(fbs, protocol=2)),
+                                           (len(fbs.feedback) + updates) * LIST_ENTRY_BYTES))
@@ -0,0 +1,64 @@
+"""
+Compares the lazy greedy selection (ConceptBasedILPSummarizer.lazy_greedy_approximation) with the former greedy
+approximation, which sorts all sentences in every round, and with the ILP optimum on synthetic topics: the time of
+each method and the objective of the greedy solutions relative to the optimum.
+
+    python performance_utils/greedy_benchmark.py --sizes 1000 5000 20000 --partial_enumeration 1
+"""
+from __future__ import print_function
+
+import argparse
+import sys
+import os.path as path
+from time import time as timer
+
+sys.path.append(path.dirname(path.dirname(path.dirname(path.abspath(__file__)))))
+
+from summarizer.performance_utils.ilp_benchmark import make_synthetic_summarizer
+
+
+def timed(f, *args, **kwargs):
+    t0 = timer()
+    result = f(*args, **kwargs)
+    return timer() - t0, result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the lazy greedy selection against the greedy '
+                                                 'approximation and the ILP')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--summary_size', type=int, default=100)
+    parser.add_argument('--partial_enumeration', type=int, default=0,
+                        help='also run the lazy greedy selection with partial enumeration of k sentences')
+    parser.add_argument('--ilp_max_size', type=int, default=5000,
+                        help='the ILP is only solved for topics up to this number of sentences')
+    parser.add_argument('--solver', type=str, default=None, help='cplex, pulp, glpk or gurobi')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print("%9s %12s %12s %12s %12s %10s %10s %10s" % ("sentences", "greedy [s]", "lazy [s]", "enum [s]", "ilp [s]",
+                                                      "lazy/opt", "enum/opt", "same"))
+    for size in args.sizes:
+        summarizer = make_synthetic_summarizer(size, num_concepts=size * 4, seed=args.seed)
+
+        greedy_time, (greedy_value, greedy_subset) = timed(summarizer.greedy_approximation, args.summary_size)
+        lazy_time, (lazy_value, lazy_subset) = timed(summarizer.lazy_greedy_approximation, args.summary_size)
+
+        enum_time, enum_value = float("nan"), None
+        if args.partial_enumeration:
+            enum_time, (enum_value, _) = timed(summarizer.lazy_greedy_approximation, args.summary_size,
+                                               partial_enumeration=args.partial_enumeration)
+
+        ilp_time, optimum = float("nan"), None
+        if size <= args.ilp_max_size:
+            ilp_time, (optimum, _) = timed(summarizer.solve_ilp_problem, summary_size=args.summary_size,
+                                           solver=args.solver)
+
+        def ratio(value):
+            if value is None or not optimum:
+                return float("nan")
+            return value / float(optimum)
+
+        print("%9d %12.4f %12.4f %12.4f %12.4f %10.4f %10.4f %10s" % (
+            size, greedy_time, lazy_time, enum_time, ilp_time, ratio(lazy_value), ratio(enum_value),
+            greedy_subset == lazy_subset))
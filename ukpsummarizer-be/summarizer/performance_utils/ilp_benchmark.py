@@ -0,0 +1,72 @@
+from __future__ import print_function
+
+import argparse
+import random
+import sys
+import os.path as path
+from time import time as timer
+
+sys.path.append(path.dirname(path.dirname(path.dirname(path.abspath(__file__)))))
+
+from summarizer.baselines.sume.base import Sentence
+from summarizer.baselines.sume.models.concept_based import ConceptBasedILPSummarizer
+
+
+def make_synthetic_summarizer(num_sentences, num_concepts, concepts_per_sentence=12, num_docs=10, seed=0):
+    """
+    Creates a ConceptBasedILPSummarizer on a synthetic topic. Concepts are drawn from a zipf-like distribution, so that
+    the incidence matrix is as sparse as the ones of the real topics.
+    """
+    rnd = random.Random(seed)
+    concepts = ["concept%s" % i for i in range(num_concepts)]
+
+    summarizer = ConceptBasedILPSummarizer(" ", "english")
+    for j in range(num_sentences):
+        sentence_concepts = [concepts[min(int(rnd.paretovariate(0.8)), num_concepts) - 1]
+                             if rnd.random() < 0.5 else rnd.choice(concepts)
+                             for _ in range(concepts_per_sentence)]
+        tokens = " ".join(sentence_concepts).split(" ")
+        sentence = Sentence(tokens, j % num_docs, j)
+        sentence.concepts = sentence_concepts
+        sentence.untokenized_form = " ".join(tokens)
+        sentence.length = rnd.randint(8, 40)
+        summarizer.sentences.append(sentence)
+
+    summarizer.compute_document_frequency()
+    return summarizer
+
+
+def benchmark(sizes, summary_size=100, repetitions=3, solver=None):
+    """
+    Reports the time needed to build the ILP and the time needed to solve it separately, for a growing number of
+    sentences S.
+
+    :param solver: the ILP backend, see utils.ilp_solvers.get_solver
+    """
+    print("%8s %8s %12s %12s %12s" % ("S", "C", "build [s]", "solve [s]", "objective"))
+    for S in sizes:
+        builds, solves = [], []
+        objective = None
+        for r in range(repetitions):
+            summarizer = make_synthetic_summarizer(S, num_concepts=S * 4, seed=r)
+
+            t0 = timer()
+            model, s = summarizer.build_ilp_problem(summary_size=summary_size, solver=solver)
+            builds.append(timer() - t0)
+
+            t0 = timer()
+            objective = model.solve()
+            solves.append(timer() - t0)
+
+        print("%8s %8s %12.4f %12.4f %12s" % (S, len(summarizer.weights), min(builds), min(solves), objective))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark ILP build and solve time for a growing number of sentences')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[250, 500, 1000, 2000, 4000])
+    parser.add_argument('--summary_size', type=int, default=100)
+    parser.add_argument('--repetitions', type=int, default=3)
+    parser.add_argument('--solver', type=str, default=None, help='cplex, pulp, glpk or gurobi')
+    args = parser.parse_args()
+
+    benchmark(args.sizes, summary_size=args.summary_size, repetitions=args.repetitions, solver=args.solver)
@@ -0,0 +1,105 @@
+"""
+Compares the feedback propagation of the networkx based word-embedding graphs with their array-backed variants
+(cascade.py --propagation_engine graph|array) on random concepts: the time for building the store and for incorporating
+the feedback of some iterations, and whether both engines give the same weights.
+
+    python performance_utils/propagation_benchmark.py --sizes 1000 5000 --iterations 10
+"""
+from __future__ import print_function
+
+import argparse
+import random
+import sys
+import os.path as path
+from time import time as timer
+
+import numpy as np
+
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+
+from algorithms.flight_recorder import FlightRecorder
+from algorithms.feedback.WordEmbeddingGaussianFeedbackGraph import WordEmbeddingGaussianFeedbackGraph
+from algorithms.feedback.WordEmbeddingGaussianArrayFeedbackGraph import WordEmbeddingGaussianArrayFeedbackGraph
+from algorithms.feedback.WordEmbeddingRandomWalkDiffusionFeedbackGraph import \
+    WordEmbeddingRandomWalkDiffusionFeedbackGraph
+from algorithms.feedback.WordEmbeddingRandomWalkDiffusionArrayFeedbackGraph import \
+    WordEmbeddingRandomWalkDiffusionArrayFeedbackGraph
+from performance_utils.similarity_benchmark import make_vectors
+
+STORES = {
+    "gb": (WordEmbeddingGaussianFeedbackGraph, WordEmbeddingGaussianArrayFeedbackGraph),
+    "rw": (WordEmbeddingRandomWalkDiffusionFeedbackGraph, WordEmbeddingRandomWalkDiffusionArrayFeedbackGraph)
+}
+
+
+class Embedder(object):
+    """ maps the single "word" of a concept to its random vector, in place of the ConceptEmbedder """
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.cache = vectors
+        self.errorcount = 0
+
+    def __call__(self, words):
+        return self.vectors[words[0]]
+
+
+class Sentence(object):
+    def __init__(self, concepts):
+        self.concepts = concepts
+        self.untokenized_concepts = concepts
+
+
+def make_topic(num_concepts, concepts_per_sentence=5, seed=0):
+    rnd = np.random.RandomState(seed)
+    concepts = ["c%s" % i for i in range(num_concepts)]
+    vectors = dict(zip(concepts, make_vectors(num_concepts, seed=seed)))
+    weights = dict((c, int(w)) for c, w in zip(concepts, rnd.randint(1, 10, num_concepts)))
+    sentences = [Sentence(concepts[i:i + concepts_per_sentence]) for i in range(0, num_concepts, concepts_per_sentence)]
+    return Embedder(vectors), sentences, weights
+
+
+def make_records(concepts, iterations, per_iteration=10, seed=0):
+    rnd = random.Random(seed)
+    records = []
+    for _ in range(iterations):
+        picked = rnd.sample(concepts, 2 * per_iteration)
+        records.append((picked[:per_iteration], picked[per_iteration:]))
+    return records
+
+
+def run(cls, embedder, sentences, weights, records, seed):
+    t0 = timer()
+    fbs = cls(embedder)
+    fbs.add_sentences(sentences, weights, max(weights.values()))
+    build_time = timer() - t0
+
+    random.seed(seed)
+    recorder = FlightRecorder()
+    t0 = timer()
+    for accept, reject in records:
+        recorder.record(accept, reject, [])
+        fbs.incorporate_feedback(recorder)
+    propagation_time = timer() - t0
+    return dict(fbs.get_weights()), build_time, propagation_time
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the graph and the array feedback propagation')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 1000, 2000, 5000])
+    parser.add_argument('--stores', nargs='+', choices=sorted(STORES), default=sorted(STORES))
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print("%5s %8s %16s %16s %16s %16s %10s" % ("store", "concepts", "graph build [s]", "array build [s]",
+                                                  "graph prop [s]", "array prop [s]", "equal"))
+    for size in args.sizes:
+        embedder, sentences, weights = make_topic(size, seed=args.seed)
+        records = make_records(sorted(weights), args.iterations, seed=args.seed)
+        for store in args.stores:
+            graph_cls, array_cls = STORES[store]
+            graph_weights, graph_build, graph_prop = run(graph_cls, embedder, sentences, weights, records, args.seed)
+            array_weights, array_build, array_prop = run(array_cls, embedder, sentences, weights, records, args.seed)
+            print("%5s %8d %16.3f %16.3f %16.3f %16.3f %10s" % (store, size, graph_build, array_build, graph_prop,
+                                                                 array_prop, graph_weights == array_weights))
@@ -0,0 +1,83 @@
+"""
+Compares SentenceRanker.update_ranking, which updates the cached concept sums of the sentences by the weight deltas,
+with the former update, which re-summed all concepts of a sentence for every changed concept it contains, on a
+synthetic topic: the time per feedback iteration, the largest difference of the densities and whether the rankings
+are the same.
+
+    python performance_utils/ranking_benchmark.py --sizes 10000 20000 --iterations 20
+"""
+from __future__ import print_function
+
+import argparse
+import random
+import sys
+import os.path as path
+from time import time as timer
+
+sys.path.append(path.dirname(path.dirname(path.dirname(path.abspath(__file__)))))
+
+from summarizer.algorithms.sentence_ranker import SentenceRanker
+from summarizer.performance_utils.ilp_benchmark import make_synthetic_summarizer
+
+OPTIONS = {'strategy': False, 'relative_k': True, 'dynamic_k': False}
+
+
+def former_update_ranking(ranker, new_accepts, new_rejects):
+    """ the update of the ranks before the cached concept sums """
+    for concept in new_accepts + new_rejects:
+        for sent_id in ranker.concept_to_sentences[concept]:
+            sentence = ranker.sentences_dict[sent_id]
+            concept_density = 0
+            for c in sentence.concepts:
+                concept_density += ranker.all_concept_weights[c]
+            concept_density /= float(sentence.length)
+            ranker.ranks_to_sentences[sent_id] = concept_density
+
+
+def make_feedback(weights, iterations, per_iteration=10, seed=0):
+    """ accepted concepts get twice their weight, rejected ones 0, and some others are changed as by a propagation """
+    rnd = random.Random(seed)
+    concepts = sorted(weights)
+    feedback = []
+    for _ in range(iterations):
+        picked = rnd.sample(concepts, 2 * per_iteration)
+        accepts, rejects = picked[:per_iteration], picked[per_iteration:]
+        updated = dict((c, rnd.random()) for c in rnd.sample(concepts, 5 * per_iteration))
+        updated.update((c, 2.0 * weights[c]) for c in accepts)
+        updated.update((c, 0.0) for c in rejects)
+        feedback.append((accepts, rejects, updated))
+    return feedback
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the incremental SentenceRanker.update_ranking')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 20000])
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print("%9s %16s %16s %12s %8s" % ("sentences", "former [ms/it]", "cached [ms/it]", "max diff", "ranking"))
+    for size in args.sizes:
+        summarizer = make_synthetic_summarizer(size, num_concepts=size * 4, seed=args.seed)
+        feedback = make_feedback(summarizer.weights, args.iterations, seed=args.seed)
+        former = SentenceRanker(summarizer.sentences, summarizer.weights, 100, 0.1, OPTIONS)
+        cached = SentenceRanker(summarizer.sentences, summarizer.weights, 100, 0.1, OPTIONS)
+
+        former_time, cached_time = 0.0, 0.0
+        for accepts, rejects, updated in feedback:
+            former.update_weights(updated)
+            t0 = timer()
+            former_update_ranking(former, accepts, rejects)
+            former_time += timer() - t0
+
+            cached.update_weights(updated)
+            t0 = timer()
+            cached.update_ranking(accepts, rejects, [])
+            cached_time += timer() - t0
+
+        max_diff = max(abs(former.ranks_to_sentences[sent_id] - cached.ranks_to_sentences[sent_id])
+                       for sent_id in former.ranks_to_sentences)
+        same = list(former.ranks_to_sentences.keys()) == list(cached.ranks_to_sentences.keys())
+        print("%9d %16.3f %16.3f %12.3g %8s" % (size, 1000 * former_time / args.iterations,
+                                                1000 * cached_time / args.iterations, max_diff,
+                                                "same" if same else "differs"))
@@ -0,0 +1,63 @@
+"""
+Compares the memory footprint of the sentences of a synthetic topic as Sentence objects and as SentenceStore views:
+the pickled size (i.e. the share of a session pickle, including all_sentences) and the deep size of the objects, and
+checks that the views give the same attributes.
+
+    python performance_utils/sentence_memory_benchmark.py --sizes 1000 5000 20000
+"""
+from __future__ import print_function
+
+import argparse
+import copy
+import pickle
+import sys
+import os.path as path
+
+sys.path.append(path.dirname(path.dirname(path.dirname(path.abspath(__file__)))))
+
+from summarizer.baselines.sume.sentence_store import SentenceStore
+from summarizer.performance_utils.ilp_benchmark import make_synthetic_summarizer
+
+ATTRIBUTES = ["tokens", "doc_id", "position", "concepts", "untokenized_concepts", "untokenized_form", "length"]
+
+
+def deep_size(obj, seen=None):
+    """ sys.getsizeof of the object and everything it references, each object once """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "nbytes"):
+        size += obj.nbytes
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(v, seen) for v in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_size(obj.__dict__, seen)
+    if hasattr(type(obj), "__slots__"):
+        size += sum(deep_size(getattr(obj, name), seen) for name in type(obj).__slots__ if hasattr(obj, name))
+    return size
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Memory footprint of Sentence objects and SentenceStore views')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print("%9s %18s %18s %18s %18s %8s" % ("sentences", "objects pickle [B]", "views pickle [B]",
+                                             "objects deep [B]", "views deep [B]", "equal"))
+    for size in args.sizes:
+        sentences = make_synthetic_summarizer(size, num_concepts=size * 4, seed=args.seed).sentences
+        views = SentenceStore.from_sentences(sentences).views()
+        equal = all(getattr(s, a) == getattr(v, a) for s, v in zip(sentences, views) for a in ATTRIBUTES)
+
+        # a session keeps the sentences and all_sentences, a copy of the objects but the same views
+        objects = (sentences, copy.deepcopy(sentences))
+        shared = (views, list(views))
+        print("%9d %18d %18d %18d %18d %8s" % (size, len(pickle.dumps(objects, protocol=2)),
+                                               len(pickle.dumps(shared, protocol=2)),
+                                               deep_size(objects), deep_size(shared), equal))
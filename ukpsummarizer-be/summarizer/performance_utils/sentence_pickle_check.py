@@ -0,0 +1,54 @@
+"""
+Checks that sentences pickled before Sentence became a new-style class with __slots__ (i.e. the sentences of the
+sessions written by older versions) can still be loaded, with pickle and cPickle and both protocols. Exits with status 1
+if one of them fails.
+
+    python performance_utils/sentence_pickle_check.py
+"""
+from __future__ import print_function
+
+import cPickle
+import pickle
+import sys
+import os.path as path
+
+sys.path.append(path.dirname(path.dirname(path.dirname(path.abspath(__file__)))))
+
+from summarizer.baselines.sume.base import Sentence
+
+# [Sentence(['A', 'dog', '.'], 0, 1)] with concepts ['a dog'], untokenized_concepts [('A', 'dog')], untokenized_form
+# 'A dog.' and length 3, pickled with the old-style class
+PICKLES = {
+    0: "(lp0\n(isummarizer.baselines.sume.base\nSentence\np1\n(dp2\nS'phrases'\np3\n(lp4\nsS'tokens_pos'\np5\n(dp6\nsS'raw_phrases'\np7\n(lp8\nsS'tokens'\np9\n(lp10\nS'A'\np11\naS'dog'\np12\naS'.'\np13\nasS'length'\np14\nI3\nsS'untokenized_concepts'\np15\n(lp16\n(g11\ng12\ntp17\nasS'concepts'\np18\n(lp19\nS'a dog'\np20\nasS'position'\np21\nI1\nsS'doc_id'\np22\nI0\nsS'untokenized_form'\np23\nS'A dog.'\np24\nsba.",
+    2: '\x80\x02]q\x00(csummarizer.baselines.sume.base\nSentence\nq\x01oq\x02}q\x03(U\x07phrasesq\x04]q\x05U\ntokens_posq\x06}q\x07U\x0braw_phrasesq\x08]q\tU\x06tokensq\n]q\x0b(U\x01Aq\x0cU\x03dogq\rU\x01.q\x0eeU\x06lengthq\x0fK\x03U\x14untokenized_conceptsq\x10]q\x11h\x0ch\r\x86q\x12aU\x08conceptsq\x13]q\x14U\x05a dogq\x15aU\x08positionq\x16K\x01U\x06doc_idq\x17K\x00U\x10untokenized_formq\x18U\x06A dog.q\x19uba.'
+}
+
+EXPECTED = {
+    "tokens": ['A', 'dog', '.'],
+    "doc_id": 0,
+    "position": 1,
+    "concepts": ['a dog'],
+    "untokenized_concepts": [('A', 'dog')],
+    "untokenized_form": 'A dog.',
+    "length": 3,
+    "phrases": [],
+    "tokens_pos": {},
+    "raw_phrases": []
+}
+
+
+if __name__ == '__main__':
+    failed = 0
+    for module in (pickle, cPickle):
+        for protocol, data in sorted(PICKLES.items()):
+            try:
+                sentence, = module.loads(data)
+                differing = [name for name, value in EXPECTED.items() if getattr(sentence, name, None) != value]
+                ok = isinstance(sentence, Sentence) and not differing
+                message = "ok" if ok else "differs in %s" % differing
+            except Exception as e:
+                ok, message = False, "%s: %s" % (type(e).__name__, e)
+            print("%s, protocol %s: %s" % (module.__name__, protocol, message))
+            failed += 0 if ok else 1
+
+    sys.exit(1 if failed else 0)
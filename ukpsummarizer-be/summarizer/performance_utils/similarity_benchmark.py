@@ -0,0 +1,97 @@
+"""
+Benchmarks the construction of the similarity edges of the word-embedding feedback graphs on random concept vectors:
+the former per-pair loop with scipy's cosine against the blocked matrix multiplication in algorithms.feedback, and
+optionally the approximate k-NN graph of the LSH index, including its recall against the exact k-NN graph.
+
+    python performance_utils/similarity_benchmark.py --sizes 500 1000 2000 --pairwise_limit 2000
+    python performance_utils/similarity_benchmark.py --sizes 10000 50000 --pairwise_limit 0 --ann 20 8 12
+"""
+from __future__ import print_function
+
+import argparse
+import sys
+import os.path as path
+from time import time as timer
+
+import numpy as np
+from scipy.spatial.distance import cosine
+
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+
+from algorithms.feedback import similarity_matrix, approximate_similarity_matrix, similarity_recall, \
+    SIMILARITY_BLOCK_ELEMENTS
+
+
+def make_vectors(num_concepts, dimensions=300, words_per_concept=2, vocabulary=None, seed=0):
+    """
+    Concept vectors are sums of word vectors like in ConceptEmbedder, so that concepts sharing a word are similar.
+    """
+    rnd = np.random.RandomState(seed)
+    vocabulary = vocabulary or max(10, num_concepts // 2)
+    words = rnd.normal(size=(vocabulary, dimensions))
+    return np.array([words[rnd.randint(0, vocabulary, words_per_concept)].sum(axis=0)
+                     for _ in range(num_concepts)])
+
+
+def pairwise_edges(vectors, cut_off_threshold):
+    edges = set()
+    for i in range(len(vectors)):
+        for j in range(len(vectors)):
+            if i == j:
+                continue
+            sim = 1 - cosine(vectors[i], vectors[j])
+            if sim > cut_off_threshold:
+                edges.add((i, j))
+    return edges
+
+
+def blocked_edges(vectors, cut_off_threshold, block_elements):
+    adjacency = similarity_matrix(vectors, cut_off_threshold, block_elements).tocoo()
+    return set(zip(adjacency.row.tolist(), adjacency.col.tolist()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the similarity graph construction')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 1000, 2000, 5000])
+    parser.add_argument('--cut_off_threshold', type=float, default=0.4)
+    parser.add_argument('--block_elements', type=int, default=SIMILARITY_BLOCK_ELEMENTS)
+    parser.add_argument('--pairwise_limit', type=int, default=2000,
+                        help="run the per-pair loop only up to this number of concepts")
+    parser.add_argument('--ann', type=int, nargs=3, default=None, metavar=("k", "tables", "bits"),
+                        help="also build the approximate k-NN graph with an LSH index")
+    args = parser.parse_args()
+
+    print("%8s %10s %14s %14s %10s" % ("concepts", "edges", "pairwise [s]", "blocked [s]", "equal"), end="")
+    if args.ann:
+        print(" %14s %14s %10s" % ("exact k-NN [s]", "LSH k-NN [s]", "recall"), end="")
+    print()
+    for size in args.sizes:
+        vectors = make_vectors(size)
+
+        t0 = timer()
+        blocked = blocked_edges(vectors, args.cut_off_threshold, args.block_elements)
+        blocked_time = timer() - t0
+
+        if size <= args.pairwise_limit:
+            t0 = timer()
+            pairwise = pairwise_edges(vectors, args.cut_off_threshold)
+            pairwise_time = "%14.3f" % (timer() - t0)
+            equal = str(pairwise == blocked)
+        else:
+            pairwise_time = "%14s" % "-"
+            equal = "-"
+
+        print("%8d %10d %s %14.3f %10s" % (size, len(blocked), pairwise_time, blocked_time, equal), end="")
+
+        if args.ann:
+            k, tables, bits = args.ann
+            t0 = timer()
+            exact = similarity_matrix(vectors, args.cut_off_threshold, args.block_elements, neighbors=k)
+            exact_time = timer() - t0
+            t0 = timer()
+            approximate = approximate_similarity_matrix(vectors, args.cut_off_threshold, neighbors=k, tables=tables,
+                                                        bits=bits)
+            approximate_time = timer() - t0
+            print(" %14.3f %14.3f %10.3f" % (exact_time, approximate_time, similarity_recall(exact, approximate)),
+                  end="")
+        print()
@@ -0,0 +1,102 @@
+"""
+Compares loading a summarizer session from a dill pickle with loading it from a snapshot (see web/snapshot.py).
+
+The pickle has to be written by `cascade.py summarize ... --pickleout` of this version, as the snapshot needs the topic
+reference of the session. The script reports the time for
+
+    - unpickling the session,
+    - reading the snapshot arrays (memory-mapped and into memory), and
+    - fully restoring the session from the snapshot, which rebuilds the summarizer from the topic.
+
+    python performance_utils/snapshot_benchmark.py --iobasedir ~/.ukpsummarizer tmp/session.pickle
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import os.path as path
+from time import time as timer
+
+SUMMARIZER_DIR = path.dirname(path.dirname(path.abspath(__file__)))
+sys.path.append(SUMMARIZER_DIR)
+
+from web.session_store import load_pickle
+from web.snapshot import load_snapshot, write_snapshot
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def timed(fn, repetitions):
+    timings = []
+    result = None
+    for _ in range(repetitions):
+        t0 = timer()
+        result = fn()
+        timings.append(timer() - t0)
+    return result, timings
+
+
+def size_of(location):
+    if path.isfile(location):
+        return path.getsize(location)
+    return sum(path.getsize(path.join(location, f)) for f in os.listdir(location))
+
+
+def touch_arrays(snapshot):
+    """ reads every array once, so that the memory-mapped variant pays for the page faults, too """
+    return sum(float(len(arr)) for arr in snapshot.arrays.values())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compares dill pickles and snapshots of summarizer sessions')
+    parser.add_argument('--repetitions', type=int, default=5)
+    parser.add_argument('-io', '--iobasedir', type=str, default=path.join(path.expanduser("~"), ".ukpsummarizer"))
+    parser.add_argument('-r', '--rouge', type=str, default="rouge/RELEASE-1.5.5/")
+    parser.add_argument('--skip_restore', action='store_true',
+                        help="only measure reading the snapshot, not rebuilding the summarizer from the topic")
+    parser.add_argument('pickle', type=str, help="a session pickle written by cascade.py summarize --pickleout")
+    args = parser.parse_args()
+
+    sf, pickle_timings = timed(lambda: load_pickle(args.pickle), args.repetitions)
+
+    snapshot_dir = path.join(tempfile.mkdtemp(prefix="snapshot-benchmark-"), "session")
+    try:
+        _, write_timings = timed(lambda: write_snapshot(sf, snapshot_dir), args.repetitions)
+        _, mmap_timings = timed(lambda: touch_arrays(load_snapshot(snapshot_dir)), args.repetitions)
+        _, eager_timings = timed(lambda: touch_arrays(load_snapshot(snapshot_dir, mmap_mode=None)), args.repetitions)
+
+        rows = [
+            ("dill pickle: load", pickle_timings),
+            ("snapshot: write", write_timings),
+            ("snapshot: read (mmap)", mmap_timings),
+            ("snapshot: read (in memory)", eager_timings)
+        ]
+
+        if not args.skip_restore:
+            from cascade import get_fbs_factory
+            from web.single_iteration_runner import SingleTopicRunner
+
+            runner = SingleTopicRunner(args.iobasedir, args.rouge,
+                                       feedbackstore_factory=get_fbs_factory(args.iobasedir))
+            # the first restore also fills the per-topic caches (upper bound, ROUGE reference index)
+            runner.load_session(snapshot_dir)
+            restored, restore_timings = timed(lambda: runner.load_session(snapshot_dir), args.repetitions)
+            rows.append(("snapshot: full restore", restore_timings))
+
+            assert restored.flight_recorder.union().accept == sf.flight_recorder.union().accept
+            assert restored.summarizer.weights == sf.summarizer.weights
+
+        print("pickle:   %10d bytes" % (size_of(args.pickle)))
+        print("snapshot: %10d bytes" % (size_of(snapshot_dir)))
+        print()
+        print("%-30s %10s %10s %10s" % ("", "min [s]", "median [s]", "max [s]"))
+        for name, timings in rows:
+            print("%-30s %10.4f %10.4f %10.4f" % (name, min(timings), median(timings), max(timings)))
+    finally:
+        shutil.rmtree(path.dirname(snapshot_dir))
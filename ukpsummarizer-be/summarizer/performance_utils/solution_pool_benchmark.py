@@ -0,0 +1,54 @@
+"""
+Compares the time to get the k best summaries of a synthetic topic by k rebuild-and-solve cycles of solve_ilp_problem
+with excluded_solutions, and by solve_ilp_solution_pool, which adds a cut to one model after each solve. Also checks
+that both give the same objective values.
+
+    python performance_utils/solution_pool_benchmark.py --sizes 500 1000 2000 --k 5
+"""
+from __future__ import print_function
+
+import argparse
+import sys
+import os.path as path
+from time import time as timer
+
+sys.path.append(path.dirname(path.dirname(path.dirname(path.abspath(__file__)))))
+
+from summarizer.performance_utils.ilp_benchmark import make_synthetic_summarizer
+
+
+def rebuild_k_best(summarizer, k, summary_size, solver=None):
+    """ the k best solutions before the solution pool: one new model per solution """
+    solutions = []
+    for i in range(k):
+        value, subset = summarizer.solve_ilp_problem(summary_size=summary_size, solver=solver,
+                                                     excluded_solutions=[list(s) for _, s in solutions])
+        if value is None or not subset:
+            break
+        solutions.append((value, subset))
+    return solutions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the k best summaries from one ILP model')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 1000, 2000])
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--summary_size', type=int, default=100)
+    parser.add_argument('--solver', type=str, default=None, help='cplex, pulp, glpk or gurobi')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print("%9s %14s %14s %10s" % ("sentences", "rebuild [s]", "pool [s]", "values"))
+    for size in args.sizes:
+        summarizer = make_synthetic_summarizer(size, num_concepts=size * 4, seed=args.seed)
+
+        t0 = timer()
+        rebuilt = rebuild_k_best(summarizer, args.k, args.summary_size, solver=args.solver)
+        rebuild_time = timer() - t0
+
+        t0 = timer()
+        pool = summarizer.solve_ilp_solution_pool(summary_size=args.summary_size, k=args.k, solver=args.solver)
+        pool_time = timer() - t0
+
+        same = [round(v, 6) for v, _ in rebuilt] == [round(v, 6) for v, _ in pool]
+        print("%9d %14.4f %14.4f %10s" % (size, rebuild_time, pool_time, "same" if same else "differ"))
@@ -0,0 +1,60 @@
+"""
+Compares a ConceptVocabulary per structure (the SentenceStore, the SentenceRanker and the snapshot each interning the
+concepts of a topic on their own) with the one vocabulary per topic that they share now, on a synthetic topic: the time
+to set up the store and the ranker and to map the ranker state to concept ids for a snapshot, and the size of the
+interning tables (dicts and lists, without the concept strings themselves, which are shared either way).
+
+    python performance_utils/vocabulary_benchmark.py --sizes 10000 20000
+"""
+from __future__ import print_function
+
+import argparse
+import sys
+import os.path as path
+from time import time as timer
+
+sys.path.append(path.dirname(path.dirname(path.dirname(path.abspath(__file__)))))
+
+from summarizer.algorithms.concept_vocabulary import ConceptVocabulary
+from summarizer.algorithms.sentence_ranker import SentenceRanker
+from summarizer.baselines.sume.sentence_store import SentenceStore
+from summarizer.performance_utils.ilp_benchmark import make_synthetic_summarizer
+from summarizer.performance_utils.ranking_benchmark import OPTIONS
+
+
+def table_bytes(vocabularies):
+    """ the size of the id dicts and concept lists of the distinct vocabularies """
+    distinct = dict((id(v), v) for v in vocabularies).values()
+    return sum(sys.getsizeof(v.ids) + sys.getsizeof(v.concepts) for v in distinct)
+
+
+def set_up(summarizer, shared):
+    """
+    :return: (seconds, the vocabularies in use)
+    """
+    t0 = timer()
+    vocabulary = ConceptVocabulary() if shared else None
+    store = SentenceStore.from_sentences(summarizer.sentences, vocabulary)
+    views = store.views()
+    ranker = SentenceRanker(views, summarizer.weights, 100, 0.1, OPTIONS, vocabulary=vocabulary)
+    ranker.important_concepts = set(list(summarizer.weights)[:100])
+    snapshot_vocabulary = vocabulary if shared else ConceptVocabulary(sorted(summarizer.weights))
+    ranker.get_state(snapshot_vocabulary)
+    return timer() - t0, [store.vocabulary, ranker.vocabulary, snapshot_vocabulary]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the shared ConceptVocabulary of a topic')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 20000])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print("%9s %9s %16s %16s %16s %16s" % ("sentences", "concepts", "separate [ms]", "shared [ms]",
+                                           "separate [KB]", "shared [KB]"))
+    for size in args.sizes:
+        summarizer = make_synthetic_summarizer(size, num_concepts=size * 4, seed=args.seed)
+        separate_time, separate = set_up(summarizer, False)
+        shared_time, shared = set_up(summarizer, True)
+        print("%9d %9d %16.1f %16.1f %16.1f %16.1f" % (size, len(summarizer.weights), 1000 * separate_time,
+                                                       1000 * shared_time, table_bytes(separate) / 1024.0,
+                                                       table_bytes(shared) / 1024.0))
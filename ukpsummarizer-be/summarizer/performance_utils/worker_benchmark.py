@@ -0,0 +1,82 @@
+from __future__ import print_function
+
+import argparse
+import json
+import subprocess
+import sys
+import os.path as path
+from time import time as timer
+
+SUMMARIZER_DIR = path.dirname(path.dirname(path.abspath(__file__)))
+CASCADE = path.join(SUMMARIZER_DIR, "cascade.py")
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def cold_timings(command, repetitions, cwd):
+    """
+    Starts a new cascade.py process for every request, just like the server does.
+    """
+    timings = []
+    for _ in range(repetitions):
+        t0 = timer()
+        subprocess.check_call([sys.executable, CASCADE] + command, cwd=cwd,
+                              stdout=open(path.devnull, 'w'), stderr=subprocess.STDOUT)
+        timings.append(timer() - t0)
+    return timings
+
+
+def warm_timings(command, repetitions, cwd):
+    """
+    Sends all requests to a single `cascade.py serve` worker.
+
+    :return: (time until the worker answered the first request, list of round trip times of the following requests)
+    """
+    t0 = timer()
+    worker = subprocess.Popen([sys.executable, CASCADE, "serve"], cwd=cwd,
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=open(path.devnull, 'w'))
+
+    timings = []
+    try:
+        for i in range(repetitions + 1):
+            t1 = timer()
+            worker.stdin.write((json.dumps({"id": i, "args": command}) + "\n").encode("utf-8"))
+            worker.stdin.flush()
+            response = json.loads(worker.stdout.readline())
+            if response["status"] != "ok":
+                raise RuntimeError("worker request failed: %s" % (response.get("error")))
+            if i == 0:
+                first = timer() - t0
+            else:
+                timings.append(timer() - t1)
+        worker.stdin.write((json.dumps({"shutdown": True}) + "\n").encode("utf-8"))
+        worker.stdin.flush()
+    finally:
+        worker.stdin.close()
+        worker.wait()
+    return first, timings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compares the latency of cold cascade.py processes with the one of a '
+                                                 'warm `cascade.py serve` worker',
+                                     epilog="example: python summarizer/performance_utils/worker_benchmark.py -- "
+                                            "rouge datasets/processed/DUC2004/d30001t tmp/summary.txt")
+    parser.add_argument('--repetitions', type=int, default=10)
+    parser.add_argument('--cwd', type=str, default=path.dirname(SUMMARIZER_DIR),
+                        help="working directory of cascade.py (has to contain logging.conf)")
+    parser.add_argument('command', nargs=argparse.REMAINDER, help="the cascade.py arguments of a single request")
+    args = parser.parse_args()
+
+    command = [c for c in args.command if c != "--"]
+
+    cold = cold_timings(command, args.repetitions, args.cwd)
+    first, warm = warm_timings(command, args.repetitions, args.cwd)
+
+    print("%-30s %10s %10s %10s" % ("", "min [s]", "median [s]", "max [s]"))
+    print("%-30s %10.3f %10.3f %10.3f" % ("cold process", min(cold), median(cold), max(cold)))
+    print("%-30s %10.3f %10s %10s" % ("worker start + first request", first, "", ""))
+    print("%-30s %10.3f %10.3f %10.3f" % ("warm worker", min(warm), median(warm), max(warm)))
@@ -0,0 +1,435 @@
+"""
+In-process implementation of the ROUGE-1, ROUGE-2 and ROUGE-SU* recall scores of ROUGE-1.5.5.pl.
+
+It mirrors the behaviour of the perl script under the arguments used by `rouge.Rouge`
+(-n 4 -m -x -c 95 -r 1000 -f A -p 0.5 -t 0 -a -2 -4 -u -l <summary_len>), that is:
+
+ * the text is cut after <summary_len> words (readText, SPL input format),
+ * tokenization replaces everything but [A-Za-z0-9-] with blanks, and tokens not starting with [a-z0-9] are dropped,
+ * stopwords are kept (no -s),
+ * the skip distance of the skip bigrams is unlimited: getopts takes "-4" as the value of "-2", and a negative skip
+   distance means no limit, which is why the perl script reports "ROUGE-SU*" and not "ROUGE-SU4",
+ * words longer than 3 characters are stemmed using the WordNet exception list, falling back to the (modified)
+   Porter stemmer of the perl script (-m),
+ * hits and counts are summed up over all models (-f A). ROUGE-1.5.5 does not jackknife anymore, all models listed for
+   an evaluation are used at once.
+
+The bootstrap confidence intervals (-c 95 -r 1000) do not influence the average scores and are not computed.
+"""
+from __future__ import print_function
+
+import codecs
+import json
+import os
+import re
+from collections import Counter
+from os import path
+
+WHITESPACE = re.compile(r"[ \t\n\r\f\v]+")
+NON_ALPHANUMERIC = re.compile(r"[^A-Za-z0-9\-]")
+TOKEN_START = re.compile(r"^[a-z0-9$]")
+
+REFERENCE_INDEX_VERSION = 2
+
+EXCEPTIONS_DIR = "WordNet-2.0-Exceptions"
+EXCEPTION_FILE_EXTENSION = ".exc"
+
+
+def load_exception_db(rouge_dir):
+    """
+        Builds the same lookup table as data/WordNet-2.0-Exceptions/buildExeptionDB.pl. The files are read in sorted
+        order, which yields exactly the contents of the shipped WordNet-2.0.exc.db.
+
+    :param rouge_dir: the ROUGE-1.5.5 directory, e.g. "rouge/RELEASE-1.5.5/"
+    :return: dict inflected word -> base form
+    """
+    exceptions_dir = path.join(rouge_dir, "data", EXCEPTIONS_DIR)
+    exceptiondb = {}
+    for file_name in sorted(f for f in os.listdir(exceptions_dir) if f.endswith(EXCEPTION_FILE_EXTENSION)):
+        with codecs.open(path.join(exceptions_dir, file_name), 'r', 'utf-8') as fp:
+            for line in fp.read().split("\n"):
+                tokens = WHITESPACE.split(line)
+                if tokens and tokens[0]:
+                    exceptiondb[tokens[0]] = tokens[1] if len(tokens) > 1 else None
+    return exceptiondb
+
+
+# Porter stemmer, as modified in ROUGE-1.5.5.pl (sub stem / sub initialise)
+STEP2_LIST = {'ational': 'ate', 'tional': 'tion', 'enci': 'ence', 'anci': 'ance', 'izer': 'ize', 'bli': 'ble',
+              'alli': 'al', 'entli': 'ent', 'eli': 'e', 'ousli': 'ous', 'ization': 'ize', 'ation': 'ate',
+              'ator': 'ate', 'alism': 'al', 'iveness': 'ive', 'fulness': 'ful', 'ousness': 'ous', 'aliti': 'al',
+              'iviti': 'ive', 'biliti': 'ble', 'logi': 'log'}
+STEP3_LIST = {'icate': 'ic', 'ative': '', 'alize': 'al', 'iciti': 'ic', 'ical': 'ic', 'ful': '', 'ness': ''}
+
+_c = "[^aeiou]"  # consonant
+_v = "[aeiouy]"  # vowel
+_C = _c + "[^aeiouy]*"  # consonant sequence
+_V = _v + "[aeiou]*"  # vowel sequence
+
+MGR0 = re.compile("^(" + _C + ")?" + _V + _C)  # [C]VC... is m>0
+MEQ1 = re.compile("^(" + _C + ")?" + _V + _C + "(" + _V + ")?$")  # [C]VC[V] is m=1
+MGR1 = re.compile("^(" + _C + ")?" + _V + _C + _V + _C)  # [C]VCVC... is m>1
+VOWEL_IN_STEM = re.compile("^(" + _C + ")?" + _v)  # vowel in stem
+CVC = re.compile("^" + _C + _v + "[^aeiouwxy]$")
+
+STEP1A_1 = re.compile(r"(ss|i)es$")
+STEP1A_2 = re.compile(r"([^s])s$")
+STEP1B_EED = re.compile(r"eed$")
+STEP1B_ED_ING = re.compile(r"(ed|ing)$")
+STEP1B_AT_BL_IZ = re.compile(r"(at|bl|iz)$")
+STEP1B_DOUBLE = re.compile(r"([^aeiouylsz])\1$")
+STEP2 = re.compile(r"(ational|tional|enci|anci|izer|bli|alli|entli|eli|ousli|ization|ation|ator|alism|iveness|"
+                   r"fulness|ousness|aliti|iviti|biliti|logi)$")
+STEP3 = re.compile(r"(icate|ative|alize|iciti|ical|ful|ness)$")
+STEP4 = re.compile(r"(al|ance|ence|er|ic|able|ible|ant|ement|ou|ism|ate|iti|ous|ive|ize)$")
+STEP4_MENT = re.compile(r"ment$")
+STEP4_ENT = re.compile(r"ent$")
+STEP4_ION = re.compile(r"(s|t)(ion)$")
+
+
+def porter_stem(w):
+    if len(w) < 3:
+        return w
+    # map initial y to Y so that the patterns never treat it as vowel
+    firstch = w[0]
+    if firstch == "y":
+        w = "Y" + w[1:]
+
+    # Step 1a
+    m = STEP1A_1.search(w)
+    if m:
+        w = w[:m.start()] + m.group(1)
+    else:
+        m = STEP1A_2.search(w)
+        if m:
+            w = w[:m.start()] + m.group(1)
+
+    # Step 1b
+    m = STEP1B_EED.search(w)
+    if m:
+        if MGR0.search(w[:m.start()]):
+            w = w[:-1]
+    else:
+        m = STEP1B_ED_ING.search(w)
+        if m:
+            stem = w[:m.start()]
+            if VOWEL_IN_STEM.search(stem):
+                w = stem
+                if STEP1B_AT_BL_IZ.search(w):
+                    w += "e"
+                elif STEP1B_DOUBLE.search(w):
+                    w = w[:-1]
+                elif CVC.search(w):
+                    w += "e"
+
+    # Step 1c
+    if w.endswith("y"):
+        stem = w[:-1]
+        if VOWEL_IN_STEM.search(stem):
+            w = stem + "i"
+
+    # Step 2
+    m = STEP2.search(w)
+    if m:
+        stem = w[:m.start()]
+        if MGR0.search(stem):
+            w = stem + STEP2_LIST[m.group(1)]
+
+    # Step 3
+    m = STEP3.search(w)
+    if m:
+        stem = w[:m.start()]
+        if MGR0.search(stem):
+            w = stem + STEP3_LIST[m.group(1)]
+
+    # Step 4: a word ending in -ement will not try the rules "-ment" and "-ent"
+    m = STEP4.search(w)
+    if m:
+        stem = w[:m.start()]
+        if MGR1.search(stem):
+            w = stem
+    m = STEP4_MENT.search(w)
+    if m:
+        stem = w[:m.start()]
+        if MGR1.search(stem):
+            w = stem
+    m = STEP4_ENT.search(w)
+    if m:
+        stem = w[:m.start()]
+        if MGR1.search(stem):
+            w = stem
+    else:
+        m = STEP4_ION.search(w)
+        if m:
+            stem = w[:m.start()] + m.group(1)
+            if MGR1.search(stem):
+                w = stem
+
+    # Step 5
+    if w.endswith("e"):
+        stem = w[:-1]
+        if MGR1.search(stem) or (MEQ1.search(stem) and not CVC.search(stem)):
+            w = stem
+    if w.endswith("ll") and MGR1.search(w):
+        w = w[:-1]
+
+    # and turn initial Y back to y
+    if firstch == "y":
+        w = w[0].lower() + w[1:]
+    return w
+
+
+def split_words(text):
+    """ perl's split(/\s+/, $text): keeps a leading empty field, drops the trailing ones """
+    tokens = WHITESPACE.split(text)
+    while tokens and tokens[-1] == "":
+        tokens.pop()
+    return tokens
+
+
+def read_text(lines, length_limit=0):
+    """
+        Mirrors readText of ROUGE-1.5.5.pl for the SPL (sentence per line) input format.
+
+    :param lines: the lines of the summary file
+    :param length_limit: the maximum number of words, 0 for no limit
+    :return: the normalized text, or None if the text is empty
+    """
+    sentences = [line for line in lines if len(line) > 0]
+
+    if length_limit == 0:
+        text = " ".join(sentences)
+    else:
+        text = ""
+        text_len = 0
+        for s in sentences:
+            tokens = split_words(s)
+            if text_len + len(tokens) < length_limit:
+                text += " " + s if text_len != 0 else s
+                text_len += len(tokens)
+            else:
+                if text_len > 0:
+                    text += " "
+                text += " ".join(tokens[:length_limit - text_len])
+                break
+        if len(text) == 0:
+            return None
+
+    text = text.replace("-", " - ")
+    text = NON_ALPHANUMERIC.sub(" ", text)
+    text = WHITESPACE.sub(" ", text.strip(" \t\n\r\f\v"))
+    # only ascii characters are left at this point, this equals perl's tr/A-Z/a-z/
+    return text.lower()
+
+
+def text_to_lines(text):
+    """ the lines of the file that rouge.Rouge writes for the given summary """
+    if isinstance(text, (list, tuple)):
+        text = "\n".join(text)
+    return text.split("\n")
+
+
+def read_lines(file_name):
+    with codecs.open(file_name, 'r', 'utf-8', errors='ignore') as fp:
+        return fp.read().split("\n")
+
+
+class ReferenceIndex(object):
+    """
+        The ROUGE-1, ROUGE-2 and ROUGE-SU* count tables of a set of reference summaries for one length limit. The
+        models do not change during a simulation, hence they are tokenized and stemmed only once.
+    """
+
+    def __init__(self, models, summary_len, model_tables):
+        """
+        :param models: list of the model file names
+        :param summary_len: the length limit in words the tables were built with
+        :param model_tables: list of count tables, one per model (see PythonRouge.count_tables)
+        """
+        self.models = models
+        self.summary_len = summary_len
+        self.model_tables = model_tables
+
+    def to_json(self):
+        return {
+            "version": REFERENCE_INDEX_VERSION,
+            "models": self.models,
+            "summary_len": self.summary_len,
+            "tables": [[[dict(grams), count] for grams, count in tables] for tables in self.model_tables]
+        }
+
+    @staticmethod
+    def from_json(jdict):
+        model_tables = [tuple((Counter(grams), count) for grams, count in tables) for tables in jdict["tables"]]
+        return ReferenceIndex(jdict["models"], jdict["summary_len"], model_tables)
+
+    def save(self, file_name):
+        with codecs.open(file_name, 'w', 'utf-8') as fp:
+            fp.write(json.dumps(self.to_json()))
+
+    @staticmethod
+    def load(file_name, models=None, summary_len=None):
+        """
+        :return: the ReferenceIndex stored in the file, or None if the file is missing, outdated or has been built
+            for other models or another length limit.
+        """
+        if not path.isfile(file_name):
+            return None
+        try:
+            with codecs.open(file_name, 'r', 'utf-8') as fp:
+                jdict = json.load(fp)
+        except ValueError:
+            return None
+        if jdict.get("version") != REFERENCE_INDEX_VERSION:
+            return None
+        if models is not None and jdict["models"] != models:
+            return None
+        if summary_len is not None and jdict["summary_len"] != summary_len:
+            return None
+        return ReferenceIndex.from_json(jdict)
+
+
+class PythonRouge(object):
+    """
+        Computes the ROUGE-1, ROUGE-2 and ROUGE-SU* recall of ROUGE-1.5.5.pl without spawning perl.
+    """
+
+    def __init__(self, rouge_dir, skip_distance=None):
+        """
+        :param skip_distance: the maximum number of tokens between the two tokens of a skip bigram, None (the default)
+            for no limit, like `rouge.Rouge` runs the perl script.
+        """
+        self.ROUGE_DIR = rouge_dir
+        self.skip_distance = skip_distance
+        self.exceptiondb = load_exception_db(rouge_dir)
+        self.stem_cache = {}
+        self.reference_indices = {}
+        """ (model files, length limit) -> ReferenceIndex """
+
+    def stem(self, token):
+        stem = self.stem_cache.get(token)
+        if stem is None:
+            if token in self.exceptiondb:
+                stem = self.exceptiondb[token]
+            else:
+                stem = porter_stem(token)
+            self.stem_cache[token] = stem
+        return stem
+
+    def tokenize(self, lines, length_limit=0):
+        """
+        :return: list of stemmed tokens, as used to create the n-grams in ROUGE-1.5.5.pl
+        """
+        text = read_text(lines, length_limit)
+        if text is None:
+            return []
+        tokens = []
+        for token in text.split(" "):
+            if TOKEN_START.match(token):
+                if len(token) > 3:
+                    token = self.stem(token)
+                tokens.append(token)
+        return tokens
+
+    @staticmethod
+    def ngrams(tokens, n):
+        """
+        :return: (Counter of the n-grams, total number of n-grams)
+        """
+        grams = Counter(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return grams, max(len(tokens) - n + 1, 0)
+
+    def skip_bigrams(self, tokens):
+        """
+            skip bigrams with unigrams (-u). Just like ROUGE-1.5.5.pl, the last token is not counted as unigram.
+
+        :return: (Counter of the skip-bigrams, total number of skip-bigrams)
+        """
+        grams = Counter()
+        count = 0
+        for i in range(len(tokens) - 1):
+            grams[tokens[i]] += 1
+            count += 1
+            end = len(tokens) if self.skip_distance is None else min(len(tokens), i + self.skip_distance + 2)
+            for j in range(i + 1, end):
+                grams[tokens[i] + " " + tokens[j]] += 1
+                count += 1
+        return grams, count
+
+    def count_tables(self, tokens):
+        """
+        :return: the ROUGE-1, ROUGE-2 and ROUGE-SU* tuples of (Counter, total count) for the given tokens
+        """
+        return self.ngrams(tokens, 1), self.ngrams(tokens, 2), self.skip_bigrams(tokens)
+
+    @staticmethod
+    def hits(model_grams, peer_grams):
+        return sum(min(count, peer_grams[gram]) for gram, count in model_grams.items() if gram in peer_grams)
+
+    @staticmethod
+    def recall(peer_tables, model_tables):
+        """
+            -f A: hits and counts are summed up over all models.
+
+        :param peer_tables: count tables of the peer summary
+        :param model_tables: list of count tables of the models
+        :return: list of recall scores, one per table
+        """
+        scores = []
+        for i, (peer_grams, _) in enumerate(peer_tables):
+            total_hit = 0
+            total_count = 0
+            for tables in model_tables:
+                model_grams, model_count = tables[i]
+                total_hit += PythonRouge.hits(model_grams, peer_grams)
+                total_count += model_count
+            score = total_hit / float(total_count) if total_count != 0 else 0.0
+            # the perl script reports the scores with 5 decimals
+            scores.append(float("%7.5f" % score))
+        return scores
+
+    @staticmethod
+    def __index_key__(models, summary_len):
+        return tuple(model for model, _ in models), int(summary_len)
+
+    def build_reference_index(self, models, summary_len=0):
+        """
+        :param models: list of tuples (model file, sentences), as returned by Topic.get_models
+        :return: ReferenceIndex
+        """
+        length_limit = int(summary_len)
+        model_tables = [self.count_tables(self.tokenize(read_lines(model), length_limit)) for model, _ in models]
+        return ReferenceIndex([path.basename(model) for model, _ in models], length_limit, model_tables)
+
+    def add_reference_index(self, models, index):
+        """
+            registers a (e.g. precomputed) index, which is used for all further scores against the given models.
+        """
+        self.reference_indices[self.__index_key__(models, index.summary_len)] = index
+
+    def get_reference_index(self, models, summary_len=0):
+        """
+            returns the index of the given models, building it on first use.
+        """
+        key = self.__index_key__(models, summary_len)
+        index = self.reference_indices.get(key)
+        if index is None:
+            index = self.build_reference_index(models, summary_len)
+            self.reference_indices[key] = index
+        return index
+
+    def get_scores(self, summary, models, summary_len=0):
+        """
+        :param summary: the summary text, or a list of sentences
+        :param models: list of tuples (model file, sentences), as returned by Topic.get_models
+        :param summary_len: the length limit in words
+        :return: R1, R2, SU* recall
+        """
+        index = self.get_reference_index(models, summary_len)
+        peer_tables = self.count_tables(self.tokenize(text_to_lines(summary), index.summary_len))
+
+        R1score, R2score, R4score = self.recall(peer_tables, index.model_tables)
+        return R1score, R2score, R4score
+
+    def __call__(self, summary, models, summary_len):
+        return self.get_scores(summary, models, summary_len)
@@ -3,13 +3,32 @@ import tempfile
 from os import path
 
 from summarizer.utils.writer import write_to_file
+from summarizer.rouge.python_rouge import PythonRouge, ReferenceIndex
 from subprocess import check_output
+import logging
 import re
 
+log = logging.getLogger("Rouge")
+
+ENGINE_PYTHON = "python"
+ENGINE_PERL = "perl"
+ENGINE_VERIFY = "verify"
+
 
 class Rouge(object):
-    def __init__(self, rouge_dir):
+    def __init__(self, rouge_dir, engine=ENGINE_PYTHON):
+        """
+        :param rouge_dir: the ROUGE-1.5.5 directory
+        :param engine: "python" scores in-process, "perl" runs ROUGE-1.5.5.pl, "verify" runs both, logs differing
+            scores and returns the ones of the perl script.
+        """
+        if engine not in [ENGINE_PYTHON, ENGINE_PERL, ENGINE_VERIFY]:
+            raise ValueError("engine '%s' is invalid, should be one of %s" %
+                             (engine, [ENGINE_PYTHON, ENGINE_PERL, ENGINE_VERIFY]))
         self.ROUGE_DIR = rouge_dir
+        self.engine = engine
+        self.python_rouge = PythonRouge(rouge_dir) if engine != ENGINE_PERL else None
+        self.summary_len = 0
         self.reference_summary_temp_filename = "reference_summary.txt"
         config_file = "config.xml"
         self.temp_dir = tempfile.mkdtemp()
@@ -68,6 +87,20 @@ class Rouge(object):
         return check_output(cmd, shell=True)
 
     def get_scores(self, summary, models):
+        if isinstance(summary, list):
+            summary = '\n'.join(summary)
+
+        if self.engine == ENGINE_PYTHON:
+            return self.python_rouge.get_scores(summary, models, self.summary_len)
+
+        scores = self.get_perl_scores(summary, models)
+        if self.engine == ENGINE_VERIFY:
+            python_scores = self.python_rouge.get_scores(summary, models, self.summary_len)
+            if python_scores != scores:
+                log.warning("python ROUGE scores %s differ from ROUGE-1.5.5.pl scores %s" % (python_scores, scores))
+        return scores
+
+    def get_perl_scores(self, summary, models):
         write_to_file(summary, path.join(self.temp_dir, self.reference_summary_temp_filename))
 
         models_dir = path.dirname(models[0][0])
@@ -84,6 +117,21 @@ class Rouge(object):
         R4score = float(result_dict["1"]['ROUGE-SU* R'])
         return R1score, R2score, R4score
 
+    def load_reference_index(self, models, summary_len, cache_file):
+        """
+            loads the reference index of the models from the cache_file, or builds and stores it if the file is missing
+            or outdated. Without the python engine, there is nothing to index.
+        """
+        if self.python_rouge is None:
+            return None
+        index = ReferenceIndex.load(cache_file, [path.basename(model) for model, _ in models], int(summary_len))
+        if index is None:
+            index = self.python_rouge.build_reference_index(models, summary_len)
+            index.save(cache_file)
+        self.python_rouge.add_reference_index(models, index)
+        return index
+
     def __call__(self, summary, models, summary_len):
         self.ROUGE_ARGS = '-n 4 -m -x -c 95 -r 1000 -f A -p 0.5 -t 0 -a -2 -4 -u -l %s' % (summary_len)
+        self.summary_len = summary_len
         return self.get_scores(summary, models)
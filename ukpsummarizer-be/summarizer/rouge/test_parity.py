@@ -0,0 +1,122 @@
+"""
+Compares the scores of the in-process ROUGE engine with the ones of ROUGE-1.5.5.pl on the bundled sample topics.
+
+Candidate summaries are random sentence subsets of the topic documents, scored against random subsets of the
+reference summaries with different length limits. The test fails if any of the scores (ROUGE-1, ROUGE-2 or ROUGE-SU*)
+differ, and is skipped if ROUGE-1.5.5.pl cannot be run (perl or its XML::DOM module are missing).
+
+    python -m unittest summarizer.rouge.test_parity
+"""
+from __future__ import print_function
+
+import codecs
+import os
+import random
+import subprocess
+import sys
+import unittest
+import os.path as path
+
+sys.path.append(path.dirname(path.dirname(path.dirname(path.abspath(__file__)))))
+
+from summarizer.rouge.rouge import Rouge, ENGINE_PERL
+from summarizer.rouge.python_rouge import PythonRouge
+
+METRICS = ["ROUGE-1 R", "ROUGE-2 R", "ROUGE-SU* R"]
+
+BE_DIR = path.dirname(path.dirname(path.dirname(path.abspath(__file__))))
+ROUGE_DIR = path.join(BE_DIR, "rouge", "RELEASE-1.5.5")
+DEMO_DIR = path.join(path.dirname(BE_DIR), "data", "processed", "DEMO")
+TEST_DATASETS_DIR = path.join(path.dirname(BE_DIR), "ukpsummarizer-server", "src", "test", "resources", "datasets",
+                              "processed")
+
+
+def read_dir(location):
+    """
+    :return: list of tuples (file, sentences), like Topic.read
+    """
+    documents = []
+    for file_name in sorted(os.listdir(location)):
+        absolute_file = path.normpath(path.join(location, file_name))
+        with codecs.open(absolute_file, 'r', 'utf-8') as fp:
+            text = fp.read().splitlines()
+        documents.append((absolute_file, text))
+    return documents
+
+
+def list_topics(dataset_dir):
+    """
+    :return: the topic directories of a dataset which have docs/ and summaries/
+    """
+    if not path.isdir(dataset_dir):
+        return []
+    topics = [path.join(dataset_dir, t) for t in sorted(os.listdir(dataset_dir))]
+    return [t for t in topics if path.isdir(path.join(t, "docs")) and path.isdir(path.join(t, "summaries"))]
+
+
+def perl_rouge_available(rouge_dir):
+    if not path.isfile(path.join(rouge_dir, "ROUGE-1.5.5.pl")):
+        return False
+    try:
+        with open(os.devnull, 'w') as devnull:
+            return subprocess.call(["perl", "-MXML::DOM", "-e", "1"], stdout=devnull, stderr=devnull) == 0
+    except OSError:
+        return False
+
+
+def check_topic(topic_dir, perl_rouge, python_rouge, samples=50, seed=0):
+    """
+    :return: list of (summary, models, length limit, perl scores, python scores, differing metrics) for the
+        differing samples
+    """
+    rnd = random.Random(seed)
+    models = read_dir(path.join(topic_dir, "summaries"))
+    sentences = [sentence for _, doc in read_dir(path.join(topic_dir, "docs")) for sentence in doc]
+
+    mismatches = []
+    for _ in range(samples):
+        summary = "\n".join(rnd.sample(sentences, rnd.randint(0, min(10, len(sentences)))))
+        sample_models = rnd.sample(models, rnd.randint(1, len(models)))
+        summary_len = rnd.choice([0, 50, 100, 250])
+
+        perl_scores = perl_rouge(summary, sample_models, summary_len)
+        python_scores = python_rouge(summary, sample_models, summary_len)
+        differing = [metric for metric, perl_score, python_score in zip(METRICS, perl_scores, python_scores)
+                     if perl_score != python_score]
+        if differing or len(perl_scores) != len(python_scores):
+            mismatches.append((summary, sample_models, summary_len, perl_scores, python_scores, differing))
+    return mismatches
+
+
+class RougeParityTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        if not perl_rouge_available(ROUGE_DIR):
+            raise unittest.SkipTest("ROUGE-1.5.5.pl cannot be run, perl or XML::DOM are missing")
+        cls.perl_rouge = Rouge(ROUGE_DIR, engine=ENGINE_PERL)
+        cls.python_rouge = PythonRouge(ROUGE_DIR)
+
+    def assert_parity(self, topics, samples=50):
+        if not topics:
+            self.skipTest("the sample topics are not available")
+        failures = []
+        for topic in topics:
+            for summary, models, summary_len, perl_scores, python_scores, differing in \
+                    check_topic(topic, self.perl_rouge, self.python_rouge, samples=samples):
+                failures.append("%s -l %s, models %s: %s differ, perl %s, python %s" % (
+                    topic, summary_len, [path.basename(m) for m, _ in models], ", ".join(differing), perl_scores,
+                    python_scores))
+        self.assertEqual([], failures, "\n".join(failures))
+
+    def test_demo(self):
+        self.assert_parity([t for t in list_topics(DEMO_DIR) if path.basename(t) == "D0628A"])
+
+    def test_duc2004(self):
+        self.assert_parity(list_topics(path.join(TEST_DATASETS_DIR, "DUC2004TEST")), samples=20)
+
+    def test_duc2006(self):
+        self.assert_parity(list_topics(path.join(TEST_DATASETS_DIR, "DUC2006TEST")), samples=20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@ from __future__ import print_function, unicode_literals
 import argparse
 
 import datetime
+import multiprocessing
 
 from os import path
 
@@ -51,6 +52,16 @@ def add_args(parser):
 
     parser.add_argument('-grid', '--gridsearch', type=bool, help="If True, a grid search is performed on the given topic.", required=False, default=False)
 
+    parser.add_argument('-gw', '--grid_workers', type=int, help="Number of worker processes of the grid search, 0 uses all cores", required=False, default=1)
+
+    parser.add_argument('-gm', '--grid_mode', type=str, choices=["full", "halving"], help="full: run every configuration of the grid for all iterations. halving: successive halving, only the best configurations get more iterations", required=False, default="full")
+
+    parser.add_argument('-eta', '--halving_eta', type=int, help="Successive halving: keep the best 1/eta configurations per round, and multiply their iterations by eta", required=False, default=2)
+
+    parser.add_argument('-hmin', '--halving_min_iterations', type=int, help="Successive halving: iterations of the first round", required=False, default=1)
+
+    parser.add_argument('-hcfg', '--halving_configurations', type=int, help="Successive halving: number of configurations sampled from the grid, all if not used", required=False, default=None)
+
 
 if __name__ == '__main__':
     logging.config.fileConfig('logging.conf')
@@ -73,10 +84,13 @@ if __name__ == '__main__':
     initial_weights_file = args.initial_weights_file
     do_grid_search = args.gridsearch
     summary_index = args.summary_index
+    grid_workers = args.grid_workers or multiprocessing.cpu_count()
 
     logging.info("+---------------- Running single iteration ------------------")
     logging.info("| configuration settings:")
     logging.info("| grid search is: %s" % (do_grid_search))
+    logging.info("| grid workers    %s" % (grid_workers))
+    logging.info("| grid mode       %s" % (args.grid_mode))
     logging.info("| summary_size    %s" % (summary_size))
     logging.info("| topic_path      %s" % (topic_path))
     logging.info("| oracle_type     %s" % (oracle_type))
@@ -102,7 +116,12 @@ if __name__ == '__main__':
 
     if do_grid_search:
         runner = GridSearch(iobasedir, rouge_dir, out)
-        runner.run(topic_path,  max_iteration_count=5, parser=parser_type)
+        if args.grid_mode == "halving":
+            runner.run_successive_halving(topic_path, max_iteration_count=iterations, parser=parser_type,
+                                          workers=grid_workers, min_iteration_count=args.halving_min_iterations,
+                                          eta=args.halving_eta, configurations=args.halving_configurations)
+        else:
+            runner.run(topic_path,  max_iteration_count=5, parser=parser_type, workers=grid_workers)
     else:
         runner = SingleTopicRunner(iobasedir, rouge_dir, out)
         runner.run(topic_path=topic_path, summarizer=summarizer_type, parser=parser_type,
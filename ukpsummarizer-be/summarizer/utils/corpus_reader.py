@@ -5,11 +5,17 @@ import codecs
 sys.path.append(path.dirname(path.dirname(path.dirname(path.abspath(__file__)))))
 import re, os
 
+from summarizer.model.document_stream import DocumentStream
+
 
 class CorpusReader(object):
-    def __init__(self, base_path, parse_type=None):
+    def __init__(self, base_path, parse_type=None, stream=False):
+        """
+        :param stream: if True, get_data yields DocumentStreams, which read the sentences lazily
+        """
         self.base_path = base_path
         self.parse_type=parse_type
+        self.stream = stream
 
     def load_processed(self, path, summary_len=None):
         data = []
@@ -17,6 +23,8 @@ class CorpusReader(object):
         if summary_len:
             summaries = [model for model in docs if re.search("M\.%s\." % (summary_len), model)]
             docs = summaries
+        if self.stream:
+            return DocumentStream(path, docs)
         for doc_name in docs:
             filename = "%s/%s" % (path, doc_name)
             with codecs.open(filename, 'r', 'utf-8') as fp:
@@ -0,0 +1,416 @@
+"""
+Pluggable solver backends for the ILP formulations (concept-based summarizer, joint feedback ILP and the extractive
+upper bound).
+
+Models are built through a small solver-neutral API. Expressions and constraints are formed with the native operators
+(`coef * var`, `expr <= rhs`) of the respective backend, so the formulations read the same as before:
+
+    model = get_solver(solver).create_model("name")
+    s = model.binary_var_dict("s", range(S))
+    model.add_constraint(model.sum(s[j] * length[j] for j in range(S)) <= L)
+    model.maximize(model.sum(...))
+    value = model.solve()
+    solution = [j for j in range(S) if model.is_selected(s[j])]
+
+The "cplex" backend builds the model in memory through the docplex API, the "pulp" backends write an LP file and run
+the external solver binary, which is what all ILPs did before.
+
+For anytime solving, a model can be given a time limit and a start solution before `solve()`, and `get_gap()` tells
+how far the returned solution may be from the optimum.
+
+A model can be solved again after it has been changed: `add_constraint` returns a handle for `remove_constraints`, and
+`maximize` replaces the objective. The docplex model applies the changes to the CPLEX model in memory, the pulp models
+write the changed LP file.
+"""
+import logging
+import time
+from abc import ABCMeta, abstractmethod
+
+import pulp
+
+try:
+    from docplex.mp.environment import Environment
+    from docplex.mp.model import Model as DocplexModel
+    from docplex.mp.solution import SolveSolution
+
+    DOCPLEX_AVAILABLE = Environment.get_default_env().has_cplex
+except ImportError:
+    DOCPLEX_AVAILABLE = False
+
+log = logging.getLogger("IlpSolvers")
+
+SOLVER_CPLEX = "cplex"
+SOLVER_PULP = "pulp"
+SOLVER_GLPK = "glpk"
+SOLVER_GUROBI = "gurobi"
+
+DEFAULT_SOLVER = SOLVER_CPLEX
+
+PULP_SOLVERS = {
+    SOLVER_CPLEX: pulp.CPLEX,
+    SOLVER_GLPK: pulp.GLPK,
+    SOLVER_GUROBI: pulp.GUROBI
+}
+
+
+PULP_FRACTIONAL_TIME_LIMIT = [SOLVER_CPLEX, SOLVER_GUROBI]
+""" the pulp solvers which take a fractional time limit, glpsol only knows whole seconds """
+
+logged_backends = set()
+""" (solver name, backend name) pairs of get_solver which have been logged already """
+
+pulp_overhead = {}
+""" pulp solver -> seconds by which its last time-limited solve exceeded the time limit, i.e. the time for writing the
+    LP file, starting the solver and reading the solution. It is subtracted from the time limit of the next solve. """
+
+
+def pulp_time_limit(solver, time_limit):
+    """
+        the time limit to pass to the pulp solver, so that the whole solve takes at most time_limit seconds.
+    :return: the time limit, None if the solver cannot keep it
+    """
+    time_limit -= pulp_overhead.get(solver, 0.0)
+    if solver not in PULP_FRACTIONAL_TIME_LIMIT:
+        time_limit = int(time_limit)
+        return time_limit if time_limit >= 1 else None
+    return time_limit if time_limit > 0 else None
+
+
+def pulp_solver(solver, time_limit=None, warm_start=False):
+    """
+        the pulp solver command, with a time limit (in seconds) and MIP start if the installed PuLP supports them.
+    :return: (solver command, time limit passed to the solver or None)
+    """
+    solver_class = PULP_SOLVERS[solver]
+    kwargs = {}
+    if time_limit is not None:
+        limit = pulp_time_limit(solver, time_limit)
+        if limit is not None:
+            kwargs["timeLimit"] = limit
+    if warm_start:
+        kwargs["warmStart"] = True
+    try:
+        return solver_class(msg=0, **kwargs), kwargs.get("timeLimit")
+    except TypeError:
+        # PuLP < 2.0 knows neither time limits nor MIP starts for the command line solvers
+        log.debug("%s does not support %s, solving without" % (solver_class.__name__, kwargs.keys()))
+        return solver_class(msg=0), None
+
+
+def pulp_keeps_time_limit(solvers, time_limit):
+    """
+        whether the first available of the pulp solvers can keep the time limit (in seconds)
+    """
+    for solver in solvers:
+        command, limit = pulp_solver(solver, time_limit)
+        if command.available():
+            return limit is not None
+    return False
+
+
+def solve_pulp_problem(prob, solvers, time_limit=None, warm_start=False):
+    """
+        solves the pulp.LpProblem with the given solvers, in this order, falling back to the next one if a solver is
+        not available.
+
+    :param solvers: list of solver names, see PULP_SOLVERS
+    :param time_limit: seconds for the whole solve, including writing the LP file and starting the solver
+    :return: the value of the objective function, or None if the problem is infeasible
+    """
+    for i, solver in enumerate(solvers):
+        start = time.time()
+        command, limit = pulp_solver(solver, time_limit, warm_start)
+        if time_limit is not None and limit is None:
+            log.warning("pulp solver %s cannot keep the time limit of %.3f s, solving without" % (solver, time_limit))
+        try:
+            prob.solve(command)
+        except:
+            if i + 1 == len(solvers):
+                raise
+            log.info("pulp solver %s failed, falling back to %s" % (solver, solvers[i + 1]))
+            continue
+        if limit is not None and time.time() - start > limit:
+            pulp_overhead[solver] = time.time() - start - limit
+        break
+    if prob.status == pulp.LpStatusInfeasible:
+        return None
+    return pulp.value(prob.objective)
+
+
+def pulp_gap(prob, time_limit=None):
+    """
+        the gap of the last solution of the pulp.LpProblem, see IlpModel.get_gap
+    """
+    # PuLP >= 2.0 tells optimal from merely feasible solutions, older versions only if the solver ran to the end
+    sol_status = getattr(prob, "sol_status", None)
+    if sol_status is not None:
+        return 0.0 if sol_status == pulp.LpSolutionOptimal else None
+    if time_limit is None and prob.status == pulp.LpStatusOptimal:
+        return 0.0
+    return None
+
+
+class IlpModel(object):
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def binary_var_dict(self, name, keys):
+        """
+            creates a binary variable for each of the keys
+        :return: dict key -> variable
+        """
+        pass
+
+    @abstractmethod
+    def binary_var(self, name):
+        """
+            creates a single binary variable
+        """
+        pass
+
+    @abstractmethod
+    def sum(self, terms):
+        """
+            sums up the given iterable of variables / expressions
+        """
+        pass
+
+    @abstractmethod
+    def add_constraint(self, constraint):
+        """
+        :return: handle of the constraint for remove_constraints
+        """
+        pass
+
+    @abstractmethod
+    def remove_constraints(self, constraints):
+        """
+            removes the constraints with the given handles from the model
+        """
+        pass
+
+    @abstractmethod
+    def maximize(self, expr):
+        """
+            sets the objective, replacing the previous one
+        """
+        pass
+
+    @abstractmethod
+    def solve(self):
+        """
+            solves the model.
+        :return: the value of the objective function, or None if no solution was found
+        """
+        pass
+
+    @abstractmethod
+    def value(self, var):
+        """
+            the value of the variable in the last solution
+        """
+        pass
+
+    def is_selected(self, var):
+        value = self.value(var)
+        return value is not None and round(value) == 1
+
+    def set_time_limit(self, seconds):
+        """
+            limits the time of the next solve to the given seconds from now. The best solution found until then is
+            returned.
+        :return: False if the solver cannot keep the limit, the next solve then runs without
+        """
+        self.time_limit = seconds
+        self.deadline = time.time() + seconds
+        return True
+
+    def get_time_left(self):
+        """
+        :return: the seconds left of the time limit, None if there is none
+        """
+        if self.time_limit is None:
+            return None
+        return max(0.0, self.deadline - time.time())
+
+    def set_start(self, values):
+        """
+            passes a (feasible) solution to the solver as starting point of the next solve.
+        :param values: dict variable -> value
+        """
+        self.start = values
+
+    def get_gap(self):
+        """
+            the relative gap |best bound - objective| / |objective| of the last solution.
+        :return: 0.0 if the solution is optimal, None if the gap is unknown
+        """
+        return None
+
+
+class IlpSolver(object):
+    __metaclass__ = ABCMeta
+
+    name = None
+
+    @abstractmethod
+    def create_model(self, name):
+        """
+        :rtype: IlpModel
+        """
+        pass
+
+
+class PulpIlpModel(IlpModel):
+    def __init__(self, name, solvers):
+        self.prob = pulp.LpProblem(name, pulp.LpMaximize)
+        self.solvers = solvers
+        self.time_limit = None
+        self.start = None
+        self.constraint_count = 0
+
+    def binary_var_dict(self, name, keys):
+        return pulp.LpVariable.dicts(name=name, indexs=keys, lowBound=0, upBound=1, cat='Integer')
+
+    def binary_var(self, name):
+        return pulp.LpVariable(name, lowBound=0, upBound=1, cat='Integer')
+
+    def sum(self, terms):
+        return pulp.lpSum(terms)
+
+    def add_constraint(self, constraint):
+        # named, so that the constraint can be removed again
+        self.constraint_count += 1
+        name = "ct_%s" % self.constraint_count
+        self.prob += (constraint, name)
+        return name
+
+    def remove_constraints(self, constraints):
+        for name in constraints:
+            del self.prob.constraints[name]
+
+    def maximize(self, expr):
+        self.prob.setObjective(expr)
+
+    def solve(self):
+        if self.start and hasattr(pulp.LpVariable, "setInitialValue"):
+            for var, value in self.start.items():
+                var.setInitialValue(value)
+
+        return solve_pulp_problem(self.prob, self.solvers, time_limit=self.get_time_left(), warm_start=bool(self.start))
+
+    def value(self, var):
+        return var.varValue
+
+    def set_time_limit(self, seconds):
+        super(PulpIlpModel, self).set_time_limit(seconds)
+        return pulp_keeps_time_limit(self.solvers, seconds)
+
+    def get_gap(self):
+        return pulp_gap(self.prob, self.time_limit)
+
+
+class PulpIlpSolver(IlpSolver):
+    """
+        Writes the problem to an LP file and runs the external solver binary.
+    """
+
+    def __init__(self, solvers=(SOLVER_CPLEX, SOLVER_GLPK)):
+        self.solvers = list(solvers)
+        self.name = "pulp-%s" % "-".join(self.solvers)
+
+    def create_model(self, name):
+        return PulpIlpModel(name, self.solvers)
+
+
+class DocplexIlpModel(IlpModel):
+    def __init__(self, name):
+        self.mdl = DocplexModel(name=name)
+        self.solution = None
+        self.time_limit = None
+        self.start = None
+
+    def binary_var_dict(self, name, keys):
+        return self.mdl.binary_var_dict(list(keys), name=name)
+
+    def binary_var(self, name):
+        return self.mdl.binary_var(name=name)
+
+    def sum(self, terms):
+        return self.mdl.sum(terms)
+
+    def add_constraint(self, constraint):
+        return self.mdl.add_constraint(constraint)
+
+    def remove_constraints(self, constraints):
+        self.mdl.remove_constraints(list(constraints))
+
+    def maximize(self, expr):
+        self.mdl.maximize(expr)
+
+    def solve(self):
+        if self.time_limit is not None:
+            self.mdl.set_time_limit(max(self.get_time_left(), 0.001))
+        if self.start:
+            # a model which is solved again must not accumulate the starts of the previous solves
+            self.mdl.clear_mip_starts()
+            self.mdl.add_mip_start(SolveSolution(self.mdl, self.start))
+        self.solution = self.mdl.solve()
+        if self.solution is None:
+            return None
+        return self.solution.objective_value
+
+    def value(self, var):
+        if self.solution is None:
+            return None
+        return self.solution.get_value(var)
+
+    def get_gap(self):
+        if self.solution is None:
+            return None
+        details = self.mdl.solve_details
+        if "optimal" in details.status and "tolerance" not in details.status:
+            return 0.0
+        return details.mip_relative_gap
+
+
+class DocplexIlpSolver(IlpSolver):
+    """
+        Builds the problem in memory through the docplex API and solves it with the CPLEX libraries.
+    """
+    name = "docplex"
+
+    def create_model(self, name):
+        return DocplexIlpModel(name)
+
+
+def get_solver(solver=None):
+    """
+        returns the backend for the given solver name. CPLEX is always tried first, like the ILPs did before the
+        backends: "cplex" (in-memory docplex, falls back to pulp if CPLEX is not installed), "pulp" (LP file with
+        CPLEX, then GLPK), "glpk" or "gurobi" (LP file with CPLEX, then the respective solver). Defaults to "cplex".
+
+    :return: IlpSolver
+    """
+    if isinstance(solver, IlpSolver):
+        return solver
+
+    solver = (solver or DEFAULT_SOLVER).lower()
+    if solver == SOLVER_CPLEX:
+        if DOCPLEX_AVAILABLE:
+            backend = DocplexIlpSolver()
+        else:
+            backend = PulpIlpSolver()
+    elif solver == SOLVER_PULP:
+        backend = PulpIlpSolver()
+    elif solver in PULP_SOLVERS:
+        backend = PulpIlpSolver([SOLVER_CPLEX, solver])
+    else:
+        raise ValueError("solver '%s' is invalid, should be one of %s" % (
+            solver, [SOLVER_CPLEX, SOLVER_PULP, SOLVER_GLPK, SOLVER_GUROBI]))
+
+    if (solver, backend.name) not in logged_backends:
+        logged_backends.add((solver, backend.name))
+        log.info("ILP solver '%s': using backend %s%s" % (
+            solver, backend.name, "" if DOCPLEX_AVAILABLE else " (docplex/cplex is not available)"))
+    return backend
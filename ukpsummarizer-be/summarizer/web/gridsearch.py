@@ -1,13 +1,16 @@
 import hashlib
 import itertools
+import json
 import logging
+import multiprocessing
 import os
+import random
 import re
 from os import path
-from random import random
 
 from nltk import SnowballStemmer
 
+from algorithms.feedback import SimilarityCache, get_similarity_cache, set_similarity_cache
 from algorithms.feedback.ConceptEmbedder import ConceptEmbedder
 from algorithms.feedback.SimpleNgramFeedbackGraph import SimpleNgramFeedbackGraph
 from algorithms.feedback.WordEmbeddingGaussianFeedbackGraph import WordEmbeddingGaussianFeedbackGraph
@@ -17,6 +20,115 @@ from model.topic import Topic
 from utils.data_helpers import load_w2v_embeddings
 from web.single_iteration_runner import SingleTopicRunner
 
+CHECKPOINT_FILE = "checkpoint.jsonl"
+""" lines {"job": job key, "run_id": run_id} of the finished configurations, in the output directory of the topic """
+
+CONFIGURATIONS_FILE = "halving-configurations.json"
+""" the [interpretation type, kwargs] pairs sampled by a successive halving run, in the output directory of the topic """
+
+grid_context = None
+""" GridContext of the running grid search. The worker processes get it from init_worker. """
+
+
+def job_key(itype, kwargs):
+    return json.dumps([itype, kwargs], sort_keys=True)
+
+
+def read_checkpoint(filename):
+    """
+    :return: dict job key -> run_id of the finished configurations
+    """
+    finished = {}
+    if path.exists(filename):
+        with open(filename) as fp:
+            for line in fp:
+                line = line.strip()
+                if line:
+                    entry = json.loads(line)
+                    finished[entry["job"]] = entry["run_id"]
+    return finished
+
+
+class GridContext(object):
+    """
+    The read-only data of a grid search, which is shared by all configurations: the topic, the embeddings (a memmap)
+    and the concept embedder with its cache.
+    """
+
+    def __init__(self, iobasedir, rouge, topic, size, outputdir, embeddings, parser=None, max_iteration_count=25):
+        self.iobasedir = iobasedir
+        self.rouge = rouge
+        self.topic = topic
+        self.size = size
+        self.outputdir = outputdir
+        self.embeddings = embeddings
+        self.parser = parser
+        self.max_iteration_count = max_iteration_count
+        self.concept_embedder = ConceptEmbedder(embeddings)
+        self.stemmer = SnowballStemmer(topic.get_language())
+
+    def get_feedbackstore(self, itype, kwargs):
+        if itype == 'WordEmbeddingGaussianFeedbackGraph':
+            return WordEmbeddingGaussianFeedbackGraph(self.concept_embedder, **kwargs)
+        elif itype == 'WordEmbeddingRandomWalkDiffusionFeedbackGraph':
+            return WordEmbeddingRandomWalkDiffusionFeedbackGraph(self.concept_embedder, **kwargs)
+        elif itype == 'SimpleNgramFeedbackGraph':
+            return SimpleNgramFeedbackGraph(self.stemmer, self.topic.get_language(), **kwargs)
+        # BaselineFeedbackStore is the default of the SimulatedFeedback
+        return None
+
+
+def trajectory_score(result, iteration_count):
+    """
+        the mean ROUGE-2 recall over the feedback iterations of a SingleTopicRunner result, i.e. the area under its
+        ROUGE-2 trajectory. A simulation which converged early keeps its last score for the remaining iterations.
+
+    :param result: the contents of a result-<run_id>.json
+    """
+    scores = [entry["ROUGE-2 R score"] for entry in result["result_rougescores"]][:iteration_count]
+    if not scores:
+        return 0.0
+    scores += [scores[-1]] * (iteration_count - len(scores))
+    return sum(scores) / float(len(scores))
+
+
+def init_worker(context, cache):
+    """
+        sets up a worker process of the grid search. The context and the similarity cache are passed explicitly, as
+        the globals of the parent are only inherited by forked workers, not by spawned ones (e.g. on Windows).
+
+    :param context: GridContext
+    :param cache: SimilarityCache or None
+    """
+    global grid_context
+    grid_context = context
+    set_similarity_cache(cache)
+    # the forked workers start with the random state of the parent, but should not all choose the same reference
+    # summaries
+    random.seed()
+
+
+def run_job(job):
+    """
+        runs one configuration of the grid search on the topic of grid_context.
+
+    :param job: (interpretation type, feedback store kwargs)
+    :return: (job key, run_id), the run_id is None if the run failed
+    """
+    log = logging.getLogger("GridSearch")
+    itype, kwargs = job
+    context = grid_context
+    log.info("%s: %s" % (itype, kwargs))
+    try:
+        sir = SingleTopicRunner(context.iobasedir, context.rouge, scores_dir=context.outputdir)
+        run_id = sir.run(context.topic, context.size, feedbackstore=context.get_feedbackstore(itype, kwargs),
+                         summarizer="PROPAGATION", parser=context.parser,
+                         max_iteration_count=context.max_iteration_count, preload_embeddings=context.embeddings)
+    except Exception:
+        log.exception("%s: %s failed" % (itype, kwargs))
+        run_id = None
+    return job_key(itype, kwargs), run_id
+
 
 class GridSearch(object):
     def __init__(self, iobasedir, rouge_dir, scores_dir="C:\\users\\hatieke\\.ukpsummarizer\\grid_scores"):
@@ -32,7 +144,10 @@ class GridSearch(object):
             "german": None
         }
 
-    def run(self, topic_path, size=None, max_iteration_count=25):
+    def get_jobs(self):
+        """
+        :return: shuffled list of (interpretation type, feedback store kwargs)
+        """
         log = logging.getLogger("GridSearch")
 
         interpretation_types = [
@@ -44,24 +159,7 @@ class GridSearch(object):
             #            'PageRankFeedbackGraph',
         ]
 
-        random.shuffle(interpretation_types)
-
-        if topic_path.startswith("/"):
-            relative_path = re.search('^(/)(.*)$', topic_path).group(2)
-        else:
-            relative_path = topic_path
-
-        topic = Topic(path.join(self.iobasedir, path.normpath(relative_path)))
-
-        embeddings = self.__get_embeddings__(topic.get_language())
-        run_id = hashlib.sha224(topic_path).hexdigest()
-        outputdir = path.join(self.scores_dir, run_id)
-        try:
-            os.mkdir(outputdir)
-        except:
-            pass
-
-        concept_embedder = ConceptEmbedder(embeddings)
+        jobs = []
         for itype in interpretation_types:
             if itype == 'WordEmbeddingGaussianFeedbackGraph':
                 mass_reject = [4.0, 1.0, 0.0, -1.0, -4.0]
@@ -70,21 +168,15 @@ class GridSearch(object):
                 iterations_reject = [2, 4, 8, 16, 64]
                 cut_off_threshold = [0.998, 0.98, 0.9, 0.6, 0.4]
 
-                combinations = list(itertools.product(mass_reject, mass_accept, iterations_accept,
-                                                      iterations_reject, cut_off_threshold))
-                random.shuffle(combinations)
-
-                for (mr, ma, ia, ir, co) in combinations:
-                    log.info("WordEmbeddingGaussianFeedbackGraph: %s %s %s %s %s" % (mr, ma, ia, ir, co))
-                    g = WordEmbeddingGaussianFeedbackGraph(concept_embedder,
-                                                           cut_off_threshold=co,
-                                                           mass_reject=mr,
-                                                           mass_accept=ma,
-                                                           iterations_reject=ir,
-                                                           iterations_accept=ia)
-
-                    sir = SingleTopicRunner(self.iobasedir, self.rouge, scores_dir=outputdir)
-                    sir.run(topic_path, size, feedbackstore=g, summarizer="PROPAGATION", preload_embeddings=embeddings)
+                for (mr, ma, ia, ir, co) in itertools.product(mass_reject, mass_accept, iterations_accept,
+                                                              iterations_reject, cut_off_threshold):
+                    jobs.append((itype, {
+                        "cut_off_threshold": co,
+                        "mass_reject": mr,
+                        "mass_accept": ma,
+                        "iterations_reject": ir,
+                        "iterations_accept": ia
+                    }))
 
             elif itype == 'WordEmbeddingRandomWalkDiffusionFeedbackGraph':
                 mass_reject = [4.0, 1.0, 0.0, -1.0, -4.0]
@@ -94,30 +186,20 @@ class GridSearch(object):
                 cut_off_threshold = [0.998, 0.98, 0.9, 0.6, 0.4]
                 propagation_abort_threshold = [0.01, 0.1, 0.25, 0.5, 0.75, 0.9]
 
-                combinations = list(itertools.product(mass_reject, mass_accept, iterations_accept,
-                                                      iterations_reject, cut_off_threshold,
-                                                      propagation_abort_threshold))
-                random.shuffle(combinations)
-
-                for (mr, ma, ia, ir, co, pat) in combinations:
-                    log.info(
-                        "WordEmbeddingRandomWalkDiffusionFeedbackGraph: %s %s %s %s %s %s" % (mr, ma, ia, ir, co, pat))
-                    g = WordEmbeddingRandomWalkDiffusionFeedbackGraph(concept_embedder,
-                                                                      mass_accept=ma,
-                                                                      mass_reject=mr,
-                                                                      iterations_accept=ia,
-                                                                      iterations_reject=ir,
-                                                                      cut_off_threshold=co,
-                                                                      propagation_abort_threshold=pat)
-
-                    sir = SingleTopicRunner(self.iobasedir, self.rouge, scores_dir=outputdir)
-                    sir.run(topic_path, size, feedbackstore=g, summarizer="PROPAGATION", preload_embeddings=embeddings)
+                for (mr, ma, ia, ir, co, pat) in itertools.product(mass_reject, mass_accept, iterations_accept,
+                                                                   iterations_reject, cut_off_threshold,
+                                                                   propagation_abort_threshold):
+                    jobs.append((itype, {
+                        "mass_accept": ma,
+                        "mass_reject": mr,
+                        "iterations_accept": ia,
+                        "iterations_reject": ir,
+                        "cut_off_threshold": co,
+                        "propagation_abort_threshold": pat
+                    }))
 
             elif itype == "BaselineFeedbackStore":
-                log.info("BaselineFeedbackStore")
-
-                sir = SingleTopicRunner(self.iobasedir, self.rouge, scores_dir=outputdir)
-                sir.run(topic_path, size, summarizer="PROPAGATION", preload_embeddings=embeddings)
+                jobs.append((itype, {}))
 
             elif itype == "PageRankFeedbackGraph":
                 log.warning("interpretationtype not implementend. type: %s" % (itype))
@@ -125,24 +207,202 @@ class GridSearch(object):
                 window_size = [2, 3, 4, 5]
                 factor_rejects = [1, 0, 0.05, 0.25, 0.5, 2, 4, 8]
                 factor_accepts = [1, 0, 0.05, 0.25, 0.5, 2, 4, 8]
-                stemmer = SnowballStemmer(topic.get_language())
-                combinations = list(itertools.product(window_size, factor_rejects, factor_accepts))
-                random.shuffle(combinations)
-
-                for (ws, fr, fa) in combinations:
-                    log.info("SimpleNgramFeedbackGraph: (ws %s, fr %s, fa %s)" % (ws, fr, fa))
-                    g = SimpleNgramFeedbackGraph(stemmer,
-                                                 topic.get_language(),
-                                                 N=ws,
-                                                 factor_reject=fr,
-                                                 factor_accept=fa)
-
-                    sir = SingleTopicRunner(self.iobasedir, self.rouge, scores_dir=outputdir)
-                    sir.run(topic_path, size, feedbackstore=g, summarizer="PROPAGATION",
-                            preload_embeddings=embeddings)
+
+                for (ws, fr, fa) in itertools.product(window_size, factor_rejects, factor_accepts):
+                    jobs.append((itype, {
+                        "N": ws,
+                        "factor_reject": fr,
+                        "factor_accept": fa
+                    }))
             else:
                 log.warning("Got wrong interpretationtype. ignoring type %s" % (itype))
 
+        random.shuffle(jobs)
+        return jobs
+
+    def run(self, topic_path, size=None, max_iteration_count=25, parser=None, workers=1):
+        """
+            runs all configurations of the grid on the topic. The results are written to scores_grid/<run_id>, where
+            run_id is the hash of the topic path. Finished configurations are recorded in CHECKPOINT_FILE, so that an
+            interrupted grid search continues with the remaining configurations when it is started again.
+
+        :param workers: number of worker processes, 1 runs the configurations in this process
+        """
+        global grid_context
+
+        topic, outputdir = self.__get_topic__(topic_path)
+        jobs = self.get_jobs()
+
+        grid_context = GridContext(self.iobasedir, self.rouge, topic, size, outputdir,
+                                   self.__get_embeddings__(topic.get_language()), parser=parser,
+                                   max_iteration_count=max_iteration_count)
+        try:
+            self.__precompute__(grid_context, jobs)
+            self.__run_jobs__(jobs, workers)
+        finally:
+            set_similarity_cache(None)
+            grid_context = None
+
+    def run_successive_halving(self, topic_path, size=None, max_iteration_count=25, parser=None, workers=1,
+                               min_iteration_count=1, eta=2, configurations=None):
+        """
+            successive halving over the configurations of the grid: all configurations run for min_iteration_count
+            feedback iterations, the best 1/eta of them (by trajectory_score) run again with eta times as many
+            iterations, and so on, until the remaining configurations have run max_iteration_count iterations.
+
+            Each round is a grid search of its own in scores_grid/<run_id>/halving-<iterations>, with the usual result
+            files and checkpoint, so an interrupted search continues where it stopped. The ranking of the last round is
+            written to halving-ranking.json.
+
+        :param eta: factor by which the configurations are reduced and the iterations are increased per round
+        :param configurations: number of configurations that are sampled from the grid, defaults to all. The sample
+            is kept in CONFIGURATIONS_FILE for a restart of the search
+        :return: list of (score, interpretation type, kwargs) of the last round, the best first
+        """
+        global grid_context
+        log = logging.getLogger("GridSearch")
+
+        topic, outputdir = self.__get_topic__(topic_path)
+        jobs = self.get_jobs()
+        if configurations:
+            jobs = self.__sample_jobs__(outputdir, jobs, configurations)
+        embeddings = self.__get_embeddings__(topic.get_language())
+
+        ranking = []
+        iteration_count = min(min_iteration_count, max_iteration_count)
+        try:
+            while True:
+                round_dir = path.join(outputdir, "halving-%s" % (iteration_count))
+                if not path.exists(round_dir):
+                    os.mkdir(round_dir)
+                grid_context = GridContext(self.iobasedir, self.rouge, topic, size, round_dir, embeddings,
+                                           parser=parser, max_iteration_count=iteration_count)
+                if not ranking:
+                    self.__precompute__(grid_context, jobs)
+
+                log.info("successive halving: %s configurations with %s iterations" % (len(jobs), iteration_count))
+                finished = self.__run_jobs__(jobs, workers)
+
+                ranking = []
+                for itype, kwargs in jobs:
+                    run_id = finished.get(job_key(itype, kwargs))
+                    if run_id is None:
+                        continue
+                    with open(path.join(round_dir, "result-%s.json" % (run_id))) as fp:
+                        ranking.append((trajectory_score(json.load(fp), iteration_count), itype, kwargs))
+                ranking.sort(key=lambda r: r[0], reverse=True)
+
+                if iteration_count >= max_iteration_count or len(ranking) <= 1:
+                    break
+                jobs = [(itype, kwargs) for (_, itype, kwargs) in ranking[:max(1, len(ranking) // eta)]]
+                iteration_count = min(iteration_count * eta, max_iteration_count)
+        finally:
+            set_similarity_cache(None)
+            grid_context = None
+
+        with open(path.join(outputdir, "halving-ranking.json"), "w") as fp:
+            json.dump([{"score": score, "type": itype, "config": kwargs, "iterations": iteration_count}
+                       for (score, itype, kwargs) in ranking], fp)
+        if ranking:
+            log.info("successive halving: best configuration %s %s (score %s)" % (ranking[0][1], ranking[0][2],
+                                                                                   ranking[0][0]))
+        return ranking
+
+    def __sample_jobs__(self, outputdir, jobs, configurations):
+        """
+            samples the configurations of a successive halving run from the shuffled jobs. The sample is saved to
+            CONFIGURATIONS_FILE and reused when the run is started again with the same number of configurations, so
+            that the checkpoints of an interrupted run apply to it.
+        """
+        log = logging.getLogger("GridSearch")
+
+        filename = path.join(outputdir, CONFIGURATIONS_FILE)
+        if path.exists(filename):
+            with open(filename) as fp:
+                sampled = [(itype, kwargs) for (itype, kwargs) in json.load(fp)]
+            if len(sampled) == min(configurations, len(jobs)):
+                log.info("successive halving: resuming with the configurations of %s" % (filename))
+                return sampled
+            log.warning("successive halving: %s has %s configurations instead of %s, sampling again" % (
+                filename, len(sampled), configurations))
+
+        sampled = jobs[:configurations]
+        with open(filename, "w") as fp:
+            json.dump(sampled, fp)
+        return sampled
+
+    def __get_topic__(self, topic_path):
+        """
+        :return: (Topic, output directory of the topic)
+        """
+        if topic_path.startswith("/"):
+            relative_path = re.search('^(/)(.*)$', topic_path).group(2)
+        else:
+            relative_path = topic_path
+
+        topic = Topic(path.join(self.iobasedir, path.normpath(relative_path)))
+
+        run_id = hashlib.sha224(topic_path).hexdigest()
+        outputdir = path.join(self.scores_dir, run_id)
+        try:
+            os.mkdir(outputdir)
+        except:
+            pass
+        return topic, outputdir
+
+    def __run_jobs__(self, jobs, workers):
+        """
+            runs the jobs which are not yet in the checkpoint of grid_context.outputdir.
+
+        :return: dict job key -> run_id of the finished jobs, including those of earlier runs
+        """
+        log = logging.getLogger("GridSearch")
+        checkpoint = path.join(grid_context.outputdir, CHECKPOINT_FILE)
+        finished = read_checkpoint(checkpoint)
+        pending = [job for job in jobs if job_key(*job) not in finished]
+        log.info("%s configurations finished, %s to go, %s worker(s)" % (len(jobs) - len(pending), len(pending),
+                                                                       workers))
+
+        pool = None
+        try:
+            if workers > 1:
+                pool = multiprocessing.Pool(workers, initializer=init_worker,
+                                            initargs=(grid_context, get_similarity_cache()))
+                results = pool.imap_unordered(run_job, pending)
+            else:
+                results = (run_job(job) for job in pending)
+
+            with open(checkpoint, "a") as fp:
+                for i, (key, run_id) in enumerate(results):
+                    if run_id is not None:
+                        finished[key] = run_id
+                        fp.write(json.dumps({"job": key, "run_id": run_id}) + "\n")
+                        fp.flush()
+                    log.info("finished %s of %s configurations" % (i + 1, len(pending)))
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        return finished
+
+    def __precompute__(self, context, jobs):
+        """
+            sets up the SimulatedFeedback once before the jobs start: this fills the caches of the topic (upper bound,
+            ROUGE reference index), the concept embedder and, for the word-embedding stores, the similarity graph at the
+            lowest cut-off threshold of the grid, from which the graphs with the higher thresholds are derived.
+        """
+        cut_offs = [kwargs["cut_off_threshold"] for (_, kwargs) in jobs if "cut_off_threshold" in kwargs]
+        if cut_offs:
+            set_similarity_cache(SimilarityCache())
+            feedbackstore = WordEmbeddingGaussianFeedbackGraph(context.concept_embedder,
+                                                               cut_off_threshold=min(cut_offs))
+        else:
+            feedbackstore = None
+        topic = context.topic
+        sir = SingleTopicRunner(context.iobasedir, context.rouge, scores_dir=context.outputdir)
+        sir.build_simulated_feedback(topic, topic.get_models(), context.size or topic.get_summary_size(), "accept",
+                                     parser=context.parser, feedbackstore=feedbackstore)
+
     def __get_embeddings__(self, language):
         embeddings_path = path.normpath(path.join(self.iobasedir, "embeddings"))
 
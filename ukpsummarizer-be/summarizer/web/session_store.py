@@ -0,0 +1,259 @@
+"""
+Keeps the SimulatedFeedback instances of the interactive sessions in memory, so that a `continue` request does not
+have to unpickle and pickle the whole summarizer.
+
+A session is identified by the path of its pickle (the pickleout of the previous request). A continue request checks
+the session out, i.e. takes it out of the store and runs the iteration on the live SimulatedFeedback. Only the delta of
+the session it starts from is kept, so that this session can be restored from disk for a retry when the request fails
+(see rollback). The result is registered under the pickleout and written as a compact delta next to the pickleout path,
+so that it survives a crash of the worker:
+
+    {
+        "version": 1,
+        "base": "<path of the full pickle the session started from>",
+        "k": 0.1,
+        "records": [{"accept": [..], "reject": [..], "implicit_reject": [..]}, ..],
+        "weights": {"concept": weight, ..},
+        "log_info_data": [..],
+        "log_sir_info_data": [..]
+    }
+
+"records" and the logs only contain the entries which have been added after the base pickle was written, "weights"
+only the concept weights which differ from the base. When an evicted session is resumed, the base pickle is loaded and
+the delta is replayed on top of it (see SimulatedFeedback.replay_feedback). The number of sessions in memory is
+limited, the least recently used sessions are evicted.
+"""
+from __future__ import print_function
+
+import json
+import logging
+import os
+from collections import OrderedDict
+from os import path
+
+import dill as pickle
+
+from algorithms.flight_recorder import Record
+from utils.writer import write_to_file
+
+DELTA_VERSION = 1
+DELTA_SUFFIX = ".delta.json"
+DEFAULT_CAPACITY = 16
+
+log = logging.getLogger("SessionStore")
+
+
+def normalize_key(key):
+    return path.normpath(path.abspath(key))
+
+
+def delta_file(key):
+    return key + DELTA_SUFFIX
+
+
+def load_pickle(location):
+    with open(location, 'rb') as fp:
+        return pickle.load(fp)
+
+
+def record_to_json(record):
+    return {
+        "accept": sorted(record.accept),
+        "reject": sorted(record.reject),
+        "implicit_reject": sorted(record.implicit_reject)
+    }
+
+
+def record_from_json(js):
+    record = Record()
+    record.accept.union_update(js.get("accept", []))
+    record.reject.union_update(js.get("reject", []))
+    record.implicit_reject.union_update(js.get("implicit_reject", []))
+    return record
+
+
+class Session(object):
+    """
+    A live SimulatedFeedback, plus what is needed to compute its delta to the base pickle.
+    """
+
+    def __init__(self, sf, base):
+        """
+        :param sf: SimulatedFeedback in the state of the pickle `base`
+        :param base: path of the full pickle
+        """
+        self.sf = sf
+        self.base = base
+        self.base_k = sf.k
+        self.base_records = len(sf.flight_recorder.records)
+        self.base_log_info_data = len(sf.log_info_data)
+        self.base_log_sir_info_data = len(sf.log_sir_info_data)
+        self.base_weights = dict(sf.get_concept_weights())
+        self.checkpoint = None
+        """ the delta of the session when it was checked out, see SessionStore.checkout """
+
+    def get_delta(self):
+        """
+        :return: jsonizable dict, see module description
+        """
+        sf = self.sf
+        weights = dict((concept, weight) for concept, weight in sf.get_concept_weights().items()
+                       if self.base_weights.get(concept) != weight)
+        return {
+            "version": DELTA_VERSION,
+            "base": self.base,
+            "k": sf.k,
+            "records": [record_to_json(r) for r in sf.flight_recorder.records[self.base_records:]],
+            "weights": weights,
+            "log_info_data": sf.log_info_data[self.base_log_info_data:],
+            "log_sir_info_data": sf.log_sir_info_data[self.base_log_sir_info_data:]
+        }
+
+    def is_base(self, key, delta):
+        """
+            whether the full pickle `key` is the state of the delta, so that no delta file is needed
+        """
+        return self.base == key and not delta["records"] and delta["k"] == self.base_k
+
+    def replay(self, delta):
+        """
+            brings the session from the base state into the state described by the delta
+        """
+        sf = self.sf
+        if delta["k"] != sf.k:
+            sf.change_k(delta["k"])
+        sf.replay_feedback([record_from_json(r) for r in delta["records"]], delta["weights"])
+        sf.log_info_data.extend(delta["log_info_data"])
+        sf.log_sir_info_data.extend(delta["log_sir_info_data"])
+
+
+class SessionStore(object):
+    """
+    LRU cache pickle path -> Session. Sessions which do not fit are spilled to disk as delta.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.sessions = OrderedDict()
+
+    def __contains__(self, key):
+        return normalize_key(key) in self.sessions
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def add(self, key, sf):
+        """
+            registers a session, for which the full pickle has just been written to `key`.
+        """
+        key = normalize_key(key)
+        if path.exists(delta_file(key)):
+            # the full pickle supersedes an old delta of the same name
+            os.remove(delta_file(key))
+        self.__put__(key, Session(sf, key))
+
+    def get(self, key, loader=None):
+        """
+            returns the SimulatedFeedback of the session. Evicted sessions are restored from their delta, unknown
+            sessions are loaded from the full pickle.
+
+        :param loader: function path -> SimulatedFeedback for the full pickles, defaults to load_pickle
+        """
+        key = normalize_key(key)
+        if key in self.sessions:
+            session = self.sessions.pop(key)
+            self.sessions[key] = session
+            log.info("session %s is in memory" % (key))
+            return session.sf
+
+        session = self.__load__(key, loader or load_pickle)
+        self.__put__(key, session)
+        return session.sf
+
+    def checkout(self, key, loader=None):
+        """
+            takes the session out of the store, so that a continue request may modify its SimulatedFeedback. The
+            modified session is registered with `commit`, or discarded with `rollback` if the request fails. Until
+            then, the session `key` is restored from disk when it is requested.
+
+        :param loader: see get
+        :rtype: Session
+        """
+        self.get(key, loader)
+        key = normalize_key(key)
+        session = self.sessions.pop(key)
+        session.checkpoint = session.get_delta()
+        return session
+
+    def commit(self, key, session):
+        """
+            registers the session returned by `checkout` as `key` (the pickleout of a continue request) and writes its
+            delta to disk.
+        """
+        key = normalize_key(key)
+        session.checkpoint = None
+        self.__put__(key, session)
+        self.__write__(key, session)
+
+    def rollback(self, key, session):
+        """
+            discards the session returned by `checkout(key)`, e.g. after a failed iteration. Its checkpoint is written
+            to disk, from where the session `key` is restored when it is requested again.
+        """
+        key = normalize_key(key)
+        log.info("discarding the changes of session %s" % (key))
+        self.__write_delta__(key, session, session.checkpoint)
+        session.sf = None
+
+    def spill(self, key):
+        """
+            writes the delta of the session to disk
+        """
+        key = normalize_key(key)
+        self.__write__(key, self.sessions[key])
+
+    def __write__(self, key, session):
+        self.__write_delta__(key, session, session.get_delta())
+
+    def __write_delta__(self, key, session, delta):
+        if session.is_base(key, delta):
+            # the full pickle is up to date
+            return
+        # written to a temporary file first, so that a crash does not leave a truncated delta
+        tmp = delta_file(key) + ".tmp"
+        write_to_file(json.dumps(delta), tmp)
+        if os.name == "nt" and path.exists(delta_file(key)):
+            os.remove(delta_file(key))
+        os.rename(tmp, delta_file(key))
+        log.info("wrote delta of session %s (%s records since %s)" % (key, len(delta["records"]), session.base))
+
+    def spill_all(self):
+        for key in self.sessions:
+            self.spill(key)
+
+    def __put__(self, key, session):
+        self.sessions.pop(key, None)
+        self.sessions[key] = session
+        while len(self.sessions) > self.capacity:
+            evicted = next(iter(self.sessions))
+            self.spill(evicted)
+            del self.sessions[evicted]
+
+    def __load__(self, key, loader):
+        delta = None
+        if path.exists(delta_file(key)) and \
+                (not path.exists(key) or path.getmtime(delta_file(key)) >= path.getmtime(key)):
+            with open(delta_file(key)) as fp:
+                delta = json.load(fp)
+            if delta.get("version") != DELTA_VERSION:
+                raise BaseException("Session delta %s has version %s, expected %s" % (
+                    delta_file(key), delta.get("version"), DELTA_VERSION))
+
+        base = key if delta is None else delta["base"]
+        log.info("loading session %s" % (base))
+        session = Session(loader(base), base)
+
+        if delta is not None:
+            log.info("replaying %s records of session %s" % (len(delta["records"]), key))
+            session.replay(delta)
+        return session
@@ -11,14 +11,18 @@ import dill as pickle
 import dill as pickle
 import pandas as pd
 
+from constants import SUMMARY_METHOD_ILP
 from algorithms.flight_recorder import FlightRecorder, Record
 from algorithms.oracle.human_oracle import HumanOracle
 from algorithms.simulated_feedback import SimulatedFeedback
+from algorithms.topic_artifacts import TopicArtifactCache
 from algorithms.upper_bound_ilp import ExtractiveUpperbound
 from baselines.sume_wrap import SumeWrap
 from model.topic import Topic
 from rouge.rouge import Rouge
 from utils.data_helpers import load_w2v_embeddings
+from web.session_store import SessionStore, delta_file
+from web.snapshot import is_snapshot, load_snapshot, restore_snapshot, write_snapshot
 from utils.writer import write_to_file, write_details_file
 from utils.load_clusters import get_clusters
 import random
@@ -27,6 +31,10 @@ from performance_utils.timer import IterationTimer, RunTimer
 from performance_utils.mreader import MeasurementReader
 import threading
 
+SESSION_FORMAT_PICKLE = "pickle"
+SESSION_FORMAT_SNAPSHOT = "snapshot"
+
+
 def roundup(x):
     return int(math.ceil(x / 100.0)) * 100
 
@@ -80,9 +88,10 @@ def get_flightrecorder_from_file(weights_file=None):
     return flightrecorder
 
 
-def load_ub_summary(language, docs, models, size, ngram_type=2,
-                    base_dir=path.normpath(path.expanduser("~/.ukpsummarizer/cache/"))):
-    import hashlib
+def get_topic_hash(language, docs, models, size, ngram_type=2):
+    """
+        the key of the per-topic caches (upper bound summary, ROUGE reference index)
+    """
     m = hashlib.sha256()
     shortened_docs = [path.split(f)[1] for (f, _) in docs]
     for doc in sorted(shortened_docs):
@@ -93,7 +102,25 @@ def load_ub_summary(language, docs, models, size, ngram_type=2,
     m.update(str(size))
     m.update(language)
     m.update(str(ngram_type))
-    h = m.hexdigest()
+    return m.hexdigest()
+
+
+def load_reference_index(rouge, language, docs, models, size, ngram_type=2,
+                         base_dir=path.normpath(path.expanduser("~/.ukpsummarizer/cache/")), topic_hash=None):
+    """
+        loads the ROUGE reference index of the models, which is cached next to the upper bound summary.
+
+    :param topic_hash: get_topic_hash of the arguments, if it is known already
+    """
+    h = topic_hash or get_topic_hash(language, docs, models, size, ngram_type)
+    return rouge.load_reference_index(models, size, path.normpath(path.join(base_dir, h + ".rouge.json")))
+
+
+def load_ub_summary(language, docs, models, size, ngram_type=2,
+                    base_dir=path.normpath(path.expanduser("~/.ukpsummarizer/cache/")), topic_hash=None):
+    shortened_docs = [path.split(f)[1] for (f, _) in docs]
+    shortened_models = [path.split(f)[1] for (f, _) in models]
+    h = topic_hash or get_topic_hash(language, docs, models, size, ngram_type)
     jsonloc = path.normpath(path.join(base_dir, h + ".json"))
     if path.isfile(jsonloc):
         try:
@@ -137,11 +164,30 @@ class SingleTopicRunner(object):
     tlog = logging.getLogger("timings")
 
     def __init__(self, iobasedir, rouge_dir, out=None, scores_dir=None, override_results_files=False,
-                 pickle_store=None, k=0.1):
+                 pickle_store=None, k=0.1, rouge_engine="python", rouge=None, session_store=None,
+                 session_format=SESSION_FORMAT_PICKLE, feedbackstore_factory=None,
+                 artifact_cache_dir=path.join("cache", "artifacts"), deadline_ms=None,
+                 summary_method=SUMMARY_METHOD_ILP):
+        """
+        :param session_store: SessionStore which keeps the sessions in memory between continue requests. Without it,
+            the sessions are pickled.
+        :param session_format: how sessions are written: "pickle" (dill) or "snapshot" (see web.snapshot). Both
+            formats can be loaded.
+        :param feedbackstore_factory: function (config, language) -> FeedbackStore, which rebuilds the feedback store
+            of a snapshot from its get_config().
+        :param artifact_cache_dir: directory of the TopicArtifactCache, relative to iobasedir. The preprocessed
+            sentences and concepts of each topic are stored there after the first run. None disables the cache.
+        :param deadline_ms: time budget of the ILPs per iteration in milliseconds. A heuristic summary is improved by
+            the ILP until the deadline. None solves the ILPs to optimality.
+        :param summary_method: "ilp", "greedy" (lazy greedy approximation) or "lp" (rounding of the LP relaxation).
+            The latter two are faster than the ILP on large topics.
+        """
         self.iobasedir = path.normpath(path.expanduser(iobasedir))
         # resolved_rouge_dir = path.normpath(path.expanduser(rouge_dir))
-        self.rouge = Rouge(rouge_dir)
+        self.rouge = rouge or Rouge(rouge_dir, engine=rouge_engine)
         self.k = k
+        self.deadline_ms = deadline_ms
+        self.summary_method = summary_method
         if out is None:
             self.out = None
         else:
@@ -155,6 +201,16 @@ class SingleTopicRunner(object):
             os.mkdir(self.scores_storage_path)
 
         self.override_results_switch = override_results_files
+        self.session_store = session_store
+        if session_format not in (SESSION_FORMAT_PICKLE, SESSION_FORMAT_SNAPSHOT):
+            raise ValueError("session_format '%s' is invalid, should be one of %s" % (
+                session_format, [SESSION_FORMAT_PICKLE, SESSION_FORMAT_SNAPSHOT]))
+        self.session_format = session_format
+        self.feedbackstore_factory = feedbackstore_factory
+        if artifact_cache_dir is None:
+            self.artifact_cache = None
+        else:
+            self.artifact_cache = TopicArtifactCache(path.join(self.iobasedir, artifact_cache_dir))
 
         if pickle_store is None:
             self.pickle_store = pickle_store
@@ -172,10 +228,33 @@ class SingleTopicRunner(object):
 
     def single_iteration(self, picklein, pickleout=None, feedbacks=None):
         log = logging.getLogger("SingleTopicRunner")
-        log.info("unpickling input %s" % (picklein))
+        session = None
+        if self.session_store is not None:
+            # the iteration runs on the live session, picklein is restored from disk if it fails
+            session = self.session_store.checkout(picklein, loader=self.load_session)
+            sf = session.sf
+        elif not path.exists(picklein) and path.exists(delta_file(picklein)):
+            # the session has been spilled by a cascade.py serve worker
+            sf = SessionStore().get(picklein, loader=self.load_session)
+        else:
+            sf = self.load_session(picklein)
+        try:
+            self.__continue__(sf, picklein, pickleout, feedbacks, log)
+        except:
+            if session is not None:
+                self.session_store.rollback(picklein, session)
+            raise
+
+        if session is not None:
+            if pickleout is not None:
+                self.session_store.commit(pickleout, session)
+            else:
+                # picklein stays as it is
+                self.session_store.rollback(picklein, session)
+        elif pickleout is not None:
+            self.pickle_write(sf, pickleout, log)
 
-        sf = pickle.load(open(picklein, 'rb'))
-        log.info("done unpick input")
+    def __continue__(self, sf, picklein, pickleout, feedbacks, log):
         iteration = len(sf.flight_recorder.records) + 1
         labeled_data = feedbacks or []
 
@@ -186,11 +265,9 @@ class SingleTopicRunner(object):
         if sf.k != self.k:
             log.info("recording k_size in continue %f", sf.k)
             log.info("recording sentence size in continue %d", len(sf.summarizer.sentences))
-            sf.k = self.k
-            if sf.run_config['rank_subset']:
-                sf.summarizer.sentences = sf.summarizer.all_sentences
-                sf.summarizer.weights = sf.sentence_ranker.all_concept_weights
-                sf.initialize_sentence_ranking()
+            sf.change_k(self.k)
+        sf.deadline_ms = self.deadline_ms
+        sf.summary_method = self.summary_method
 
         log.info("recording k_size in continue %f", sf.k)
         log.info("recording sentence size in continue %d", len(sf.summarizer.sentences))
@@ -215,21 +292,116 @@ class SingleTopicRunner(object):
                                           summary_sentences,
                                           exploratory_sentences)
 
-        if pickleout is not None:
-            self.pickle_write(sf, pickleout, log)
-
     def pickle_write(self, sf, pickleout, log):
+        if self.session_format == SESSION_FORMAT_SNAPSHOT:
+            write_snapshot(sf, pickleout)
+            log.info("### wrote snapshot output to %s" % (pickleout))
+            return
         output = open(pickleout, 'wb')
         pickle.dump(sf, output)
         output.close()
         log.info("### wrote pickle output to %s" % (pickleout))
 
+    def load_session(self, picklein):
+        """
+            loads a session, which has been stored either as pickle or as snapshot.
+        """
+        log = logging.getLogger("SingleTopicRunner")
+        if not is_snapshot(picklein):
+            log.info("unpickling input %s" % (picklein))
+            sf = pickle.load(open(picklein, 'rb'))
+            log.info("done unpick input")
+            return sf
+
+        log.info("loading snapshot %s" % (picklein))
+        snapshot = load_snapshot(picklein)
+        reference = snapshot.header["topic"]
+        topic = Topic(reference["topic"])
+        summaries = [(f, t) for (f, t) in topic.get_models() if path.basename(f) in reference["models"]]
+
+        feedbackstore = None
+        if reference["feedbackstore"] is not None:
+            if self.feedbackstore_factory is None:
+                raise BaseException("Cannot rebuild the feedback store %s of snapshot %s" % (
+                    reference["feedbackstore"], picklein))
+            feedbackstore = self.feedbackstore_factory(reference["feedbackstore"], topic.get_language())
+
+        sf, _, _ = self.build_simulated_feedback(topic, summaries, reference["size"], reference["oracle"],
+                                                 parser=reference["parser"], feedbackstore=feedbackstore,
+                                                 k=snapshot.header["k"])
+        restore_snapshot(snapshot, sf)
+        log.info("done loading snapshot")
+        return sf
+
+    def build_simulated_feedback(self, topic, summaries, size, oracle, parser=None, feedbackstore=None,
+                                 flightrecorder=None, k=None):
+        """
+            sets up the SimulatedFeedback for a topic. The arguments are kept as sf.topic_reference, so that the
+            session can be rebuilt from a snapshot.
+
+        :return: (sf, ub_summary, ub_scores)
+        """
+        log = logging.getLogger("SingleTopicRunner")
+        language = topic.get_language()
+        docs = topic.get_docs(stream=True)
+        if k is None:
+            k = self.k
+
+        #UB considering all the summaries
+        topic_hash = get_topic_hash(language, docs, summaries, size)
+        ub_summary = load_ub_summary(language, docs, summaries, size, base_dir=self.iobasedir, topic_hash=topic_hash)
+        load_reference_index(self.rouge, language, docs, summaries, size, base_dir=self.iobasedir,
+                             topic_hash=topic_hash)
+        ub_scores = self.rouge('\n'.join(ub_summary), summaries, size)
+
+        log.debug("UB scores: R1:%s R2:%s SU4:%s" % (str(ub_scores[0]), str(ub_scores[1]), str(ub_scores[2])))
+
+        parse_info = []
+        #parse_info = topic.get_parse_info(summaries.index(ref_summ))
+
+        # initialize the Algorithm.
+        run_config = dict()
+        run_config['rank_subset'] = True
+        run_config['relative_k'] = True
+        run_config['dynamic_k'] = False
+        for flag in ['adaptive_sampling', 'strategy']:
+            run_config[flag] = False
+
+        r = 0
+        clusters = None
+        log.info("recording k_size in summarize %f", k)
+        sf = SimulatedFeedback(language, self.rouge, embeddings=None,  #TODO: embeddings
+                               docs=docs, models=summaries,
+                               summary_length=size,
+                               oracle_type=oracle,
+                               ub_score=ub_scores, ub_summary=ub_summary,
+                               parser_type=parser, flightrecorder=flightrecorder,
+                               feedbackstore=feedbackstore, parse_info=parse_info,
+                               run_config=run_config, k=k, adaptive_window_size=r, clusters=clusters,
+                               artifact_cache=self.artifact_cache, deadline_ms=self.deadline_ms,
+                               summary_method=self.summary_method)
+        # the sentences are loaded, release the mapped documents
+        docs.close()
+        sf.topic_reference = {
+            "topic": path.abspath(topic.base_path),
+            "models": [path.basename(f) for (f, _) in summaries],
+            "size": size,
+            "oracle": oracle,
+            "parser": parser,
+            "feedbackstore": None if feedbackstore is None else feedbackstore.get_config()
+        }
+        return sf, ub_summary, ub_scores
+
     def run(self, topic_path, size=None, summarizer="SUME", summary_idx=None, parser=None,
             oracle="accept", feedback_log=None, propagation=False, max_iteration_count=10, preload_embeddings=None,
             feedbackstore=None, override_results_files=False, num_clusters=8):
+        """
+        :return: the run_id of the PROPAGATION summarizer, also if the run has been skipped because its result exists
+        """
         log = logging.getLogger("SingleTopicRunner")
 
         sf = None  # just for the sake of being able to run without simulated feedback...
+        run_id = None
         self.tlog.debug("SingleTopicRunner started")
         # relativize the topic path!
         if type(topic_path) is Topic:
@@ -272,7 +444,7 @@ class SingleTopicRunner(object):
         #clusters = get_clusters(clusters_path, topic.docs_dir)
 
         if summarizer == "SUME":
-            sw = SumeWrap(language)
+            sw = SumeWrap(language, method=self.summary_method)
             summary = sw(docs, use_size)
             outputfilecontents = {"summary": summary, "type": summarizer, "info_data": []}
 
@@ -294,38 +466,12 @@ class SingleTopicRunner(object):
                 write_to_file(json_content, self.out)
             write_to_file(json_content, path.normpath(path.expanduser(path.join(self.iobasedir, "tmp", "tmp.json"))))
         elif summarizer == "PROPAGATION":
-            #UB considering all the summaries
-            ub_summary = load_ub_summary(language, docs, summaries, use_size, base_dir=self.iobasedir)
-            summary = '\n'.join(ub_summary)
-            ub_scores = self.rouge(summary, summaries, use_size)
-
-            log.debug("UB scores: R1:%s R2:%s SU4:%s" % (str(ub_scores[0]), str(ub_scores[1]), str(ub_scores[2])))
-
             ref_summ = random.choice(summaries)
 
-            parse_info = []
-            #parse_info = topic.get_parse_info(summaries.index(ref_summ))
-
-            # initialize the Algorithm.
-            run_config = dict()
-            run_config['rank_subset'] = True
-            run_config['relative_k'] = True
-            run_config['dynamic_k'] = False
-            for flag in ['adaptive_sampling', 'strategy']:
-                run_config[flag] = False
-
-            r = 0
-            clusters = None
-            log.info("recording k_size in summarize %f", self.k)
             #TODO: Added summaries instead of one single summary
-            sf = SimulatedFeedback(language, self.rouge, embeddings=None,  #TODO: embeddings
-                                   docs=docs, models=summaries,
-                                   summary_length=use_size,
-                                   oracle_type=oracle,
-                                   ub_score=ub_scores, ub_summary=ub_summary,
-                                   parser_type=parser, flightrecorder=flightrecorder,
-                                   feedbackstore=feedbackstore, parse_info=parse_info,
-                                   run_config=run_config, k=self.k, adaptive_window_size=r, clusters=clusters)
+            sf, ub_summary, ub_scores = self.build_simulated_feedback(topic, summaries, use_size, oracle,
+                                                                      parser=parser, feedbackstore=feedbackstore,
+                                                                      flightrecorder=flightrecorder)
 
             if sf.embeddings is None or sf.embeddings == {}:
                 embe_var = "none",
@@ -352,12 +498,14 @@ class SingleTopicRunner(object):
             run_id = hashlib.sha224(run_id_string).hexdigest()
             filename = path.join(self.scores_storage_path, "result-%s.json" % (run_id))
 
+            # an empty result file is the placeholder of a run that has not finished
             if (os.path.exists(filename)
+                and os.path.getsize(filename) > 0
                 and self.out is None
                 and self.override_results_switch is False):
                 log.info("Skipping run_id '%s' because the result file does already exist. config: %s" % (
                     run_id, run_id_string))
-                return
+                return run_id
             else:
                 log.info("Doing %s iterations for run_id '%s'\n %s" % (max_iteration_count, run_id, run_id_string))
                 write_to_file("", filename)
@@ -457,6 +605,8 @@ class SingleTopicRunner(object):
                 # Pickle dictionary using protocol 0.
                 print('Pickle in file %s' % self.pickle_store)
                 self.pickle_write(sf, self.pickle_store, log)
+                if self.session_store is not None:
+                    self.session_store.add(self.pickle_store, sf)
 
             json_content = self.write_summarize_output_json(sf, confirmatory_summary, derived_records, log,
                                                             recom_sentences, result, run_id, summarizer,
@@ -468,6 +618,7 @@ class SingleTopicRunner(object):
         if sf is not None:
             write_details_file([sf.log_info_data], path.join(self.iobasedir, "tmp", "tmp.csv"))
         self.tlog.debug("SingleTopicRunner finished")
+        return run_id
 
     def write_continue_output_result(self,
                                      sf,
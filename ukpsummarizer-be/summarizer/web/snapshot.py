@@ -0,0 +1,212 @@
+"""
+Compact, versioned snapshots of summarizer sessions.
+
+Instead of pickling the whole SimulatedFeedback object graph (sentences, graphs, sklearn models, ...), a snapshot only
+stores what changes during the feedback iterations. Everything else is rebuilt from the topic on load:
+
+    <location>/
+        header.json         version, topic reference, k, logs and the list of arrays
+        concepts.npy        the ConceptVocabulary of the topic as UTF-8 byte blob, concept i is
+        concepts_offsets.npy concepts[concepts_offsets[i]:concepts_offsets[i + 1]]. The other arrays reference concepts
+                            by their id
+        weights.npy         weights of all concepts (NaN: no weight)
+        subset_weights.npy  weights of the concepts which are passed to the ILP (only if a sentence subset is used)
+        sentences.npy       (doc_id, position) of the sentences which are passed to the ILP
+        records.npy         flight-recorder records as (iteration, concept, label) rows
+        svm_uncertainity.npy
+        ranker.*.npy        SentenceRanker.get_state
+        feedbackstore.*.npy FeedbackStore.get_state
+
+All arrays are plain .npy files, so they can be memory-mapped on load.
+"""
+from __future__ import print_function
+
+import json
+import os
+import shutil
+from os import path
+
+import numpy as np
+
+from algorithms.flight_recorder import Record
+from algorithms.topic_artifacts import encode_strings, decode_strings
+from utils.writer import write_to_file
+
+SNAPSHOT_VERSION = 2
+READABLE_VERSIONS = [1, SNAPSHOT_VERSION]
+""" version 1 stored the concepts as unicode array """
+HEADER_FILE = "header.json"
+
+LABEL_ACCEPT = 0
+LABEL_REJECT = 1
+LABEL_IMPLICIT_REJECT = 2
+
+RANKER_PREFIX = "ranker."
+FEEDBACKSTORE_PREFIX = "feedbackstore."
+
+
+def is_snapshot(location):
+    return path.isfile(path.join(location, HEADER_FILE))
+
+
+def weights_to_array(weights, vocabulary):
+    arr = np.full(len(vocabulary), np.nan, dtype=np.float64)
+    if len(weights) > 0:
+        arr[vocabulary.to_ids(weights)] = weights.values()
+    return arr
+
+
+def array_to_weights(arr, concepts):
+    return dict((concepts[i], float(arr[i])) for i in np.flatnonzero(~np.isnan(arr)))
+
+
+def records_to_array(records, vocabulary):
+    rows = []
+    for i, record in enumerate(records):
+        for label, concepts in [(LABEL_ACCEPT, record.accept), (LABEL_REJECT, record.reject),
+                                (LABEL_IMPLICIT_REJECT, record.implicit_reject)]:
+            for concept in sorted(concepts):
+                rows.append((i, vocabulary.add(concept), label))
+    return np.array(rows, dtype=np.int32).reshape(-1, 3)
+
+
+def array_to_records(arr, record_count, concepts):
+    records = [Record() for _ in range(record_count)]
+    for i, concept_id, label in arr:
+        record = records[i]
+        if label == LABEL_ACCEPT:
+            record.accept.add(concepts[concept_id])
+        elif label == LABEL_REJECT:
+            record.reject.add(concepts[concept_id])
+        else:
+            record.implicit_reject.add(concepts[concept_id])
+    return records
+
+
+class Snapshot(object):
+    def __init__(self, header, arrays):
+        """
+        :param header: dict, the contents of header.json
+        :param arrays: dict name -> np.ndarray
+        """
+        self.header = header
+        self.arrays = arrays
+
+    def get_prefixed(self, prefix):
+        return dict((name[len(prefix):], arr) for name, arr in self.arrays.items() if name.startswith(prefix))
+
+
+def create_snapshot(sf):
+    """
+    :param sf: SimulatedFeedback, which has been set up by SingleTopicRunner.build_simulated_feedback
+    :rtype: Snapshot
+    """
+    if getattr(sf, "topic_reference", None) is None:
+        raise BaseException("The summarizer does not know its topic, it cannot be stored as snapshot")
+
+    all_weights = sf.get_concept_weights()
+    # the ids of the topic, which are already used by the sentences, the weights, the sentence ranker and the array
+    # graphs, so most of the states need no lookups
+    vocabulary = sf.summarizer.concept_vocabulary
+
+    arrays = {
+        "records": records_to_array(sf.flight_recorder.records, vocabulary),
+        "sentences": np.array([(s.doc_id, s.position) for s in sf.summarizer.sentences], dtype=np.int64).reshape(-1, 2)
+    }
+    for name, arr in sf.feedbackstore.get_state(vocabulary).items():
+        arrays[FEEDBACKSTORE_PREFIX + name] = arr
+    if sf.run_config['rank_subset']:
+        for name, arr in sf.sentence_ranker.get_state(vocabulary).items():
+            arrays[RANKER_PREFIX + name] = arr
+
+    # the vocabulary may have been extended by the states, so the weight vectors are created last
+    for weights in [all_weights, sf.summarizer.weights, sf.svm_uncertainity]:
+        vocabulary.to_ids(weights, add=True)
+    arrays["weights"] = weights_to_array(all_weights, vocabulary)
+    if sf.run_config['rank_subset']:
+        arrays["subset_weights"] = weights_to_array(sf.summarizer.weights, vocabulary)
+    arrays["svm_uncertainity"] = weights_to_array(sf.svm_uncertainity, vocabulary)
+    arrays["concepts"], arrays["concepts_offsets"] = encode_strings(vocabulary.concepts)
+
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "topic": sf.topic_reference,
+        "k": sf.k,
+        "record_count": len(sf.flight_recorder.records),
+        "log_info_data": sf.log_info_data,
+        "log_sir_info_data": sf.log_sir_info_data,
+        "arrays": sorted(arrays)
+    }
+    return Snapshot(header, arrays)
+
+
+def write_snapshot(sf, location):
+    """
+        stores the session as snapshot directory. An existing pickle or snapshot at the location is replaced.
+    """
+    snapshot = create_snapshot(sf)
+    if path.isfile(location):
+        os.remove(location)
+    elif path.isdir(location):
+        shutil.rmtree(location)
+    os.makedirs(location)
+
+    for name, arr in snapshot.arrays.items():
+        np.save(path.join(location, name + ".npy"), arr)
+    # the header is written last, so that incomplete snapshots are not recognized as such
+    write_to_file(json.dumps(snapshot.header), path.join(location, HEADER_FILE))
+    return snapshot
+
+
+def load_snapshot(location, mmap_mode='r'):
+    """
+    :param mmap_mode: passed to np.load, None reads the arrays into memory
+    :rtype: Snapshot
+    """
+    with open(path.join(location, HEADER_FILE)) as fp:
+        header = json.load(fp)
+    if header.get("version") not in READABLE_VERSIONS:
+        raise BaseException("Snapshot %s has version %s, expected %s" % (
+            location, header.get("version"), SNAPSHOT_VERSION))
+
+    arrays = {}
+    for name in header["arrays"]:
+        arrays[name] = np.load(path.join(location, name + ".npy"), mmap_mode=mmap_mode)
+    return Snapshot(header, arrays)
+
+
+def restore_snapshot(snapshot, sf):
+    """
+        brings a freshly built SimulatedFeedback (same topic reference and k) into the state of the snapshot.
+    """
+    header = snapshot.header
+    if "concepts_offsets" in snapshot.arrays:
+        concepts = decode_strings(snapshot.arrays["concepts"], snapshot.arrays["concepts_offsets"])
+    else:
+        concepts = snapshot.arrays["concepts"].tolist()
+
+    sf.flight_recorder.clear()
+    for record in array_to_records(snapshot.arrays["records"], header["record_count"], concepts):
+        sf.flight_recorder.add_record(record)
+
+    weights = array_to_weights(snapshot.arrays["weights"], concepts)
+    sentence_ids = [(int(d), int(p)) for d, p in snapshot.arrays["sentences"]]
+    if sf.run_config['rank_subset']:
+        ranker = sf.sentence_ranker
+        ranker.all_concept_weights.clear()
+        ranker.all_concept_weights.update(weights)
+        ranker.set_state(concepts, snapshot.get_prefixed(RANKER_PREFIX))
+        sf.summarizer.sentences = [ranker.sentences_dict[sent_id] for sent_id in sentence_ids]
+        sf.summarizer.weights = array_to_weights(snapshot.arrays["subset_weights"], concepts)
+    else:
+        sentences = dict(((s.doc_id, s.position), s) for s in sf.summarizer.sentences)
+        sf.summarizer.sentences = [sentences[sent_id] for sent_id in sentence_ids]
+        sf.summarizer.weights.clear()
+        sf.summarizer.weights.update(weights)
+    sf.summarizer.compute_word_frequency()
+
+    sf.feedbackstore.set_state(concepts, snapshot.get_prefixed(FEEDBACKSTORE_PREFIX))
+    sf.svm_uncertainity = array_to_weights(snapshot.arrays["svm_uncertainity"], concepts)
+    sf.log_info_data = header["log_info_data"]
+    sf.log_sir_info_data = header["log_sir_info_data"]
+    return sf